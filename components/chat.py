@@ -1,46 +1,62 @@
 import streamlit as st
-from utils.ai_models import get_ai_client
+import os
+from utils.ai_models import get_ai_client, get_prompt_cache_stats, get_materials_hash
 from utils.progress_tracker import ProgressTracker
-import time
+from utils.response_cache import response_cache
+from utils.simple_auth import get_class_scope, get_user_storage_key
+from utils.conversation_store import conversation_store, CHAT_PAGE_SIZE
+from utils.chat_export import EXPORT_FORMATS, MAX_DOWNLOAD_BYTES, chat_exporter
+from utils.material_library import get_material_lead, get_material_length, search_material_passages
+from utils.passages import format_passage_source
 
 def render_chat_interface():
     """Render the chat interface for study assistance."""
     st.header("💬 Study Assistant Chat")
     st.markdown("Ask questions about your uploaded materials or get study guidance.")
     
-    # Initialize chat history
-    if 'chat_history' not in st.session_state:
-        st.session_state.chat_history = []
+    # Load the latest messages of the user's conversation
+    load_conversation()
     
     # Display current context
     if st.session_state.uploaded_files:
         with st.expander("📚 Available Study Materials"):
             for file_data in st.session_state.uploaded_files:
-                st.write(f"• {file_data['name']} ({len(file_data['content'])} characters)")
+                st.write(f"• {file_data['name']} ({get_material_length(file_data)} characters)")
+    
+    # Show how much of the input was served from the provider prompt cache
+    cache_stats = get_prompt_cache_stats()
+    if cache_stats['requests']:
+        st.caption(
+            f"🧠 Prompt cache: {cache_stats['cached_tokens']:,} of {cache_stats['prompt_tokens']:,} "
+            f"input tokens cached this session ({cache_stats['cache_hit_rate']:.1f}% reduction)"
+        )
     
     # Chat container
     chat_container = st.container()
     
-    # Display chat history
+    # Display chat history (only the loaded window; older pages on request)
     with chat_container:
-        for i, message in enumerate(st.session_state.chat_history):
+        history = st.session_state.chat_history
+        if history and history[0]['seq'] > 0:
+            if st.button(f"⬆️ Show earlier messages ({history[0]['seq']} more)", key="chat_load_older"):
+                load_older_messages()
+                st.rerun()
+        
+        for message in history:
             if message['role'] == 'user':
                 with st.chat_message("user"):
                     st.write(message['content'])
             else:
                 with st.chat_message("assistant"):
                     st.write(message['content'])
+                    render_sources(message.get('sources'))
     
     # Chat input
     user_input = st.chat_input("Ask a question about your study materials or request study guidance...")
     
     if user_input:
         # Add user message to history
-        st.session_state.chat_history.append({
-            'role': 'user',
-            'content': user_input,
-            'timestamp': time.time()
-        })
+        question_message = append_chat_message('user', user_input)
         
         # Display user message immediately
         with st.chat_message("user"):
@@ -53,59 +69,111 @@ def render_chat_interface():
                     ai_client = get_ai_client()
                     
                     # Prepare context from uploaded files
-                    context = prepare_study_context()
+                    context = prepare_study_context(user_input)
+                    sources = context['passages']
+                    
+                    # Answer repeated questions from the class-wide cache
+                    cache_key = {
+                        'scope': get_class_scope(),
+                        'materials_hash': get_materials_hash(context['materials']),
+                        'model': f"{ai_client.provider_name}:{ai_client.model_name}"
+                    }
+                    cacheable = response_cache.is_cacheable(user_input, st.session_state.chat_history)
+                    cached = response_cache.lookup(user_input, **cache_key) if cacheable else None
                     
-                    # Generate response
-                    response = ai_client.generate_study_response(
-                        user_input, 
-                        context, 
-                        st.session_state.chat_history
-                    )
+                    if cached:
+                        response = cached['response']
+                        sources = cached['sources']
+                        st.write(response)
+                        st.caption("⚡ Answered instantly from a similar earlier question")
+                    else:
+                        # Stream the response as it is generated
+                        response = st.write_stream(ai_client.stream_study_response(
+                            user_input, 
+                            context, 
+                            st.session_state.chat_history
+                        ))
+                        
+                        if cacheable and ai_client.last_error is None:
+                            response_cache.store(user_input, response, **cache_key, sources=sources)
                     
-                    st.write(response)
+                    render_sources(sources)
                     
                     # Add assistant response to history
-                    st.session_state.chat_history.append({
-                        'role': 'assistant',
-                        'content': response,
-                        'timestamp': time.time()
-                    })
+                    append_chat_message('assistant', response, sources)
                     
                     # Update progress tracker
                     if 'progress_tracker' in st.session_state:
-                        st.session_state.progress_tracker.add_chat_interaction(user_input, response)
+                        st.session_state.progress_tracker.add_chat_interaction(
+                            user_input, response, st.session_state.conversation_id, question_message['seq']
+                        )
                     
                 except Exception as e:
                     error_msg = f"Sorry, I encountered an error: {str(e)}"
                     st.error(error_msg)
-                    st.session_state.chat_history.append({
-                        'role': 'assistant',
-                        'content': error_msg,
-                        'timestamp': time.time()
-                    })
+                    append_chat_message('assistant', error_msg)
     
     # Chat controls
     st.markdown("---")
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        if st.button("🔄 Clear Chat"):
+        if st.button("🔄 New Chat"):
+            # Earlier conversations stay in the store; the next message starts a new one
+            st.session_state.conversation_id = None
             st.session_state.chat_history = []
+            st.session_state.chat_window = CHAT_PAGE_SIZE
             st.rerun()
     
     with col2:
-        if st.button("📥 Export Chat"):
-            export_chat_history()
+        export_chat_history()
     
     with col3:
         if st.button("💡 Study Tips"):
             show_study_tips()
 
-def prepare_study_context():
-    """Prepare context from uploaded study materials."""
+def load_conversation():
+    """Load the latest page of the user's most recent conversation into the session."""
+    owner = get_user_storage_key()
+    if st.session_state.get('conversation_owner') == owner:
+        return
+    latest = conversation_store.get_latest_conversation(owner)
+    st.session_state.conversation_owner = owner
+    st.session_state.conversation_id = latest['id'] if latest else None
+    st.session_state.chat_history = conversation_store.get_messages(latest['id']) if latest else []
+    st.session_state.chat_window = CHAT_PAGE_SIZE
+
+def load_older_messages():
+    """Prepend the previous page of the conversation to the loaded window."""
+    history = st.session_state.chat_history
+    older = conversation_store.get_messages(
+        st.session_state.conversation_id, CHAT_PAGE_SIZE, before_seq=history[0]['seq']
+    )
+    st.session_state.chat_history = older + history
+    st.session_state.chat_window = len(st.session_state.chat_history)
+
+def append_chat_message(role, content, sources=None):
+    """Append a message to the conversation store and the loaded window."""
+    if st.session_state.conversation_id is None:
+        st.session_state.conversation_id = conversation_store.create_conversation(st.session_state.conversation_owner)
+    message = conversation_store.append_message(st.session_state.conversation_id, role, content, sources)
+    history = st.session_state.chat_history
+    history.append(message)
+    # Keep the window at its size so reruns render a bounded number of messages
+    window = st.session_state.get('chat_window', CHAT_PAGE_SIZE)
+    if len(history) > window:
+        del history[:len(history) - window]
+    return message
+
+def prepare_study_context(question=None):
+    """Prepare context from uploaded study materials.
+    
+    Each material contributes its opening passages; when a question is
+    given, the passages most relevant to it are retrieved for citation.
+    """
     context = {
         'materials': [],
-        'total_content': "",
+        'passages': [],
         'file_count': 0
     }
     
@@ -113,41 +181,89 @@ def prepare_study_context():
         for file_data in st.session_state.uploaded_files:
             material = {
                 'name': file_data['name'],
-                'content_preview': file_data['content'][:2000],  # Limit context size
+                'content_preview': get_material_lead(file_data, 2000),  # Limit context size
                 'analysis': file_data.get('analysis', {})
             }
             context['materials'].append(material)
-            context['total_content'] += file_data['content'][:1000] + "\n\n"
         
+        if question:
+            context['passages'] = search_material_passages(question, st.session_state.uploaded_files)
         context['file_count'] = len(st.session_state.uploaded_files)
     
     return context
 
+def render_sources(sources):
+    """Show the material passages an answer was given."""
+    if not sources:
+        return
+    with st.expander(f"📚 Sources ({len(sources)})"):
+        for number, passage in enumerate(sources, 1):
+            st.markdown(f"**[{number}] {format_passage_source(passage)}**")
+            st.caption(passage['text'][:300] + ("..." if len(passage['text']) > 300 else ""))
+
 def export_chat_history():
-    """Export chat history as a downloadable file."""
-    if not st.session_state.chat_history:
-        st.warning("No chat history to export.")
+    """Render a one-click download of the current conversation."""
+    conversation_id = st.session_state.get('conversation_id')
+    conversation = conversation_store.get_conversation(conversation_id) if conversation_id else None
+    if not conversation or not conversation['message_count']:
+        st.button("📥 Export Chat", disabled=True, help="No chat history to export yet.")
         return
     
-    # Format chat history
-    chat_text = "# Study Assistant Chat History\n\n"
-    for message in st.session_state.chat_history:
-        role = "**You:**" if message['role'] == 'user' else "**Assistant:**"
-        chat_text += f"{role} {message['content']}\n\n"
-    
-    # Create download button
-    st.download_button(
-        label="📥 Download Chat History",
-        data=chat_text,
-        file_name=f"study_chat_{int(time.time())}.md",
-        mime="text/markdown"
+    export_format = st.selectbox(
+        "Export format",
+        list(EXPORT_FORMATS),
+        format_func=lambda f: EXPORT_FORMATS[f]['label'],
+        key="chat_export_format",
+        label_visibility="collapsed"
     )
+    render_export_download([conversation], export_format, "📥 Export Chat",
+                           f"study_chat_{int(conversation['updated_at'])}", key="chat_export_download")
+
+def render_export_download(conversations, export_format, label, file_stem, key):
+    """Render a download button for an export, built in the background and cached on disk.
+    
+    Nothing is built until the user asks for it; while the build runs a
+    polling fragment shows that it is being prepared instead of blocking
+    the script.
+    """
+    path = chat_exporter.get_ready_path(conversations, export_format)
+    if path is None:
+        if chat_exporter.is_building(conversations, export_format):
+            st.fragment(render_export_progress, run_every=1)(conversations, export_format)
+        elif st.button(label, key=f"{key}_prepare", help="Prepare the export for download."):
+            chat_exporter.prepare(conversations, export_format)
+            st.rerun()
+        return
+    
+    export = EXPORT_FORMATS[export_format]
+    size = os.path.getsize(path)
+    if size > MAX_DOWNLOAD_BYTES:
+        st.warning(f"This export is {size / (1024 * 1024):.0f} MB, over the "
+                   f"{MAX_DOWNLOAD_BYTES // (1024 * 1024)} MB download limit. Try fewer conversations.")
+        return
+    with open(path, 'rb') as f:
+        st.download_button(
+            label=label,
+            data=f,
+            file_name=f"{file_stem}.{export['extension']}",
+            mime=export['mime'],
+            on_click="ignore",
+            key=key
+        )
+
+def render_export_progress(conversations, export_format):
+    """Show that an export is being prepared, rerunning the app once it is done."""
+    if chat_exporter.is_building(conversations, export_format):
+        st.caption("⏳ Preparing export...")
+    else:
+        # Rerun the whole app so the download button replaces this fragment
+        st.rerun()
 
 def show_study_tips():
     """Display general study tips."""
     tips = [
         "🎯 **Active Recall**: Test yourself regularly instead of just re-reading",
-        "📅 **Spaced Repetition**: Review material at increasing intervals",
+        "📅 **Spaced Repetition**: Review material at increasing intervals (see the 🔁 Review tab in Progress Tracking)",
         "🧩 **Break Down Complex Topics**: Divide difficult subjects into smaller chunks",
         "📝 **Summarize in Your Own Words**: Explain concepts as if teaching someone else",
         "🔗 **Make Connections**: Link new information to what you already know",
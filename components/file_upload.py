@@ -2,34 +2,56 @@ import streamlit as st
 import os
 from pathlib import Path
 from utils.file_processor import FileProcessor
-from utils.ai_models import get_ai_client
+from utils.extractors import get_supported_extensions, get_supported_labels
+from utils.job_queue import job_queue, describe_duplicate, JOB_COMPLETED, JOB_FAILED, ACTIVE_STATES, LARGE_FILE_CHARS
+from utils.simple_auth import get_user_id, get_user_storage_key, get_class_scope
+from utils.material_library import get_material_library, material_to_file_data
+from utils.analysis_store import AnalysisStore
+from utils.text_store import text_store
+from utils.text_analysis import top_phrase_frequencies
+from utils.passages import PassageIndex, chunk_text
+from utils.duplicates import register_fingerprint, forget_fingerprint
+
+JOB_STATUS_ICONS = {
+    'queued': '⏳',
+    'running': '⚙️',
+    'completed': '✅',
+    'failed': '❌'
+}
 
 def render_file_upload():
     """Render the file upload interface."""
     st.header("📤 Upload Study Materials")
-    st.markdown("Upload your study materials (PDFs, text files, documents) to get AI-powered insights.")
+    st.markdown("Upload your study materials (PDFs, slides, e-books, web pages, documents) to get AI-powered insights.")
     
     # File uploader
     uploaded_files = st.file_uploader(
         "Choose your study materials",
-        type=['pdf', 'txt', 'docx', 'md'],
+        type=get_supported_extensions(),
         accept_multiple_files=True,
-        help="Supported formats: PDF, TXT, DOCX, MD"
+        help=f"Supported formats: {', '.join(get_supported_labels())}"
     )
     
     if uploaded_files:
         # Display uploaded files
         st.subheader("📋 Uploaded Files")
         for i, file in enumerate(uploaded_files):
-            with st.expander(f"📄 {file.name} ({file.size} bytes)"):
+            check = check_upload(file)
+            status_icon = "📄" if check['valid'] else "❌"
+            with st.expander(f"{status_icon} {file.name} ({file.size} bytes)"):
+                if check['valid']:
+                    st.caption(check['message'])
+                else:
+                    st.error(check['message'])
+                
                 col1, col2, col3 = st.columns(3)
                 
                 with col1:
-                    if st.button(f"Process File", key=f"process_{i}"):
+                    if st.button(f"Process File", key=f"process_{i}", disabled=not check['valid']):
                         process_file(file, i)
                 
                 with col2:
-                    if st.button(f"Preview", key=f"preview_{i}"):
+                    if st.button(f"Preview", key=f"preview_{i}", disabled=not check['valid']):
                         preview_file(file)
                 
                 with col3:
@@ -37,94 +59,286 @@ def render_file_upload():
                         # Remove from session state
                         if 'uploaded_files' in st.session_state:
                             st.session_state.uploaded_files = [
-                                f for j, f in enumerate(st.session_state.uploaded_files) 
-                                if j != i
+                                f for f in st.session_state.uploaded_files 
+                                if f['name'] != file.name
                             ]
+                        if isinstance(st.session_state.get('analyzed_data'), AnalysisStore):
+                            st.session_state.analyzed_data.remove(file.name)
                         st.rerun()
         
         # Process all files button
         if st.button("🚀 Process All Files", type="primary"):
             process_all_files(uploaded_files)
+    
+    # Background processing status
+    render_analysis_jobs()
+    
+    # Previously processed materials
+    render_material_library()
+
+def get_ai_config():
+    """Get the AI configuration to hand to background jobs."""
+    return {
+        'provider': st.session_state.get('model_provider', ''),
+        'api_key': st.session_state.get('api_key', ''),
+        'model_version': st.session_state.get('model_version', '')
+    }
+
+def check_upload(file):
+    """Inspect and validate an upload once (cached for the session)."""
+    checks = st.session_state.setdefault('upload_checks', {})
+    key = (getattr(file, 'file_id', None) or file.name, file.size)
+    if key not in checks:
+        checks[key] = FileProcessor().inspect_file(file)
+    return checks[key]
 
 def process_file(file, index):
-    """Process a single uploaded file."""
+    """Queue a single uploaded file for background processing.
+    
+    Files already in the user's library are restored without re-analysis.
+    """
     try:
-        with st.spinner(f"Processing {file.name}..."):
-            # Initialize file processor
-            processor = FileProcessor()
-            
-            # Extract text from file
-            text_content = processor.extract_text(file)
-            
-            if text_content:
-                # Get AI client
-                ai_client = get_ai_client()
-                
-                # Analyze the content
-                analysis = ai_client.analyze_study_material(text_content, file.name)
-                
-                # Store in session state
-                if 'uploaded_files' not in st.session_state:
-                    st.session_state.uploaded_files = []
-                
-                file_data = {
-                    'name': file.name,
-                    'content': text_content,
-                    'analysis': analysis,
-                    'size': file.size,
-                    'type': file.type
-                }
-                
-                # Update or add file data
-                existing_file = next((f for f in st.session_state.uploaded_files if f['name'] == file.name), None)
-                if existing_file:
-                    existing_file.update(file_data)
-                else:
-                    st.session_state.uploaded_files.append(file_data)
-                
-                # Update analyzed data for visualization
-                if 'analyzed_data' not in st.session_state or st.session_state.analyzed_data is None:
-                    st.session_state.analyzed_data = []
-                
-                st.session_state.analyzed_data.append({
-                    'file_name': file.name,
-                    'analysis': analysis,
-                    'content_length': len(text_content),
-                    'timestamp': st.session_state.get('current_time', 'unknown')
-                })
-                
-                st.success(f"✅ Successfully processed {file.name}")
-                
-                # Show quick insights
-                if analysis:
-                    st.info("📊 Quick Insights Generated - Check the Analysis tab for detailed results!")
-                
-            else:
-                st.error(f"❌ Could not extract text from {file.name}")
+        check = check_upload(file)
+        if not check['valid']:
+            st.error(f"❌ {file.name}: {check['message']}")
+            return
+        
+        file.seek(0)
+        data = file.read()
+        library = get_material_library()
+        content_id = library.save_blob(data)
+        
+        if library.has_analysis(content_id):
+            file_data = material_to_file_data(library.get_material(content_id))
+            file_data['name'] = file.name
+            store_file_data(file_data)
+            st.success(f"✅ {file.name} is already in your library - loaded its analysis without re-processing")
+            return
+        
+        if not st.session_state.get('api_configured', False):
+            st.error("API not configured. Please configure your AI model first.")
+            return
+        
+        owner_key = get_user_storage_key()
+        allowed, message = job_queue.check_quota(owner_key, len(data), check['estimated_chars'] or 0)
+        if not allowed:
+            st.error(f"❌ {file.name}: {message}")
+            return
+        
+        job_queue.submit(get_user_id(), file.name, data, file.type, get_ai_config(), content_id=content_id,
+                         owner_key=owner_key, estimated_chars=check['estimated_chars'],
+                         class_scope=get_class_scope())
+        if (check['estimated_chars'] or 0) > LARGE_FILE_CHARS:
+            st.info(f"⏳ Queued {file.name} for processing in the large-file queue. This may take a while; you can keep working.")
+        else:
+            st.info(f"⏳ Queued {file.name} for processing. You can keep working while it runs.")
                 
     except Exception as e:
         st.error(f"❌ Error processing {file.name}: {str(e)}")
 
 def process_all_files(uploaded_files):
-    """Process all uploaded files."""
+    """Queue all uploaded files for background processing."""
     if not uploaded_files:
         st.warning("No files to process.")
         return
     
-    progress_bar = st.progress(0)
-    status_text = st.empty()
-    
     for i, file in enumerate(uploaded_files):
-        status_text.text(f"Processing {file.name}...")
         process_file(file, i)
-        progress_bar.progress((i + 1) / len(uploaded_files))
+
+def store_processed_file(name, size, file_type, text_content, analysis, content_id=None, passages=None,
+                         fingerprint=None, duplicate_of=None, text_saved=False):
+    """Store a processed file in the user's library and in session state.
     
-    status_text.text("✅ All files processed successfully!")
-    st.balloons()
+    `text_saved` means the text and passages are already in the library.
+    """
+    if passages is None:
+        passages = chunk_text(text_content)
+    
+    file_data = {
+        'name': name,
+        'text_handle': text_store.put(text_content),
+        'content_length': len(text_content),
+        'word_count': len(text_content.split()),
+        'line_count': text_content.count('\n') + 1,
+        'phrase_frequencies': top_phrase_frequencies(text_content),
+        'passages': passages,
+        'analysis': analysis,
+        'size': size,
+        'type': file_type
+    }
+    
+    if content_id:
+        try:
+            get_material_library().add_material(content_id, name, size, file_type, text_content, analysis, passages,
+                                                fingerprint=fingerprint, duplicate_of=duplicate_of,
+                                                save_text=not text_saved,
+                                                phrase_frequencies=file_data['phrase_frequencies'])
+            file_data['content_id'] = content_id
+            if fingerprint:
+                register_fingerprint(get_user_storage_key(), get_class_scope(), content_id, name, fingerprint)
+        except Exception as e:
+            st.warning(f"Could not save {name} to your library: {str(e)}")
+    
+    store_file_data(file_data)
+
+def store_file_data(file_data):
+    """Add or update a file entry in session state."""
+    if 'uploaded_files' not in st.session_state:
+        st.session_state.uploaded_files = []
+    
+    # Update or add file data
+    existing_file = next((f for f in st.session_state.uploaded_files if f['name'] == file_data['name']), None)
+    if existing_file:
+        # Drop text held for a previous version of the file
+        old_handle = existing_file.pop('text_handle', None)
+        if old_handle is not None and old_handle is not file_data.get('text_handle'):
+            old_handle.release()
+        existing_file.pop('phrase_frequencies', None)
+        existing_file.pop('line_count', None)
+        existing_file.pop('passages', None)
+        existing_file.update(file_data)
+    else:
+        st.session_state.uploaded_files.append(file_data)
+    
+    # Update analyzed data for visualization (one entry per file)
+    if not isinstance(st.session_state.get('analyzed_data'), AnalysisStore):
+        st.session_state.analyzed_data = AnalysisStore()
+    
+    st.session_state.analyzed_data.upsert(file_data['name'], {
+        'file_name': file_data['name'],
+        'analysis': file_data['analysis'],
+        'content_length': file_data['content_length'],
+        'timestamp': st.session_state.get('current_time', 'unknown')
+    })
+
+def restore_material_library():
+    """Load the user's library metadata into the session once per login."""
+    library = get_material_library()
+    if st.session_state.get('library_restored_for') == library.user_key:
+        return
+    
+    scope = get_class_scope()
+    for material in library.list_materials():
+        store_file_data(material_to_file_data(material))
+        # Let classmates' uploads of the same handout reuse this analysis
+        if material.get('fingerprint'):
+            register_fingerprint(library.user_key, scope, material['content_id'], material['name'], material['fingerprint'])
+    st.session_state.library_restored_for = library.user_key
+
+def render_material_library():
+    """Render the user's saved materials."""
+    materials = get_material_library().list_materials()
+    if not materials:
+        return
+    
+    with st.expander(f"📚 My Library ({len(materials)} materials)"):
+        for material in materials:
+            col1, col2 = st.columns([4, 1])
+            with col1:
+                st.write(f"📄 **{material['name']}** ({material.get('content_length', 0):,} characters)")
+                if material.get('duplicate_of'):
+                    st.caption(f"♻️ {describe_duplicate(material['duplicate_of'])}")
+            with col2:
+                if st.button("Delete", key=f"delete_library_{material['content_id']}"):
+                    get_material_library().remove_material(material['content_id'])
+                    forget_fingerprint(get_user_storage_key(), get_class_scope(), material['content_id'])
+                    removed_names = {
+                        f['name'] for f in st.session_state.get('uploaded_files', [])
+                        if f.get('content_id') == material['content_id']
+                    }
+                    st.session_state.uploaded_files = [
+                        f for f in st.session_state.get('uploaded_files', [])
+                        if f['name'] not in removed_names
+                    ]
+                    if isinstance(st.session_state.get('analyzed_data'), AnalysisStore):
+                        for name in removed_names:
+                            st.session_state.analyzed_data.remove(name)
+                    st.rerun()
+
+def collect_finished_jobs(jobs):
+    """Add results of completed jobs to the library and session state.
+    
+    Each job is collected once; the job row records it, so a new session
+    does not collect it again. Returns True if any new results were collected.
+    """
+    collected = False
+    for job in jobs:
+        if job['status'] != JOB_COMPLETED or job['collected']:
+            continue
+        
+        full_job = job_queue.get_job(job['id'])
+        if full_job and full_job['result']:
+            result = full_job['result']
+            content_id = full_job.get('content_id')
+            if 'content' in result:
+                text_content = result['content']
+                passages = PassageIndex.from_dict(result['passages']) if result.get('passages') else None
+            else:
+                library = get_material_library()
+                text_content = library.load_text(content_id)
+                passages = library.load_passages(content_id)
+            store_processed_file(
+                full_job['filename'],
+                full_job['file_size'],
+                full_job['file_type'],
+                text_content,
+                result['analysis'],
+                content_id=content_id,
+                passages=passages,
+                fingerprint=result.get('fingerprint'),
+                duplicate_of=result.get('duplicate_of'),
+                text_saved='content' not in result
+            )
+            collected = True
+        job_queue.mark_collected(job['id'])
+    
+    return collected
+
+def render_analysis_jobs():
+    """Render background processing status, polling while jobs are active."""
+    user_id = get_user_id()
+    run_every = 2 if job_queue.has_active_jobs(user_id) else None
+    st.fragment(render_job_status, run_every=run_every)(user_id)
+
+def render_job_status(user_id):
+    """Render the status of the user's recent processing jobs."""
+    jobs = job_queue.list_jobs(user_id, limit=10)
+    if not jobs:
+        return
+    
+    st.subheader("⚙️ Processing Status")
+    for job in jobs:
+        icon = JOB_STATUS_ICONS.get(job['status'], '•')
+        if job['status'] in ACTIVE_STATES:
+            st.write(f"{icon} **{job['filename']}** — {job['message']}")
+            st.progress(job['progress'] or 0.0)
+        elif job['status'] == JOB_FAILED:
+            st.write(f"{icon} **{job['filename']}** — {job['error']}")
+        else:
+            st.write(f"{icon} **{job['filename']}** — {job['message']}")
+    
+    has_active_jobs = any(job['status'] in ACTIVE_STATES for job in jobs)
+    if collect_finished_jobs(jobs):
+        st.success("📊 New analysis ready - Check the Analysis tab for detailed results!")
+        # Refresh the whole app so the other tabs see the new materials
+        st.rerun()
+    elif st.session_state.get('jobs_polling') and not has_active_jobs:
+        # Rerun the app once so the fragment stops polling
+        st.session_state.jobs_polling = False
+        st.rerun()
+    else:
+        st.session_state.jobs_polling = has_active_jobs
 
 def preview_file(file):
     """Preview file content."""
     try:
+        check = check_upload(file)
+        if (check['estimated_chars'] or 0) > LARGE_FILE_CHARS:
+            # Previewing would extract the whole file in this script run
+            st.info(f"📖 {file.name} is large (about {check['estimated_chars']:,} characters). "
+                    "Process it to see its content.")
+            return
+        
         processor = FileProcessor()
         text_content = processor.extract_text(file)
         
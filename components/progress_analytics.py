@@ -5,7 +5,16 @@ import pandas as pd
 from datetime import datetime, timedelta
 import time
 from utils.ai_models import get_ai_client
-import json
+from utils.task_generation import task_generator
+from utils.task_store import STATUS_ALL, STATUS_OPEN, STATUS_COMPLETED, TASK_PAGE_SIZE
+from utils.material_library import search_material_passages
+from utils.spaced_repetition import REVIEW_GRADES
+
+TASK_STATUS_LABELS = {
+    STATUS_OPEN: "Open tasks",
+    STATUS_COMPLETED: "Completed tasks",
+    STATUS_ALL: "All tasks"
+}
 
 def render_progress_analytics(progress_tracker):
     """Render progress analytics dashboard."""
@@ -13,9 +22,10 @@ def render_progress_analytics(progress_tracker):
     st.markdown("Track your study progress and performance over time.")
     
     # Create tabs for different analytics
-    analytics_tab1, analytics_tab2, analytics_tab3, analytics_tab4, analytics_tab5 = st.tabs([
+    analytics_tab1, analytics_tab2, analytics_tab3, analytics_tab4, analytics_tab5, analytics_tab6 = st.tabs([
         "📊 Overview",
         "🎯 AI Task Creator",
+        "🔁 Review",
         "⏰ Time Tracking",
         "📈 Performance",
         "📅 Calendar View"
@@ -28,12 +38,15 @@ def render_progress_analytics(progress_tracker):
         render_ai_task_creator(progress_tracker)
     
     with analytics_tab3:
-        render_time_tracking(progress_tracker)
+        render_review_session(progress_tracker)
     
     with analytics_tab4:
-        render_performance_metrics(progress_tracker)
+        render_time_tracking(progress_tracker)
     
     with analytics_tab5:
+        render_performance_metrics(progress_tracker)
+    
+    with analytics_tab6:
         render_calendar_view(progress_tracker)
 
 def render_progress_overview(progress_tracker):
@@ -96,12 +109,6 @@ def render_ai_task_creator(progress_tracker):
         st.info("Please upload and analyze your study materials first to create AI-powered tasks.")
         return
     
-    # Initialize tasks in session state
-    if 'study_tasks' not in st.session_state:
-        st.session_state.study_tasks = []
-    if 'completed_tasks' not in st.session_state:
-        st.session_state.completed_tasks = []
-    
     # Task creation form
     with st.expander("📝 Create New Study Tasks", expanded=True):
         col1, col2 = st.columns(2)
@@ -145,7 +152,8 @@ def render_ai_task_creator(progress_tracker):
                 st.error("Please configure your AI API first in the main settings.")
     
     # Display existing tasks
-    if st.session_state.study_tasks:
+    counters = progress_tracker.get_task_counters()
+    if counters['total']:
         st.subheader("📋 Your Study Tasks")
         
         # Task management buttons
@@ -155,15 +163,44 @@ def render_ai_task_creator(progress_tracker):
                 st.rerun()
         with col2:
             if st.button("🗑️ Clear All Tasks"):
-                st.session_state.study_tasks = []
-                st.session_state.completed_tasks = []
+                progress_tracker.clear_study_tasks()
+                st.session_state.task_page = 0
                 st.rerun()
         with col3:
-            export_tasks_data()
+            export_tasks_data(progress_tracker, counters)
+        
+        # Filters
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            status = st.selectbox("Show", [STATUS_OPEN, STATUS_COMPLETED, STATUS_ALL],
+                                  format_func=lambda s: TASK_STATUS_LABELS[s], key="task_status_filter")
+        with col2:
+            source_files = progress_tracker.tasks.get_source_files(progress_tracker.owner_key)
+            source_file = st.selectbox("Material", [None] + source_files,
+                                       format_func=lambda f: "All materials" if f is None else f,
+                                       key="task_material_filter")
+        with col3:
+            order = st.selectbox("Sort by", ['priority', 'due'],
+                                 format_func=lambda o: "Priority" if o == 'priority' else "Due date",
+                                 key="task_order")
+        
+        # Go back to the first page when the filter changes
+        filter_key = (status, source_file, order)
+        if st.session_state.get('task_filter') != filter_key:
+            st.session_state.task_filter = filter_key
+            st.session_state.task_page = 0
+        
+        matching = progress_tracker.count_study_tasks(status, source_file)
+        page_count = max(1, -(-matching // TASK_PAGE_SIZE))
+        page = min(st.session_state.get('task_page', 0), page_count - 1)
+        tasks = progress_tracker.get_study_tasks(status, source_file, order, page)
+        
+        if not tasks:
+            st.info("No tasks match this filter.")
         
         # Display tasks
-        for i, task in enumerate(st.session_state.study_tasks):
-            task_id = f"task_{i}"
+        for task in tasks:
+            task_id = task['id']
             
             with st.expander(f"{task['priority_icon']} {task['title']}", expanded=False):
                 col1, col2 = st.columns([3, 1])
@@ -184,15 +221,13 @@ def render_ai_task_creator(progress_tracker):
                     completed = st.checkbox(
                         "Completed",
                         value=task.get('completed', False),
-                        key=f"complete_{task_id}"
+                        key=f"complete_{task_id}",
+                        disabled=task.get('completed', False)
                     )
                     
                     if completed and not task.get('completed', False):
                         # Mark task as completed
-                        task['completed'] = True
-                        task['completion_time'] = datetime.now().isoformat()
-                        st.session_state.completed_tasks.append(task)
-                        progress_tracker.add_study_session(task['time_estimate'], "task_completion")
+                        progress_tracker.complete_study_task(task_id)
                         st.success("Task completed! Progress recorded.")
                         st.rerun()
                     
@@ -203,148 +238,145 @@ def render_ai_task_creator(progress_tracker):
                         value=task.get('progress', 0),
                         key=f"progress_{task_id}"
                     )
-                    task['progress'] = new_progress
+                    if new_progress != task.get('progress', 0):
+                        progress_tracker.update_study_task(task_id, progress=new_progress)
+                    
+                    due = st.date_input(
+                        "Due",
+                        value=datetime.fromisoformat(task['due_date']).date() if task.get('due_date') else None,
+                        key=f"due_{task_id}"
+                    )
+                    due_date = due.isoformat() if due else ''
+                    if due_date != (task.get('due_date') or ''):
+                        progress_tracker.update_study_task(task_id, due_date=due_date)
+        
+        # Pagination
+        if page_count > 1:
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col1:
+                if st.button("⬅️ Previous", disabled=page == 0, key="task_page_prev"):
+                    st.session_state.task_page = page - 1
+                    st.rerun()
+            with col2:
+                st.caption(f"Page {page + 1} of {page_count} ({matching:,} tasks)")
+            with col3:
+                if st.button("Next ➡️", disabled=page >= page_count - 1, key="task_page_next"):
+                    st.session_state.task_page = page + 1
+                    st.rerun()
         
         # Task statistics
-        render_task_statistics()
+        render_task_statistics(counters, tasks)
     
     else:
         st.info("No tasks created yet. Use the form above to generate your first set of AI-powered study tasks.")
 
+def render_review_session(progress_tracker):
+    """Render spaced-repetition review of the materials' key concepts."""
+    st.subheader("🔁 Concept Review")
+    st.markdown("Recall the key concepts of your materials; each one comes back just before you would forget it.")
+    
+    files = st.session_state.get('uploaded_files', [])
+    if not files:
+        st.info("Please upload and analyze your study materials first to review their concepts.")
+        return
+    
+    # Create cards only when the set of materials changes
+    materials_key = tuple(sorted(f.get('content_id') or f['name'] for f in files))
+    if st.session_state.get('review_materials_key') != materials_key:
+        added = progress_tracker.sync_review_cards(files)
+        st.session_state.review_materials_key = materials_key
+        if added:
+            st.toast(f"Added {added} new concepts to review")
+    
+    stats = progress_tracker.get_review_stats()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Due Now", stats['due'])
+    with col2:
+        st.metric("Concepts", stats['cards'])
+    with col3:
+        recall = f"{stats['passed'] / stats['reviews'] * 100:.0f}%" if stats['reviews'] else "—"
+        st.metric("Recall (7 days)", recall, help=f"{stats['reviews']} reviews in the last 7 days")
+    
+    due = progress_tracker.get_due_reviews(1)
+    if not due:
+        if stats['next_due_at']:
+            next_due = datetime.fromtimestamp(stats['next_due_at'])
+            st.success(f"All caught up! Next review due {next_due.strftime('%b %d, %H:%M')}.")
+        else:
+            st.info("No concepts to review yet. Analyzed materials add their key concepts here.")
+        return
+    
+    card = due[0]
+    st.markdown(f"### {card['concept']}")
+    st.caption(f"From {card['material']}")
+    st.write("What do you remember about this concept? Explain it to yourself, then reveal the source.")
+    
+    if st.session_state.get('review_revealed') != card['id']:
+        if st.button("👀 Show Answer", type="primary", key="review_reveal"):
+            st.session_state.review_revealed = card['id']
+            st.rerun()
+        return
+    
+    material = [f for f in files if f['name'] == card['material']]
+    passages = search_material_passages(card['concept'], material, limit=2) if material else []
+    if passages:
+        for passage in passages:
+            st.info(passage['text'])
+    else:
+        st.info("This material is no longer loaded; check your notes on this concept.")
+    
+    st.write("How well did you remember it?")
+    columns = st.columns(len(REVIEW_GRADES))
+    for column, (label, grade) in zip(columns, REVIEW_GRADES.items()):
+        with column:
+            if st.button(label, key=f"review_grade_{grade}", use_container_width=True):
+                progress_tracker.record_review(card['id'], grade)
+                st.session_state.review_revealed = None
+                st.rerun()
+
 def generate_ai_tasks(num_tasks, study_time, difficulty_preference, task_types, progress_tracker):
-    """Generate AI-powered study tasks based on analysis."""
+    """Generate AI-powered study tasks based on analysis.
+    
+    Tasks are generated per material concurrently and validated; the same
+    request for the same materials is served from the task cache.
+    """
     try:
         with st.spinner("Generating AI-powered study tasks..."):
             ai_client = get_ai_client()
-            
-            # Collect analysis data from uploaded files
-            materials_analysis = []
-            for file in st.session_state.uploaded_files:
-                analysis = file.get('analysis', {})
-                materials_analysis.append({
-                    'filename': file['name'],
-                    'topics': analysis.get('key_topics', []),
-                    'difficulty': analysis.get('difficulty', 5),
-                    'study_time': analysis.get('study_time_estimate', 20),
-                    'summary': analysis.get('summary', ''),
-                    'important_concepts': analysis.get('important_concepts', [])
-                })
-            
-            # Create prompt for AI task generation
-            prompt = f"""
-            Based on the following study materials analysis, create {num_tasks} specific study tasks for a student.
-            
-            Available study time: {study_time} minutes
-            Difficulty preference: {difficulty_preference}
-            Task types to include: {', '.join(task_types)}
-            
-            Materials Analysis:
-            {json.dumps(materials_analysis, indent=2)}
-            
-            For each task, provide:
-            1. Title (clear and specific)
-            2. Description (detailed instructions)
-            3. Source file name
-            4. Estimated time (in minutes, total should not exceed {study_time})
-            5. Difficulty level (1-10)
-            6. Priority (High/Medium/Low based on importance and exam probability)
-            7. Task type (from the preferred types)
-            
-            Make tasks practical, specific, and actionable. Focus on the most important topics based on the analysis.
-            
-            Respond in JSON format with an array of tasks:
-            {{
-                "tasks": [
-                    {{
-                        "title": "task title",
-                        "description": "detailed description",
-                        "source_file": "filename",
-                        "time_estimate": 30,
-                        "difficulty": 7,
-                        "priority": "High",
-                        "task_type": "Review & Summary"
-                    }}
-                ]
-            }}
-            """
-            
-            response = ai_client.generate_study_response(prompt, {}, [])
-            
-            try:
-                # Parse JSON response
-                tasks_data = json.loads(response)
-                tasks = tasks_data.get('tasks', [])
-                
-                # Process and add tasks
-                for task in tasks:
-                    priority_icon = "🔴" if task['priority'] == "High" else "🟡" if task['priority'] == "Medium" else "🟢"
-                    
-                    task_obj = {
-                        'title': task['title'],
-                        'description': task['description'],
-                        'source_file': task['source_file'],
-                        'time_estimate': task['time_estimate'],
-                        'difficulty': task['difficulty'],
-                        'priority': task['priority'],
-                        'priority_icon': priority_icon,
-                        'task_type': task.get('task_type', 'Study'),
-                        'created_at': datetime.now().isoformat(),
-                        'completed': False,
-                        'progress': 0
-                    }
-                    
-                    st.session_state.study_tasks.append(task_obj)
-                
-                st.success(f"Successfully generated {len(tasks)} AI-powered study tasks!")
-                
-                # Record task creation in progress tracker
-                progress_tracker.add_study_session(5, "task_creation")
-                
-            except json.JSONDecodeError:
-                # Fallback: create basic tasks from analysis
-                create_fallback_tasks(num_tasks, study_time, materials_analysis)
-                st.warning("Created basic tasks from analysis. For better AI tasks, check your API configuration.")
+            tasks, info = task_generator.generate(
+                ai_client,
+                st.session_state.uploaded_files,
+                num_tasks,
+                study_time,
+                difficulty_preference,
+                task_types
+            )
+        
+        added = progress_tracker.add_generated_tasks(tasks, info['generation_key'])
+        
+        if not added:
+            st.info("Your task list already has the tasks generated for these materials and settings.")
+        elif info['cached']:
+            st.success(f"Loaded {len(tasks)} study tasks generated earlier for these materials and settings.")
+        else:
+            st.success(f"Successfully generated {len(tasks)} AI-powered study tasks!")
+            # Record task creation in progress tracker
+            progress_tracker.add_study_session(5, "task_creation")
+        
+        if info['fallback_files']:
+            st.warning(f"Created basic tasks for {', '.join(info['fallback_files'])} from their analysis. "
+                       "For better AI tasks, check your API configuration.")
             
     except Exception as e:
         st.error(f"Error generating tasks: {str(e)}")
-        # Create fallback tasks
-        create_fallback_tasks(num_tasks, study_time, materials_analysis)
 
-def create_fallback_tasks(num_tasks, study_time, materials_analysis):
-    """Create basic tasks when AI generation fails."""
-    tasks_per_file = max(1, num_tasks // len(materials_analysis))
-    time_per_task = study_time // num_tasks
-    
-    for material in materials_analysis[:num_tasks]:
-        for i in range(min(tasks_per_file, num_tasks - len(st.session_state.study_tasks))):
-            if len(st.session_state.study_tasks) >= num_tasks:
-                break
-                
-            topics = material.get('topics', ['General Study'])
-            topic = topics[i] if i < len(topics) else topics[0] if topics else 'General Study'
-            
-            task_obj = {
-                'title': f"Study: {topic}",
-                'description': f"Review and understand the concept of {topic} from {material['filename']}",
-                'source_file': material['filename'],
-                'time_estimate': time_per_task,
-                'difficulty': material.get('difficulty', 5),
-                'priority': "Medium",
-                'priority_icon': "🟡",
-                'task_type': "Review & Summary",
-                'created_at': datetime.now().isoformat(),
-                'completed': False,
-                'progress': 0
-            }
-            
-            st.session_state.study_tasks.append(task_obj)
-
-def render_task_statistics():
-    """Render task completion statistics."""
+def render_task_statistics(counters, page_tasks):
+    """Render task completion statistics from the store's counters."""
     st.subheader("📊 Task Progress Statistics")
     
-    total_tasks = len(st.session_state.study_tasks)
-    completed_tasks = len([t for t in st.session_state.study_tasks if t.get('completed', False)])
+    total_tasks = counters['total']
+    completed_tasks = counters['completed']
     
     if total_tasks > 0:
         completion_rate = (completed_tasks / total_tasks) * 100
@@ -360,10 +392,10 @@ def render_task_statistics():
         with col4:
             st.metric("Completion Rate", f"{completion_rate:.1f}%")
         
-        # Progress visualization
-        if st.session_state.study_tasks:
+        # Progress visualization of the tasks on this page
+        if page_tasks:
             task_data = []
-            for task in st.session_state.study_tasks:
+            for task in page_tasks:
                 task_data.append({
                     'Task': task['title'][:30] + '...' if len(task['title']) > 30 else task['title'],
                     'Progress': task.get('progress', 0),
@@ -384,25 +416,36 @@ def render_task_statistics():
             fig.update_layout(xaxis_tickangle=-45)
             st.plotly_chart(fig, use_container_width=True)
 
-def export_tasks_data():
-    """Export tasks data for download."""
-    if st.session_state.study_tasks:
-        tasks_text = "# Study Tasks\n\n"
-        for i, task in enumerate(st.session_state.study_tasks, 1):
+def export_tasks_data(progress_tracker, counters):
+    """Export tasks data for download.
+    
+    The export is rebuilt only when the user's tasks change (tracked by the
+    store's version counter), not on every rerun.
+    """
+    cache_key = (progress_tracker.owner_key, counters['version'])
+    cached = st.session_state.get('tasks_export')
+    if not cached or cached[0] != cache_key:
+        parts = ["# Study Tasks\n\n"]
+        for i, task in enumerate(progress_tracker.tasks.iter_tasks(progress_tracker.owner_key), 1):
             status = "✅" if task.get('completed', False) else "⏳"
-            tasks_text += f"## {i}. {status} {task['title']}\n"
-            tasks_text += f"**Description:** {task['description']}\n"
-            tasks_text += f"**Source:** {task['source_file']}\n"
-            tasks_text += f"**Time:** {task['time_estimate']} minutes\n"
-            tasks_text += f"**Priority:** {task['priority']}\n"
-            tasks_text += f"**Progress:** {task.get('progress', 0)}%\n\n"
-        
-        st.download_button(
-            label="📥 Export Tasks",
-            data=tasks_text,
-            file_name=f"study_tasks_{int(time.time())}.md",
-            mime="text/markdown"
-        )
+            parts.append(
+                f"## {i}. {status} {task['title']}\n"
+                f"**Description:** {task['description']}\n"
+                f"**Source:** {task['source_file']}\n"
+                f"**Time:** {task['time_estimate']} minutes\n"
+                f"**Priority:** {task['priority']}\n"
+                + (f"**Due:** {task['due_date']}\n" if task.get('due_date') else "")
+                + f"**Progress:** {task.get('progress', 0)}%\n\n"
+            )
+        cached = (cache_key, ''.join(parts))
+        st.session_state.tasks_export = cached
+    
+    st.download_button(
+        label="📥 Export Tasks",
+        data=cached[1],
+        file_name=f"study_tasks_{int(time.time())}.md",
+        mime="text/markdown"
+    )
 
 def render_progress_chart(progress_tracker):
     """Render improved progress chart with better insights."""
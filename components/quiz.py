@@ -0,0 +1,108 @@
+import streamlit as st
+from components.file_upload import get_ai_config
+from utils.material_library import get_material_passages, get_passage_text
+from utils.quiz_engine import POOL_LOW_WATER, get_material_key, quiz_engine, split_quiz_chunks
+
+def render_quiz():
+    """Render quizzes served from the materials' pre-generated question pools."""
+    st.header("🧠 Quiz Yourself")
+    st.markdown("Answer questions generated from your study materials. New questions are prepared in the background.")
+
+    progress_tracker = st.session_state.progress_tracker
+    files = st.session_state.uploaded_files
+    names = [f['name'] for f in files]
+    selected = st.multiselect("Materials to quiz on:", names, default=names, key="quiz_materials")
+    chosen = [f for f in files if f['name'] in selected]
+    if not chosen:
+        st.info("Select at least one material.")
+        return
+
+    material_keys = [get_material_key(f) for f in chosen]
+    generating = refill_question_pools(progress_tracker.owner_key, chosen)
+
+    stats = progress_tracker.get_quiz_statistics()
+    if stats['answered']:
+        st.caption(f"Answered {stats['answered']} questions, {stats['accuracy']:.0f}% correct")
+
+    question = st.session_state.get('quiz_question')
+    if question is None or question['material_key'] not in material_keys:
+        question = quiz_engine.next_question(progress_tracker.owner_key, material_keys)
+        st.session_state.quiz_question = question
+        st.session_state.quiz_result = None
+
+    if question is None:
+        if generating:
+            st.info("⏳ Preparing questions from your materials...")
+            if st.button("🔄 Check for questions"):
+                st.rerun()
+        elif not st.session_state.get('api_configured', False):
+            st.error("Please configure your AI API first in the main settings.")
+        else:
+            st.success("You have answered every question for these materials.")
+            if st.button("🔁 Start over"):
+                quiz_engine.reset_answers(progress_tracker.owner_key, material_keys)
+                st.rerun()
+        return
+
+    render_question(question, progress_tracker)
+
+def render_question(question, progress_tracker):
+    """Render one question, then the feedback once it is answered."""
+    st.caption(f"From {question['material']}")
+    st.markdown(f"### {question['question']}")
+
+    result = st.session_state.get('quiz_result')
+    choice = st.radio(
+        "Your answer:",
+        range(len(question['options'])),
+        format_func=lambda i: question['options'][i],
+        index=None,
+        key=f"quiz_choice_{question['id']}",
+        disabled=result is not None
+    )
+
+    if result is None:
+        if st.button("Submit", type="primary", disabled=choice is None):
+            correct = quiz_engine.record_answer(progress_tracker.owner_key, question, choice)
+            progress_tracker.add_quiz_answer()
+            st.session_state.quiz_result = correct
+            st.rerun()
+        return
+
+    if result:
+        st.success("✅ Correct!")
+    else:
+        st.error(f"❌ The answer is: {question['options'][question['answer']]}")
+    if question['explanation']:
+        st.info(question['explanation'])
+
+    if st.button("Next question ➡️", type="primary"):
+        st.session_state.quiz_question = None
+        st.session_state.quiz_result = None
+        st.rerun()
+
+def refill_question_pools(user_id, files):
+    """Start background generation for materials running low on unseen questions.
+
+    Returns whether any of the materials is being generated for.
+    """
+    generating = False
+    for file_data in files:
+        material_key = get_material_key(file_data)
+        if quiz_engine.is_refilling(material_key):
+            generating = True
+            continue
+        if quiz_engine.count_unseen(user_id, material_key) >= POOL_LOW_WATER:
+            continue
+        if not st.session_state.get('api_configured', False):
+            continue
+
+        chunks = split_quiz_chunks(get_material_passages(file_data))
+        pending = quiz_engine.get_pending_chunks(material_key, len(chunks))
+        chunk_texts = [
+            (chunk, get_passage_text(file_data, {'start': chunks[chunk][0], 'end': chunks[chunk][1]}))
+            for chunk in pending
+        ]
+        if quiz_engine.request_refill(material_key, file_data['name'], chunk_texts, get_ai_config()):
+            generating = True
+    return generating
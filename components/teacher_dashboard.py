@@ -6,7 +6,11 @@ import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import json
 import os
-from utils.simple_auth import get_user_subjects, get_current_user, require_teacher_role
+from utils.simple_auth import (get_user_subjects, get_current_user, require_teacher_role, get_class_scope,
+                               get_scope_of_institution, get_storage_key)
+from components.simple_auth import load_users
+from utils.chat_export import EXPORT_FORMATS, chat_exporter, get_student_conversations
+from components.chat import render_export_download
 
 def render_teacher_dashboard():
     """Render teacher dashboard for monitoring student progress."""
@@ -307,6 +311,77 @@ def render_teacher_analytics():
             title="Student Performance Trends"
         )
         st.plotly_chart(fig_progress, use_container_width=True)
+    
+    render_chat_transcript_export()
+
+def render_chat_transcript_export():
+    """Render downloads of the class's chat transcripts, per student or class-wide."""
+    st.subheader("💬 Chat Transcripts")
+    
+    # The roster is read only when asked for, not on every dashboard render
+    if 'transcript_students' not in st.session_state:
+        if st.button("Load class transcripts", key="transcript_load"):
+            st.session_state.transcript_students = get_class_students(get_class_scope())
+            st.rerun()
+        return
+    
+    students = st.session_state.transcript_students
+    if not students:
+        st.info("No students in your class yet.")
+        return
+    
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        student = st.selectbox(
+            "Student:",
+            [None] + sorted(students),
+            format_func=lambda s: "All students" if s is None else s,
+            key="transcript_student"
+        )
+    with col2:
+        export_format = st.selectbox(
+            "Format:",
+            list(EXPORT_FORMATS),
+            format_func=lambda f: EXPORT_FORMATS[f]['label'],
+            key="transcript_format"
+        )
+    
+    # Conversations are listed only when an export is asked for, and kept
+    # with the selection they were listed for
+    selection = (student, export_format)
+    requested = st.session_state.get('transcript_export')
+    if requested and requested['selection'] != selection:
+        requested = None
+    
+    with col3:
+        if st.button("🔄 Refresh", key="transcript_refresh"):
+            del st.session_state.transcript_students
+            st.session_state.pop('transcript_export', None)
+            st.rerun()
+        if requested is None:
+            if st.button("📦 Prepare export", key="transcript_prepare"):
+                selected = sorted(students) if student is None else [student]
+                conversations = [c for name in selected for c in get_student_conversations(students[name], name)]
+                if conversations:
+                    chat_exporter.prepare(conversations, export_format)
+                st.session_state.transcript_export = {'selection': selection, 'conversations': conversations}
+                st.rerun()
+            return
+        conversations = requested['conversations']
+        if not conversations:
+            st.caption("No conversations yet.")
+            return
+        st.caption(f"{len(conversations)} conversations")
+        render_export_download(conversations, export_format, "📥 Download",
+                               f"chat_transcripts_{student or 'class'}", key="transcript_download")
+
+def get_class_students(scope):
+    """Get the students of a class scope, as {"name (email)": storage key}."""
+    students = {}
+    for email, user in load_users().items():
+        if user.get('role') == 'Student' and get_scope_of_institution(user.get('institution')) == scope:
+            students[f"{user.get('full_name') or email} ({email})"] = get_storage_key(email)
+    return students
 
 # Helper functions
 def get_assigned_students():
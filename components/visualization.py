@@ -3,6 +3,9 @@ import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 from datetime import datetime, timedelta
+from utils.material_library import get_material_length, get_material_word_count, get_material_line_count, get_material_preview, get_library_keyphrase_index
+from utils.keyphrases import get_class_keyphrase_index
+from utils.simple_auth import get_class_scope
 
 def render_analysis_results():
     """Render analysis and visualization of study materials."""
@@ -40,29 +43,37 @@ def render_overview_dashboard():
         st.info("Upload your study materials to see identified topics.")
         return
     
-    # Collect all topics from analyzed files
-    all_topics = []
+    # Candidate topics: the AI analysis topics plus each file's top keyphrases,
+    # ranked by how strongly the materials support them (TF-IDF)
+    index = get_library_keyphrase_index()
+    library_scores = index.score_phrases()
+    candidates = []
     for file in st.session_state.uploaded_files:
         analysis = file.get('analysis', {})
-        if 'key_topics' in analysis:
-            for i, topic in enumerate(analysis['key_topics'][:8]):  # Limit to 8 topics
-                # Calculate importance score based on position and frequency
-                importance_score = max(3, 10 - i)  # Topics earlier in list get higher scores
-                
-                # Calculate exam probability based on topic analysis
-                exam_probability = min(95, 60 + (importance_score * 3))
-                
-                # Estimate study hours based on topic complexity and content length
-                content_length = len(file.get('content', ''))
-                study_hours = max(1, min(8, (content_length // 2000) + (importance_score // 3)))
-                
-                all_topics.append({
-                    'topic': topic,
-                    'importance_score': importance_score,
-                    'exam_probability': exam_probability,
-                    'study_hours': study_hours,
-                    'source_file': file['name']
-                })
+        file_topics = list(analysis.get('key_topics', [])[:8])  # Limit to 8 topics
+        file_topics += [phrase.title() for phrase, _ in index.top_phrases(4, doc_ids=[file['name']])]
+        for topic in file_topics:
+            candidates.append((topic, index.score_topic(topic, library_scores), file))
+    
+    max_score = max((score for _, score, _ in candidates), default=0) or 1
+    all_topics = []
+    for topic, score, file in candidates:
+        importance_score = 3 + round(7 * score / max_score)
+        
+        # Calculate exam probability based on topic analysis
+        exam_probability = min(95, 60 + (importance_score * 3))
+        
+        # Estimate study hours based on topic complexity and content length
+        content_length = get_material_length(file)
+        study_hours = max(1, min(8, (content_length // 2000) + (importance_score // 3)))
+        
+        all_topics.append({
+            'topic': topic,
+            'importance_score': importance_score,
+            'exam_probability': exam_probability,
+            'study_hours': study_hours,
+            'source_file': file['name']
+        })
     
     if not all_topics:
         st.info("No topics identified yet. Process your files to see topic analysis.")
@@ -71,7 +82,7 @@ def render_overview_dashboard():
     # Group similar topics and sort by importance
     topic_groups = {}
     for topic_data in all_topics:
-        topic_name = topic_data['topic']
+        topic_name = topic_data['topic'].lower()
         if topic_name not in topic_groups:
             topic_groups[topic_name] = topic_data
         else:
@@ -119,8 +130,8 @@ def render_content_analysis():
     
     for file in st.session_state.uploaded_files:
         analysis = file.get('analysis', {})
-        content_length = len(file.get('content', ''))
-        word_count = len(file.get('content', '').split())
+        content_length = get_material_length(file)
+        word_count = get_material_word_count(file)
         
         # File-level metrics
         analysis_data.append({
@@ -288,62 +299,35 @@ def render_content_analysis():
 
 def render_word_frequency():
     """Render simplified and more meaningful text analysis."""
-    # Combine all content
-    all_text = ""
-    for file in st.session_state.uploaded_files:
-        all_text += file['content'] + " "
+    index = get_library_keyphrase_index()
     
-    if all_text.strip():
-        # Enhanced stop words list for better filtering
-        stop_words = {
-            'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 
-            'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 
-            'did', 'will', 'would', 'could', 'should', 'may', 'might', 'must', 'can', 'this', 'that', 
-            'these', 'those', 'it', 'its', 'they', 'them', 'their', 'we', 'our', 'you', 'your', 
-            'he', 'she', 'his', 'her', 'him', 'i', 'me', 'my', 'mine', 'from', 'into', 'through',
-            'during', 'before', 'after', 'above', 'below', 'up', 'down', 'out', 'off', 'over',
-            'under', 'again', 'further', 'then', 'once', 'here', 'there', 'when', 'where', 'why',
-            'how', 'all', 'any', 'both', 'each', 'few', 'more', 'most', 'other', 'some', 'such',
-            'no', 'nor', 'not', 'only', 'own', 'same', 'so', 'than', 'too', 'very', 'just', 'now'
-        }
-        
-        # Clean and filter words more effectively
-        words = all_text.lower().split()
-        filtered_words = []
-        
-        for word in words:
-            # Remove punctuation and clean word
-            clean_word = word.strip('.,!?;:"()[]{}+-=*/_\\|`~@#$%^&<>')
-            
-            # Keep only meaningful words (technical terms, concepts, etc.)
-            if (clean_word not in stop_words and 
-                len(clean_word) > 3 and 
-                clean_word.isalpha() and
-                not clean_word.isdigit()):
-                filtered_words.append(clean_word)
-        
-        # Count frequency
-        word_freq = {}
-        for word in filtered_words:
-            word_freq[word] = word_freq.get(word, 0) + 1
+    if len(index) > 0:
+        corpus = st.radio(
+            "Rank terms against",
+            ["My materials", "My class"],
+            horizontal=True,
+            key="keyphrase_corpus",
+            help="Terms common across the comparison corpus rank lower than terms specific to your materials."
+        )
+        idf_index = get_class_keyphrase_index(get_class_scope()) if corpus == "My class" else None
         
-        # Get top 10 key terms (reduced from 20 for clarity)
-        top_words = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:10]
+        # Top 10 keyphrases by TF-IDF
+        top_phrases = index.top_phrases(10, idf_index=idf_index)
         
-        if top_words:
+        if top_phrases:
             col1, col2 = st.columns(2)
             
             with col1:
                 st.subheader("🔑 Key Terms")
-                words_df = pd.DataFrame(top_words, columns=['Term', 'Frequency'])
+                words_df = pd.DataFrame(top_phrases, columns=['Term', 'Score'])
                 
                 fig_words = px.bar(
                     words_df,
-                    x='Frequency',
+                    x='Score',
                     y='Term',
                     orientation='h',
                     title="Most Important Study Terms",
-                    color='Frequency',
+                    color='Score',
                     color_continuous_scale='Blues'
                 )
                 fig_words.update_layout(
@@ -355,19 +339,19 @@ def render_word_frequency():
             with col2:
                 st.subheader("📈 Term Relevance")
                 
-                # Calculate relevance scores
-                max_freq = max([freq for _, freq in top_words])
+                # Relevance is the TF-IDF score relative to the top term
+                max_score = top_phrases[0][1]
                 relevance_data = []
                 
-                for term, freq in top_words:
-                    relevance_score = (freq / max_freq) * 100
+                for term, score in top_phrases:
+                    relevance_score = (score / max_score) * 100
                     category = "High Priority" if relevance_score > 70 else "Medium Priority" if relevance_score > 40 else "Low Priority"
                     
                     relevance_data.append({
                         'Term': term,
                         'Relevance': relevance_score,
                         'Category': category,
-                        'Frequency': freq
+                        'Frequency': index.phrase_count(term)
                     })
                 
                 relevance_df = pd.DataFrame(relevance_data)
@@ -423,7 +407,7 @@ def generate_study_insights():
         return insights
     
     # Content length insights
-    total_content = sum(len(file['content']) for file in st.session_state.uploaded_files)
+    total_content = sum(get_material_length(file) for file in st.session_state.uploaded_files)
     avg_reading_time = total_content / 200  # Assuming 200 words per minute
     
     insights.append({
@@ -477,10 +461,9 @@ def render_detailed_reports():
                 st.markdown("**File Statistics:**")
                 st.write(f"• **Size:** {file.get('size', 'Unknown')} bytes")
                 st.write(f"• **Type:** {file.get('type', 'Unknown')}")
-                st.write(f"• **Characters:** {len(file['content']):,}")
-                st.write(f"• **Words:** {len(file['content'].split()):,}")
-                newline_char = '\n'
-                st.write(f"• **Lines:** {len(file['content'].split(newline_char)):,}")
+                st.write(f"• **Characters:** {get_material_length(file):,}")
+                st.write(f"• **Words:** {get_material_word_count(file):,}")
+                st.write(f"• **Lines:** {get_material_line_count(file):,}")
             
             with col2:
                 analysis = file.get('analysis', {})
@@ -506,8 +489,8 @@ def render_detailed_reports():
             
             # Content preview
             st.markdown("**Content Preview:**")
-            preview_text = file['content'][:500]
-            if len(file['content']) > 500:
+            preview_text = get_material_preview(file, 500)
+            if get_material_length(file) > 500:
                 preview_text += "..."
             st.text_area(
                 "Content",
@@ -1,11 +1,15 @@
 import streamlit as st
-from components.file_upload import render_file_upload
+from components.file_upload import render_file_upload, restore_material_library
 from components.chat import render_chat_interface
+from components.quiz import render_quiz
 from components.visualization import render_analysis_results
 from components.progress_analytics import render_progress_analytics
 from components.simple_auth import render_simple_auth
 from utils.progress_tracker import ProgressTracker
-from utils.simple_auth import is_authenticated, get_current_user
+from utils.analysis_store import AnalysisStore
+from utils.model_router import get_route_stats
+from utils.ai_models import test_ai_connection
+from utils.simple_auth import is_authenticated, get_current_user, get_user_id, get_user_storage_key
 import os
 
 # Configure Streamlit page
@@ -25,12 +29,14 @@ def initialize_session_state():
     if 'chat_history' not in st.session_state:
         st.session_state.chat_history = []
     if 'analyzed_data' not in st.session_state:
-        st.session_state.analyzed_data = []
+        st.session_state.analyzed_data = AnalysisStore()
     if 'uploaded_files' not in st.session_state:
         st.session_state.uploaded_files = []
     if 'error_log' not in st.session_state:
         st.session_state.error_log = []
-    if 'progress_tracker' not in st.session_state:
+    # Rebuilt when the login changes, so progress is always the current user's
+    tracker = st.session_state.get('progress_tracker')
+    if tracker is None or tracker.owner_key != get_user_storage_key() or tracker.user_id != get_user_id():
         st.session_state.progress_tracker = ProgressTracker()
     if 'api_configured' not in st.session_state:
         st.session_state.api_configured = False
@@ -82,6 +88,12 @@ def render_api_configuration():
                 help="Get your API key from https://platform.openai.com/api-keys"
             )
 
+        model_routing = st.checkbox(
+            "Route simple questions to a faster, cheaper model",
+            value=st.session_state.get('model_routing', True),
+            help="Greetings and quick definitions use gemini-1.5-flash or gpt-4o-mini first and escalate to your selected model when needed."
+        )
+
         submit_button = st.form_submit_button("Configure API", type="primary")
 
         if submit_button:
@@ -90,10 +102,18 @@ def render_api_configuration():
                 st.session_state.api_key = api_key
                 st.session_state.model_provider = model_provider
                 st.session_state.model_version = model_version
+                st.session_state.model_routing = model_routing
                 st.session_state.api_configured = True
                 st.session_state.selected_model = f"{model_provider} - {model_version}"
-                st.success(f"API configured successfully! Using {model_provider} - {model_version}")
-                st.rerun()
+
+                # Validate the key with a cheap metadata lookup before continuing
+                ok, message = test_ai_connection()
+                if ok:
+                    st.success(f"API configured successfully! Using {model_provider} - {model_version}")
+                    st.rerun()
+                else:
+                    st.session_state.api_configured = False
+                    st.error(message)
             else:
                 st.error("Please enter your API key.")
 
@@ -119,10 +139,23 @@ def main():
         render_api_configuration()
         return
 
+    # Restore the user's saved materials (metadata only)
+    restore_material_library()
+
     # Show current configuration and user info
     with st.sidebar:
         st.success(f"✅ Using: {st.session_state.selected_model}")
 
+        # Per-route model usage for this session
+        route_stats = get_route_stats()
+        if route_stats:
+            with st.expander("📊 Model Usage"):
+                for route, data in route_stats.items():
+                    st.markdown(
+                        f"**{route.title()}** ({data['model']}): {data['calls']} calls, "
+                        f"{data['avg_latency']:.1f}s avg, ${data['total_cost']:.4f}"
+                    )
+
         # User info
         user_info = get_current_user()
         if user_info:
@@ -133,6 +166,13 @@ def main():
 
         st.markdown("---")
 
+        if st.button("🔌 Test Connection"):
+            ok, message = test_ai_connection()
+            if ok:
+                st.success(message)
+            else:
+                st.error(message)
+
         if st.button("Change API Configuration"):
             st.session_state.api_configured = False
             st.rerun()
@@ -143,9 +183,10 @@ def main():
 
     try:
         # Create tabs for different functionalities
-        tab1, tab2, tab3, tab4 = st.tabs([
+        tab1, tab2, tab3, tab4, tab5 = st.tabs([
             "📤 Upload Materials",
             "💬 Chat Assistant", 
+            "🧠 Quiz",
             "📊 Analysis",
             "📈 Progress Tracking"
         ])
@@ -160,12 +201,18 @@ def main():
                 render_chat_interface()
 
         with tab3:
+            if not st.session_state.uploaded_files:
+                st.info("Please upload study materials first to quiz yourself on them.")
+            else:
+                render_quiz()
+
+        with tab4:
             if not st.session_state.analyzed_data:
                 st.info("Upload your study materials to see detailed analysis.")
             else:
                 render_analysis_results()
 
-        with tab4:
+        with tab5:
             render_progress_analytics(st.session_state.progress_tracker)
 
     except Exception as e:
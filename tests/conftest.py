@@ -0,0 +1,32 @@
+import pytest
+import utils.progress_tracker as progress_tracker_module
+from utils.conversation_store import ConversationStore
+from utils.quiz_engine import QuizEngine
+from utils.spaced_repetition import ReviewStore
+from utils.task_store import TaskStore
+
+@pytest.fixture
+def conversation_store(tmp_path):
+    return ConversationStore(str(tmp_path / "conversations.db"))
+
+@pytest.fixture
+def task_store(tmp_path):
+    return TaskStore(str(tmp_path / "study_tasks.db"))
+
+@pytest.fixture
+def quiz_engine(tmp_path):
+    return QuizEngine(str(tmp_path / "quizzes.db"))
+
+@pytest.fixture
+def review_store(tmp_path):
+    return ReviewStore(str(tmp_path / "reviews.db"))
+
+@pytest.fixture
+def tracker_env(tmp_path, monkeypatch, conversation_store, task_store, quiz_engine, review_store):
+    """Run ProgressTracker against temporary stores and progress files."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(progress_tracker_module, 'conversation_store', conversation_store)
+    monkeypatch.setattr(progress_tracker_module, 'task_store', task_store)
+    monkeypatch.setattr(progress_tracker_module, 'quiz_engine', quiz_engine)
+    monkeypatch.setattr(progress_tracker_module, 'review_store', review_store)
+    return tmp_path
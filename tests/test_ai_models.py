@@ -0,0 +1,18 @@
+from utils.ai_models import OpenAIClient, build_materials_digest
+
+def test_materials_digest_follows_the_analysis():
+    material = {'name': "notes.pdf", 'content_preview': "Cells and membranes", 'analysis': None}
+    assert "Summary:" not in build_materials_digest([material])
+
+    analyzed = {**material, 'analysis': {'summary': "All about cells", 'key_topics': ["osmosis"]}}
+    digest = build_materials_digest([analyzed])
+    assert "Summary: All about cells" in digest
+    assert "Key topics: osmosis" in digest
+
+def test_openai_clients_are_shared_per_api_key():
+    first = OpenAIClient("sk-test-one", "gpt-4o")
+    cheap = OpenAIClient("sk-test-one", "gpt-4o-mini")
+    other = OpenAIClient("sk-test-two", "gpt-4o")
+
+    assert first.client is cheap.client
+    assert first.client is not other.client
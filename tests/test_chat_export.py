@@ -0,0 +1,68 @@
+import json
+import os
+import re
+import pytest
+import utils.chat_export as chat_export_module
+from utils.chat_export import ChatExporter, PDF_LINES_PER_PAGE
+
+@pytest.fixture
+def exporter(tmp_path, monkeypatch, conversation_store):
+    monkeypatch.setattr(chat_export_module, 'conversation_store', conversation_store)
+    return ChatExporter(cache_dir=str(tmp_path / "export_cache"))
+
+def make_conversation(conversation_store, messages):
+    conversation_id = conversation_store.create_conversation('user')
+    for i, content in enumerate(messages):
+        conversation_store.append_message(conversation_id, 'user' if i % 2 == 0 else 'assistant', content)
+    return conversation_store.get_conversation(conversation_id)
+
+def test_export_is_rebuilt_when_the_conversation_changes(exporter, conversation_store):
+    conversation = make_conversation(conversation_store, ["What is NIS?", "NIS is..."])
+    path = exporter.get_export_path([conversation], 'jsonl')
+    assert exporter.get_export_path([conversation], 'jsonl') == path
+
+    conversation_store.append_message(conversation['id'], 'user', "And DNS?")
+    conversation = conversation_store.get_conversation(conversation['id'])
+    new_path = exporter.get_export_path([conversation], 'jsonl')
+
+    assert new_path != path
+    assert not os.path.exists(path)
+    with open(new_path, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert [record['content'] for record in records] == ["What is NIS?", "NIS is...", "And DNS?"]
+
+def test_export_is_only_built_when_requested(exporter, conversation_store):
+    conversation = make_conversation(conversation_store, ["What is NIS?"])
+    assert exporter.get_ready_path([conversation], 'markdown') is None
+    assert not exporter.is_building([conversation], 'markdown')
+
+    path = exporter.prepare([conversation], 'markdown').result()
+
+    assert exporter.get_ready_path([conversation], 'markdown') == path
+    assert not exporter.is_building([conversation], 'markdown')
+
+def test_markdown_export_labels_students(exporter, conversation_store):
+    conversations = [make_conversation(conversation_store, [f"Question {i}"]) for i in range(2)]
+    for conversation, student in zip(conversations, ["Ann", "Bo"]):
+        conversation['student'] = student
+
+    with open(exporter.get_export_path(conversations, 'markdown'), encoding='utf-8') as f:
+        text = f.read()
+    assert "## Ann: Question 0" in text
+    assert "**You:** Question 1" in text
+
+def test_pdf_export_is_well_formed(exporter, conversation_store):
+    long_answer = "\n".join(f"Line {i} (with \\ and é)" for i in range(PDF_LINES_PER_PAGE * 2))
+    conversation = make_conversation(conversation_store, ["What is NIS?", long_answer])
+
+    with open(exporter.get_export_path([conversation], 'pdf'), 'rb') as f:
+        data = f.read()
+
+    assert data.startswith(b"%PDF-1.4") and data.endswith(b"%%EOF\n")
+    startxref = int(re.search(rb"startxref\n(\d+)", data).group(1))
+    assert data[startxref:].startswith(b"xref")
+    offsets = [int(offset) for offset in re.findall(rb"(\d{10}) 00000 n", data)]
+    for number, offset in enumerate(offsets, start=1):
+        assert data[offset:].startswith(f"{number} 0 obj".encode('ascii'))
+    page_count = int(re.search(rb"/Type /Pages /Kids \[[^\]]*\] /Count (\d+)", data).group(1))
+    assert page_count == len(re.findall(rb"/Type /Page ", data)) >= 3
@@ -0,0 +1,49 @@
+import pytest
+import threading
+
+def test_concurrent_appends_get_consecutive_numbers(conversation_store):
+    conversation_id = conversation_store.create_conversation('user')
+    errors = []
+
+    def append(worker):
+        try:
+            for i in range(10):
+                conversation_store.append_message(conversation_id, 'user', f"{worker}-{i}")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=append, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert conversation_store.get_conversation(conversation_id)['message_count'] == 40
+    assert [m['seq'] for m in conversation_store.iter_messages(conversation_id)] == list(range(40))
+
+def test_messages_are_numbered_and_paged(conversation_store):
+    conversation_id = conversation_store.create_conversation('user')
+    for i in range(5):
+        message = conversation_store.append_message(conversation_id, 'user' if i % 2 == 0 else 'assistant', f"m{i}")
+        assert message['seq'] == i
+
+    latest = conversation_store.get_messages(conversation_id, limit=2)
+    assert [m['content'] for m in latest] == ["m3", "m4"]
+    older = conversation_store.get_messages(conversation_id, limit=2, before_seq=latest[0]['seq'])
+    assert [m['content'] for m in older] == ["m1", "m2"]
+    assert [m['seq'] for m in conversation_store.iter_messages(conversation_id, batch_size=2)] == list(range(5))
+    assert conversation_store.get_conversation(conversation_id)['title'] == "m0"
+
+def test_long_messages_round_trip_compressed(conversation_store):
+    conversation_id = conversation_store.create_conversation('user')
+    text = "Osmosis moves water across membranes. " * 50
+    conversation_store.append_message(conversation_id, 'assistant', text, sources=[{'name': "notes.pdf", 'page': 2}])
+
+    message = conversation_store.get_message(conversation_id, 0)
+    assert message['content'] == text
+    assert message['sources'] == [{'name': "notes.pdf", 'page': 2}]
+
+def test_unknown_conversation_is_rejected(conversation_store):
+    with pytest.raises(ValueError):
+        conversation_store.append_message('missing', 'user', "hello")
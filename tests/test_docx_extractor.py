@@ -0,0 +1,55 @@
+import io
+import zipfile
+from utils.extractors import docx
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+STYLES = f"""<?xml version="1.0" encoding="UTF-8"?>
+<w:styles xmlns:w="{W_NS}">
+  <w:style w:type="paragraph" w:styleId="berschrift1"><w:name w:val="heading 1"/></w:style>
+  <w:style w:type="paragraph" w:styleId="Sub"><w:name w:val="Subsection"/><w:pPr><w:outlineLvl w:val="1"/></w:pPr></w:style>
+</w:styles>"""
+
+DOCUMENT = f"""<?xml version="1.0" encoding="UTF-8"?>
+<w:document xmlns:w="{W_NS}">
+  <w:body>
+    <w:p><w:pPr><w:pStyle w:val="berschrift1"/></w:pPr><w:r><w:t>Cell   biology</w:t></w:r></w:p>
+    <w:p><w:r><w:t xml:space="preserve">Cells are the </w:t></w:r><w:r><w:t>unit of life.</w:t></w:r></w:p>
+    <w:p><w:pPr><w:pStyle w:val="Sub"/></w:pPr><w:r><w:t>Organelles</w:t></w:r></w:p>
+    <w:tbl>
+      <w:tr>
+        <w:tc><w:p><w:r><w:t>Organelle</w:t></w:r></w:p></w:tc>
+        <w:tc><w:p><w:r><w:t>Role</w:t></w:r></w:p></w:tc>
+      </w:tr>
+      <w:tr>
+        <w:tc><w:p><w:r><w:t>Ribosome</w:t></w:r></w:p></w:tc>
+        <w:tc><w:p><w:r><w:t>Protein</w:t></w:r><w:r><w:tab/><w:t>synthesis</w:t></w:r></w:p></w:tc>
+      </w:tr>
+    </w:tbl>
+    <w:p><w:pPr><w:numPr><w:ilvl w:val="0"/><w:numId w:val="1"/></w:numPr></w:pPr><w:r><w:t>Mitochondria make ATP</w:t></w:r></w:p>
+    <w:p><w:r><w:t>   </w:t></w:r></w:p>
+  </w:body>
+</w:document>"""
+
+def make_docx(document=DOCUMENT, styles=STYLES):
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, 'w') as archive:
+        archive.writestr('word/document.xml', document)
+        if styles is not None:
+            archive.writestr('word/styles.xml', styles)
+    data.seek(0)
+    return data
+
+def test_headings_tables_and_lists_are_extracted():
+    assert docx.extract(make_docx()) == (
+        "# Cell biology\n\n"
+        "Cells are the unit of life.\n\n"
+        "## Organelles\n\n"
+        "Organelle\n\nRole\n\n"
+        "Ribosome\n\nProtein synthesis\n\n"
+        "- Mitochondria make ATP"
+    )
+
+def test_builtin_heading_styles_are_used_without_styles_xml():
+    document = DOCUMENT.replace('berschrift1', 'Heading2')
+    assert docx.extract(make_docx(document, styles=None)).startswith("## Cell biology\n\n")
@@ -0,0 +1,73 @@
+import random
+import pytest
+import utils.duplicates as duplicates_module
+from utils.duplicates import find_duplicate, fingerprint_text, register_fingerprint
+from utils.material_library import MaterialLibrary
+from utils.minhash import LSHIndex, MinHasher, char_shingles
+
+VOCABULARY = [f"word{i}" for i in range(500)]
+
+def make_text(seed, words=300):
+    rng = random.Random(seed)
+    return ' '.join(rng.choice(VOCABULARY) for _ in range(words))
+
+def edit_words(text, count):
+    words = text.split()
+    for i in range(0, count * 40, 40):
+        words[i] = "changed"
+    return ' '.join(words)
+
+@pytest.fixture
+def library_env(tmp_path, monkeypatch):
+    """Run against empty duplicate indexes and a temporary library directory."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(duplicates_module, '_user_indexes', {})
+    monkeypatch.setattr(duplicates_module, '_class_indexes', {})
+
+def add_material(owner_key, scope, content_id, text):
+    signature = fingerprint_text(text)
+    MaterialLibrary(owner_key).add_material(content_id, f"{content_id}.txt", len(text), 'text/plain', text,
+                                            {'summary': content_id}, fingerprint=signature)
+    register_fingerprint(owner_key, scope, content_id, f"{content_id}.txt", signature)
+
+def test_near_duplicate_is_found_and_distinct_text_is_not(library_env):
+    original = make_text(1)
+    add_material('alice', 'school', 'original', original)
+
+    match = find_duplicate(fingerprint_text(edit_words(original, 2)), 'alice')
+    assert match['content_id'] == 'original'
+    assert match['similarity'] >= duplicates_module.DUPLICATE_THRESHOLD
+    assert match['analysis'] == {'summary': 'original'}
+    assert not match['shared']
+
+    assert find_duplicate(fingerprint_text(make_text(2)), 'alice') is None
+
+def test_matches_are_scoped_to_the_user_and_their_class(library_env):
+    original = make_text(1)
+    add_material('alice', 'school', 'original', original)
+    signature = fingerprint_text(edit_words(original, 2))
+
+    # Another user sees it only through a shared class
+    assert find_duplicate(signature, 'bob') is None
+    assert find_duplicate(signature, 'bob', scope='other-school') is None
+    match = find_duplicate(signature, 'bob', scope='school')
+    assert match['owner_key'] == 'alice'
+    assert match['shared']
+
+def test_a_material_does_not_match_itself(library_env):
+    text = make_text(1)
+    add_material('alice', 'school', 'original', text)
+
+    assert find_duplicate(fingerprint_text(text), 'alice', exclude='original') is None
+
+def test_short_texts_have_no_fingerprint():
+    assert fingerprint_text("too short to compare") is None
+
+def test_lsh_finds_similar_short_texts():
+    hasher = MinHasher()
+    index = LSHIndex()
+    index.add('mitosis', hasher.signature(char_shingles("what happens during mitosis")))
+    index.add('dns', hasher.signature(char_shingles("how does dns resolution work")))
+
+    assert 'mitosis' in index.query(hasher.signature(char_shingles("what happens during mitosis?")))
+    assert 'dns' not in index.query(hasher.signature(char_shingles("what happens during mitosis?")))
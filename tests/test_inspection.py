@@ -0,0 +1,72 @@
+import io
+import zipfile
+from utils.extractors.inspection import inspect_upload
+from utils.file_processor import FileProcessor, MAX_PAGES
+
+class Upload(io.BytesIO):
+    """Minimal stand-in for a Streamlit UploadedFile."""
+
+    def __init__(self, name, data, type=''):
+        super().__init__(data)
+        self.name = name
+        self.type = type
+        self.size = len(data)
+
+def make_pdf(pages):
+    return b"%PDF-1.4\n1 0 obj\n<< /Type /Pages /Kids [] /Count " + str(pages).encode() + b" >>\nendobj\n%%EOF\n"
+
+def make_zip(members):
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return data.getvalue()
+
+def test_content_wins_over_a_spoofed_extension():
+    upload = Upload('notes.docx', make_pdf(3), 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
+
+    info = FileProcessor().inspect_file(upload)
+
+    assert info['format'] == 'pdf'
+    assert info['claimed_format'] == 'docx'
+    assert info['pages'] == 3
+    assert info['valid']
+    assert "detected PDF content despite the .docx name" in info['message']
+    assert upload.tell() == 0
+
+def test_a_claimed_format_that_does_not_match_is_rejected():
+    info = FileProcessor().inspect_file(Upload('slides.pptx', b"\x00\x01 not a zip"))
+
+    assert not info['valid']
+    assert info['message'] == "The file does not look like a valid PPTX file"
+
+def test_pdf_over_the_page_limit_is_rejected():
+    upload = Upload('book.pdf', make_pdf(MAX_PAGES + 1), 'application/pdf')
+
+    info = FileProcessor().inspect_file(upload)
+
+    assert info['pages'] == MAX_PAGES + 1
+    assert not info['valid']
+    assert info['message'].startswith("Too many pages")
+
+def test_high_compression_ratio_zip_is_rejected():
+    data = make_zip({
+        '[Content_Types].xml': '<Types/>',
+        'word/document.xml': ' ' * (20 * 1024 * 1024)
+    })
+    upload = Upload('bomb.docx', data)
+
+    info = FileProcessor().inspect_file(upload)
+
+    assert info['format'] == 'docx'
+    assert info['uncompressed_size'] > 100 * len(data)
+    assert not info['valid']
+    assert info['message'] == "The archive expands to an unreasonable size and was rejected"
+
+def test_ordinary_docx_is_estimated_from_the_central_directory():
+    data = make_zip({'[Content_Types].xml': '<Types/>', 'word/document.xml': 'x' * 600})
+
+    info = inspect_upload(Upload('notes.docx', data))
+
+    assert info['format'] == 'docx'
+    assert info['estimated_chars'] == 100
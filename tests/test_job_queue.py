@@ -0,0 +1,31 @@
+import json
+import time
+from utils.job_queue import JOB_COMPLETED, JOB_RUNNING, AnalysisJobQueue
+
+def add_job(queue, job_id, status, updated_at):
+    with queue._connection() as conn:
+        conn.execute(
+            "INSERT INTO jobs (id, user_id, filename, status, result, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, 'u', f"{job_id}.pdf", status, json.dumps({'analysis': {}}), updated_at, updated_at)
+        )
+
+def test_collected_jobs_drop_their_result(tmp_path):
+    queue = AnalysisJobQueue(str(tmp_path / "jobs.db"))
+    add_job(queue, 'done', JOB_COMPLETED, time.time())
+
+    assert not queue.list_jobs('u')[0]['collected']
+    queue.mark_collected('done')
+
+    assert queue.list_jobs('u')[0]['collected']
+    assert queue.get_job('done')['result'] is None
+
+def test_purge_keeps_recent_and_running_jobs(tmp_path):
+    queue = AnalysisJobQueue(str(tmp_path / "jobs.db"))
+    old = time.time() - 30 * 24 * 60 * 60
+    add_job(queue, 'old', JOB_COMPLETED, old)
+    add_job(queue, 'recent', JOB_COMPLETED, time.time())
+    add_job(queue, 'stuck', JOB_RUNNING, old)
+
+    queue.purge_jobs()
+
+    assert {job['id'] for job in queue.list_jobs('u')} == {'recent', 'stuck'}
@@ -0,0 +1,24 @@
+from utils.keyphrases import KeyphraseIndex
+
+def test_rank_against_another_index():
+    index = KeyphraseIndex()
+    index.add_document('a', {'osmosis': 4, 'cell membrane': 2, 'water': 1})
+    index.add_document('b', {'mitosis': 3, 'water': 2})
+    class_index = KeyphraseIndex()
+    class_index.add_document('x', {'water': 1, 'osmosis': 1})
+    class_index.add_document('y', {'water': 1})
+
+    phrases = [phrase for phrase, _ in index.top_phrases(4, idf_index=class_index)]
+    assert phrases[0] in ('cell membrane', 'mitosis')
+    assert phrases[-1] == 'water'
+    assert index.score_topic("Osmosis", index.score_phrases()) > 0
+
+def test_removed_phrases_free_their_columns():
+    index = KeyphraseIndex(max_documents=2)
+    for i in range(200):
+        index.add_document(f"doc{i}", {f"phrase {i} {j}": 1 for j in range(10)})
+
+    assert len(index) == 2
+    assert len(index.vocabulary.ids) == 20
+    assert len(index.tf_sum) <= 64
+    assert {phrase for phrase, _ in index.top_phrases(5)} <= {f"phrase 199 {j}" for j in range(10)} | {f"phrase 198 {j}" for j in range(10)}
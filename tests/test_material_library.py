@@ -0,0 +1,30 @@
+from utils.material_library import MaterialLibrary, get_material_line_count, material_to_file_data
+from utils.text_analysis import top_phrase_frequencies
+
+def test_top_phrases_keep_only_the_most_frequent():
+    text = "Mitochondria. Mitochondria. Mitochondria. Ribosome. Ribosome. Nucleus."
+    assert top_phrase_frequencies(text, limit=2) == {'mitochondria': 3, 'ribosome': 2}
+
+def test_line_count_and_phrases_are_stored_at_analysis_time(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    text = "Cell biology\nMitochondria make energy.\nMitochondria divide."
+    MaterialLibrary('alice').add_material('abc', 'notes.txt', len(text), 'text/plain', text, {})
+
+    file_data = material_to_file_data(MaterialLibrary('alice').get_material('abc'))
+
+    assert file_data['phrase_frequencies']['mitochondria'] == 2
+    # Answered from the stored count; the text is never loaded
+    assert get_material_line_count(file_data) == 3
+    assert 'text_handle' not in file_data
+
+def test_sessions_merge_their_index_updates(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    first_session = MaterialLibrary('alice')
+    second_session = MaterialLibrary('alice')
+
+    first_session.add_material('one', 'one.txt', 3, 'text/plain', "one", {})
+    second_session.add_material('two', 'two.txt', 3, 'text/plain', "two", {})
+    first_session.remove_material('missing')
+
+    assert set(MaterialLibrary('alice').index) == {'one', 'two'}
+    assert set(first_session.index) == {'one', 'two'}
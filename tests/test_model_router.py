@@ -0,0 +1,46 @@
+import asyncio
+from utils.ai_models import AIClient
+from utils.model_router import ModelRouter
+
+CONFIDENT = "NIS is the network information service used to share configuration."
+
+class FakeClient(AIClient):
+    provider_name = "Fake"
+    api_key_hash = "key"
+
+    def __init__(self, model_name, response, delay=0.0):
+        self.model_name = model_name
+        self.response = response
+        self.delay = delay
+        self.calls = 0
+
+    async def agenerate(self, question, context, chat_history):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response
+
+def hedged(router, question="What is NIS?"):
+    return asyncio.run(router.agenerate_hedged(question, {}, [], hedge_delay=0.05))
+
+def test_fast_cheap_answer_is_not_hedged():
+    cheap, large = FakeClient("cheap", CONFIDENT), FakeClient("large", "large answer")
+    assert hedged(ModelRouter("Fake", large, cheap)) == CONFIDENT
+    assert large.calls == 0
+
+def test_slow_cheap_model_is_hedged_by_the_large_one():
+    cheap, large = FakeClient("cheap", CONFIDENT, delay=1.0), FakeClient("large", "large answer")
+    router = ModelRouter("Fake", large, cheap)
+    assert hedged(router) == "large answer"
+    assert [r['hedged'] for r in router.route_records] == [True]
+
+def test_unconfident_cheap_answer_escalates():
+    cheap, large = FakeClient("cheap", "I'm not sure."), FakeClient("large", "large answer")
+    router = ModelRouter("Fake", large, cheap)
+    assert hedged(router) == "large answer"
+    assert router.route_records[-1]['escalated']
+
+def test_unconfident_cheap_answer_is_kept_if_the_large_model_fails():
+    cheap, large = FakeClient("cheap", "I'm not sure."), FakeClient("large", RuntimeError("down"))
+    assert hedged(ModelRouter("Fake", large, cheap)) == "I'm not sure."
@@ -0,0 +1,45 @@
+import random
+import pytest
+from utils.extractors.normalizer import PAGE_BREAK, TextNormalizer, normalize_pages
+
+SAMPLES = [
+    "Line one\r\nLine two\r\n\r\n\r\nNew paragraph",
+    "  words   with \t\t runs    of  spaces  \n  and   indented lines  ",
+    "First page text\r\n\fSecond page\r\n\r\n\f\fFourth page",
+    "a\r\rb\r\n\r\nc    d e\x00f\x07g",
+    "\n\n  leading blank lines\n\n\n\n\ntrailing   \r\n  \r\n",
+]
+
+def normalize_in_chunks(text, boundaries):
+    normalizer = TextNormalizer()
+    cuts = [0, *sorted(boundaries), len(text)]
+    parts = [normalizer.feed(text[start:end]) for start, end in zip(cuts, cuts[1:])]
+    parts.append(normalizer.finish())
+    return ''.join(parts)
+
+def normalize_whole(text):
+    normalizer = TextNormalizer()
+    return normalizer.feed(text) + normalizer.finish()
+
+@pytest.mark.parametrize('text', SAMPLES)
+def test_every_single_split_matches_the_whole_text(text):
+    expected = normalize_whole(text)
+    for cut in range(len(text) + 1):
+        assert normalize_in_chunks(text, [cut]) == expected, cut
+
+def test_random_chunk_boundaries_match_the_whole_text():
+    rng = random.Random(37)
+    alphabet = ['a', 'b', ' ', ' ', '\t', '\r', '\n', '\r\n', '\f', ' ', 'word']
+    for _ in range(300):
+        text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+        boundaries = [rng.randint(0, len(text)) for _ in range(rng.randint(1, 8))]
+        assert normalize_in_chunks(text, boundaries) == normalize_whole(text), repr(text)
+
+def test_crlf_split_across_chunks_is_one_line_break():
+    assert normalize_in_chunks("one\r\ntwo", [4]) == "one\ntwo"
+
+def test_whitespace_is_collapsed():
+    assert normalize_whole("  a \t  b \n\n\n\n c  ") == "a b\n\nc"
+
+def test_pages_are_joined_with_page_breaks():
+    assert normalize_pages(["first \n", "\n second"]) == f"first{PAGE_BREAK}second"
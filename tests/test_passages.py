@@ -0,0 +1,43 @@
+from utils.passages import PostingsCache, chunk_text, search_passages
+
+TEXT = (
+    "# Cells\n\nMitochondria produce energy for the cell through respiration.\n\n"
+    "# Plants\n\nChloroplasts capture light energy during photosynthesis."
+)
+
+def test_postings_are_built_once_per_text():
+    cache = PostingsCache()
+    index = chunk_text(TEXT)
+    loads = []
+
+    def load_text():
+        loads.append(1)
+        return TEXT
+
+    first = cache.get('text-key', index, load_text)
+    second = cache.get('text-key', chunk_text(TEXT), load_text)
+
+    assert first is second
+    assert len(loads) == 1
+
+def test_least_recently_used_postings_are_evicted():
+    index = chunk_text(TEXT)
+    size = sum(len(entries) for entries in index.build_postings(TEXT).values())
+    cache = PostingsCache(max_entries=2 * size)
+
+    cache.get('a', index, lambda: TEXT)
+    cache.get('b', index, lambda: TEXT)
+    cache.get('a', index, lambda: TEXT)
+    cache.get('c', index, lambda: TEXT)
+
+    assert list(cache.postings) == ['a', 'c']
+    assert cache.cached_entries == 2 * size
+
+def test_search_ranks_the_matching_passage_first():
+    index = chunk_text(TEXT)
+    postings = PostingsCache().get('text-key', index, lambda: TEXT)
+
+    results = search_passages('photosynthesis light', {'notes': index}, {'notes': postings})
+
+    assert results[0][:2] == ('notes', 1)
+    assert len(results) == 1
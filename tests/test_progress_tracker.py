@@ -0,0 +1,120 @@
+import json
+import pytest
+from utils.progress_tracker import ProgressTracker
+
+def write_progress(path, **data):
+    base = {'sessions': [], 'chat_interactions': [], 'file_uploads': [], 'total_study_time': 0}
+    base.update(data)
+    path.write_text(json.dumps(base))
+
+LEGACY_CHAT = [
+    {'timestamp': 100.0, 'question': "What is NIS?", 'response': "NIS is...", 'question_length': 12,
+     'response_length': 9, 'date': '2025-06-02'},
+    {'timestamp': 200.0, 'question': "And DNS?", 'response': "DNS is...", 'question_length': 8,
+     'response_length': 9, 'date': '2025-06-02'}
+]
+
+def test_chat_transcripts_move_to_the_owners_conversations(tracker_env, conversation_store):
+    write_progress(tracker_env / "progress_s1.json", chat_interactions=LEGACY_CHAT)
+
+    tracker = ProgressTracker('s1', owner_key='owner')
+
+    interactions = tracker.data['chat_interactions']
+    assert all('question' not in i and 'response' not in i for i in interactions)
+    assert tracker.get_chat_transcript(interactions[1]) == ("And DNS?", "DNS is...")
+    assert conversation_store.get_latest_conversation('owner')['message_count'] == 4
+    saved = json.loads((tracker_env / "progress_s1.json").read_text())
+    assert 'question' not in saved['chat_interactions'][0]
+
+def test_interrupted_chat_migration_does_not_duplicate(tracker_env, conversation_store, monkeypatch):
+    write_progress(tracker_env / "progress_s1.json", chat_interactions=LEGACY_CHAT)
+
+    append = conversation_store.append_message
+    calls = []
+    def failing_append(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 3:
+            raise RuntimeError("crash")
+        return append(*args, **kwargs)
+    monkeypatch.setattr(conversation_store, 'append_message', failing_append)
+    with pytest.raises(RuntimeError):
+        ProgressTracker('s1', owner_key='owner')
+    monkeypatch.setattr(conversation_store, 'append_message', append)
+
+    tracker = ProgressTracker('s1', owner_key='owner')
+
+    conversations = conversation_store.list_conversations('owner')
+    assert len(conversations) == 1
+    assert conversations[0]['message_count'] == 4
+    assert tracker.get_chat_transcript(tracker.data['chat_interactions'][1]) == ("And DNS?", "DNS is...")
+
+QUIZ_QUESTIONS = [
+    {'question': "What is NIS?", 'options': ["a", "b"], 'answer': 0, 'explanation': ''},
+    {'question': "What is DNS?", 'options': ["a", "b"], 'answer': 1, 'explanation': ''},
+    {'question': "What is NFS?", 'options': ["a", "b"], 'answer': 0, 'explanation': ''},
+]
+
+def test_quiz_statistics_come_from_the_quiz_store(tracker_env, quiz_engine):
+    quiz_engine.add_questions('m', "notes.pdf", 0, QUIZ_QUESTIONS)
+    tracker = ProgressTracker('s1', owner_key='owner')
+    for _ in range(2):
+        quiz_engine.record_answer('owner', quiz_engine.next_question('owner', ['m']), 0)
+        tracker.add_quiz_answer()
+
+    stats = tracker.get_quiz_statistics()
+    assert stats['answered'] == 2
+    assert stats['by_material'] == {"notes.pdf": {'answered': 2, 'correct': 1}}
+    assert ProgressTracker('s2', owner_key='other').get_quiz_statistics()['answered'] == 0
+    assert json.loads((tracker_env / "progress_s1.json").read_text())['quiz_answer_count'] == 2
+
+def test_quiz_answers_move_to_the_storage_key(tracker_env, quiz_engine):
+    quiz_engine.add_questions('m', "notes.pdf", 0, QUIZ_QUESTIONS)
+    quiz_engine.record_answer('s1', quiz_engine.next_question('s1', ['m']), 0)  # under the session id
+    second = quiz_engine.next_question('s1', ['m'])
+    listed = [{'question_id': second['id'], 'choice': 0, 'correct': False, 'timestamp': 100.0}]
+    write_progress(tracker_env / "progress_s1.json", quiz_answers=listed)
+
+    ProgressTracker('s1', owner_key='owner')
+    write_progress(tracker_env / "progress_s1.json", quiz_answers=listed)  # as if the save was lost
+    tracker = ProgressTracker('s1', owner_key='owner')
+
+    assert tracker.get_quiz_statistics()['by_material'] == {"notes.pdf": {'answered': 2, 'correct': 1}}
+    assert quiz_engine.get_answer_statistics('s1') == {}
+    assert quiz_engine.next_question('owner', ['m'])['question'] == "What is NFS?"
+
+def test_interrupted_task_migration_does_not_duplicate(tracker_env, task_store):
+    legacy_tasks = [{'title': "Read chapter 1", 'priority': 'High', 'time_estimate': 30, 'created_at': '2025-06-01'},
+                    {'title': "Summarize", 'priority': 'Low', 'time_estimate': 15, 'created_at': '2025-06-01'}]
+    write_progress(tracker_env / "progress_s1.json", study_tasks=legacy_tasks)
+
+    ProgressTracker('s1', owner_key='owner')
+    write_progress(tracker_env / "progress_s1.json", study_tasks=legacy_tasks)  # as if the save was lost
+    tracker = ProgressTracker('s1', owner_key='owner')
+
+    assert tracker.get_task_counters()['total'] == 2
+    assert tracker.count_study_tasks() == 2
+    assert 'study_tasks' not in json.loads((tracker_env / "progress_s1.json").read_text())
+
+def test_tasks_belong_to_the_login_not_the_session(tracker_env):
+    task = {'title': "Read chapter 1", 'priority': 'High', 'time_estimate': 30}
+    ProgressTracker('session1', owner_key='ann').add_study_tasks([{**task, 'id': 'ann-task'}])
+    bo = ProgressTracker('session2', owner_key='bo')
+    bo.add_study_tasks([{**task, 'id': 'bo-task'}])
+
+    bo.clear_study_tasks()
+
+    # Ann's next login has a new session id but the same storage key
+    ann = ProgressTracker('session3', owner_key='ann')
+    assert [t['id'] for t in ann.get_study_tasks()] == ['ann-task']
+    assert bo.count_study_tasks() == 0
+
+def test_review_cards_belong_to_the_login_not_the_session(tracker_env):
+    materials = [{'name': "notes.pdf", 'analysis': {'important_concepts': ["Osmosis"]}}]
+    ann = ProgressTracker('session1', owner_key='ann')
+    ann.sync_review_cards(materials)
+    card = ann.get_due_reviews()[0]
+    ann.record_review(card['id'], 4)
+
+    assert ProgressTracker('session2', owner_key='bo').get_review_stats()['cards'] == 0
+    stats = ProgressTracker('session3', owner_key='ann').get_review_stats()
+    assert (stats['cards'], stats['reviews'], stats['due']) == (1, 1, 0)
@@ -0,0 +1,41 @@
+from utils.quiz_engine import QuizEngine, validate_question
+
+def make_question(text):
+    return {'question': text, 'options': ["yes", "no"], 'answer': 0, 'explanation': ''}
+
+def test_add_questions_skips_duplicates(tmp_path):
+    engine = QuizEngine(str(tmp_path / "quizzes.db"))
+    questions = [
+        make_question("What does TCP guarantee?"),
+        make_question("what does TCP guarantee"),
+        make_question("What does the TCP guarantee?"),
+    ]
+
+    assert engine.add_questions('material', "notes.pdf", 0, questions) == 1
+
+def test_add_questions_keeps_questions_about_different_terms(tmp_path):
+    engine = QuizEngine(str(tmp_path / "quizzes.db"))
+    questions = [
+        make_question("Which layer of the network stack does TCP belong to?"),
+        make_question("Which layer of the network stack does IP belong to?"),
+        make_question("What is the derivative of x^2?"),
+        make_question("What is the derivative of x^3?"),
+    ]
+
+    assert engine.add_questions('material', "notes.pdf", 0, questions) == 4
+
+def test_validate_question_coerces_fixable_fields():
+    question = validate_question({'question': " What is NIS? ", 'options': ["A service", "A protocol", 3],
+                                  'answer': "a protocol", 'explanation': None})
+    assert question['question'] == "What is NIS?"
+    assert question['options'] == ["A service", "A protocol", "3"]
+    assert question['answer'] == 1
+    assert validate_question({'question': "Q", 'options': ["a", "b"], 'answer': "1"})['answer'] == 1
+
+def test_validate_question_rejects_unusable_questions():
+    assert validate_question({'question': "", 'options': ["a", "b"], 'answer': 0}) is None
+    assert validate_question({'question': "Q", 'options': ["a"], 'answer': 0}) is None
+    assert validate_question({'question': "Q", 'options': ["a", "A"], 'answer': 0}) is None
+    assert validate_question({'question': "Q", 'options': ["a", "b"], 'answer': 2}) is None
+    assert validate_question({'question': "Q", 'options': ["a", "b"], 'answer': "c"}) is None
+    assert validate_question("not a question") is None
@@ -0,0 +1,59 @@
+from utils.response_cache import SemanticResponseCache
+
+PARTITION = {'scope': 'class', 'materials_hash': 'materials', 'model': 'model'}
+
+def test_store_and_lookup():
+    cache = SemanticResponseCache()
+    cache.store("What is NIS?", "NIS answer", **PARTITION)
+
+    hit = cache.lookup("what is nis", **PARTITION)
+    assert hit['response'] == "NIS answer"
+    assert hit['similarity'] == 1.0
+    assert cache.lookup("What is NIS?", scope='other', materials_hash='materials', model='model') is None
+
+def test_restoring_a_question_replaces_its_answer():
+    cache = SemanticResponseCache()
+    cache.store("What is NIS?", "first", **PARTITION)
+    cache.store("What is NIS?", "second", **PARTITION)
+
+    assert len(cache.entries) == 1
+    assert cache.lookup("What is NIS?", **PARTITION)['response'] == "second"
+
+def test_eviction_keeps_the_newest_entries():
+    cache = SemanticResponseCache(max_entries=2)
+    cache.store("What is NIS?", "nis", **PARTITION)
+    cache.store("What is NIS?", "nis again", **PARTITION)
+    cache.store("Define osmosis", "osmosis", **PARTITION)
+    cache.store("Define mitosis", "mitosis", **PARTITION)
+
+    assert len(cache.entries) == 2
+    assert cache.lookup("What is NIS?", **PARTITION) is None
+    assert cache.lookup("Define osmosis", **PARTITION)['response'] == "osmosis"
+    assert cache.lookup("Define mitosis", **PARTITION)['response'] == "mitosis"
+
+def test_near_match_for_a_rephrased_question():
+    cache = SemanticResponseCache()
+    cache.store("What is the difference between TCP and UDP?", "TCP/UDP answer", **PARTITION)
+
+    hit = cache.lookup("What is the difference between the TCP and UDP?", **PARTITION)
+    assert hit['response'] == "TCP/UDP answer"
+    assert hit['similarity'] >= cache.similarity_threshold
+
+def test_no_near_match_when_numbers_differ():
+    cache = SemanticResponseCache()
+    cache.store("What is the derivative of x^2?", "2x", **PARTITION)
+
+    assert cache.lookup("What is the derivative of x^3?", **PARTITION) is None
+
+def test_no_near_match_when_a_term_differs():
+    cache = SemanticResponseCache()
+    cache.store("Explain TCP and UDP", "TCP/UDP answer", **PARTITION)
+
+    assert cache.lookup("Explain TCP and IP", **PARTITION) is None
+
+def test_no_match_when_only_symbols_differ():
+    cache = SemanticResponseCache()
+    cache.store("C++ basics", "C++ answer", **PARTITION)
+
+    # Both normalize to "c basics"
+    assert cache.lookup("C# basics", **PARTITION) is None
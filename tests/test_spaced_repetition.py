@@ -0,0 +1,38 @@
+from utils.spaced_repetition import DAY_SECONDS, DueQueue, RELEARN_SECONDS, ReviewScheduler, ReviewStore, schedule_review
+
+NOW = 1000.0
+
+def test_schedule_review_grows_intervals_and_resets_on_failure():
+    card = schedule_review({}, 4, now=NOW)
+    assert (card['interval'], card['due_at']) == (1, NOW + DAY_SECONDS)
+    card = schedule_review(card, 4, now=NOW)
+    assert card['interval'] == 6
+    card = schedule_review(card, 4, now=NOW)
+    assert card['interval'] > 6
+
+    failed = schedule_review(card, 1, now=NOW)
+    assert (failed['repetitions'], failed['lapses'], failed['due_at']) == (0, 1, NOW + RELEARN_SECONDS)
+
+def test_due_queue_returns_due_cards_soonest_first():
+    queue = DueQueue([(30.0, 'c'), (10.0, 'a'), (20.0, 'b'), (99.0, 'later')])
+    queue.push('a', 50.0)  # rescheduled; the old entry is stale
+
+    assert queue.peek_due(10, now=60.0) == ['b', 'c', 'a']
+    assert queue.peek_due(2, now=60.0) == ['b', 'c']
+    assert queue.count_due(now=60.0) == 3
+    assert queue.next_due_at() == 20.0
+    assert len(queue) == 4
+
+def test_reviewed_card_leaves_the_due_cards(tmp_path):
+    scheduler = ReviewScheduler('u', ReviewStore(str(tmp_path / "reviews.db")))
+    materials = [{'name': "notes.pdf", 'analysis': {'important_concepts': ["Osmosis"], 'key_topics': ["osmosis", "Cells"]}}]
+    assert scheduler.sync_materials(materials) == 2
+    assert scheduler.sync_materials(materials) == 0
+
+    first = scheduler.next_due(limit=5)
+    assert len(first) == 2
+    scheduler.review(first[0]['id'], 4)
+    assert [card['id'] for card in scheduler.next_due(limit=5)] == [first[1]['id']]
+    # A new scheduler rebuilds the same queue from the store
+    reloaded = ReviewScheduler('u', scheduler.store)
+    assert [card['id'] for card in reloaded.next_due(limit=5)] == [first[1]['id']]
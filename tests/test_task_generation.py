@@ -0,0 +1,40 @@
+from utils.ai_models import AIClient
+from utils.progress_tracker import ProgressTracker
+from utils.task_generation import TaskGenerator
+
+class FakeClient(AIClient):
+    provider_name = "Fake"
+    model_name = "fake"
+
+    async def agenerate_json(self, prompt):
+        return {'tasks': [{'title': "Summarize", 'description': "Write a summary", 'time_estimate': "15",
+                           'difficulty': "hard", 'priority': "high", 'task_type': "Review & Summary"}]}
+
+MATERIALS = [
+    {'name': "a.pdf", 'analysis': {'difficulty': "medium", 'study_time_estimate': None}},
+    {'name': "b.pdf", 'analysis': {'difficulty': 8, 'study_time_estimate': 40}},
+]
+
+def test_generate_with_non_numeric_analysis(tmp_path):
+    generator = TaskGenerator(cache_dir=str(tmp_path))
+    tasks, info = generator.generate(FakeClient(), MATERIALS, 2, 60, "Mixed", ["Review & Summary"])
+
+    assert not info['cached'] and info['fallback_files'] == []
+    assert {task['source_file'] for task in tasks} == {"a.pdf", "b.pdf"}
+    assert all(task['priority'] == 'High' and task['difficulty'] == 5 for task in tasks)
+
+    _, info = generator.generate(FakeClient(), MATERIALS, 2, 60, "Mixed", ["Review & Summary"])
+    assert info['cached']
+
+def test_repeated_generation_is_stored_once(tmp_path, tracker_env):
+    generator = TaskGenerator(cache_dir=str(tmp_path / "task_cache"))
+    tracker = ProgressTracker('s1', owner_key='ann')
+    for _ in range(2):
+        tasks, info = generator.generate(FakeClient(), MATERIALS, 2, 60, "Mixed", ["Review & Summary"])
+        tracker.add_generated_tasks(tasks, info['generation_key'])
+
+    assert info['cached']
+    assert tracker.count_study_tasks() == 2
+    # Another user asking for the same tasks gets their own copy
+    tasks, info = generator.generate(FakeClient(), MATERIALS, 2, 60, "Mixed", ["Review & Summary"])
+    assert ProgressTracker('s2', owner_key='bo').add_generated_tasks(tasks, info['generation_key'])
@@ -0,0 +1,27 @@
+from utils.task_store import STATUS_OPEN
+
+def make_task(task_id, minutes=10, **fields):
+    return {'id': task_id, 'title': f"Task {task_id}", 'priority': 'Medium', 'time_estimate': minutes, **fields}
+
+def test_counters_follow_adds_and_completions(task_store):
+    task_store.add_tasks('u', [make_task('a'), make_task('b', 20), make_task('c', 5, completed=True)])
+
+    assert task_store.complete_task('u', 'a')['completed']
+    counters = task_store.get_counters('u')
+    assert (counters['total'], counters['completed']) == (3, 2)
+    assert (counters['total_minutes'], counters['completed_minutes']) == (35, 15)
+    assert task_store.count_tasks('u', STATUS_OPEN) == 1
+
+def test_adding_stored_tasks_again_changes_nothing(task_store):
+    task_store.add_tasks('u', [make_task('a'), make_task('b')])
+    task_store.add_tasks('u', [make_task('a'), make_task('b'), make_task('c')])
+
+    assert task_store.get_counters('u')['total'] == 3
+    assert task_store.count_tasks('u', STATUS_OPEN) == 3
+
+def test_completing_twice_counts_once(task_store):
+    task_store.add_tasks('u', [make_task('a')])
+
+    assert task_store.complete_task('u', 'a') is not None
+    assert task_store.complete_task('u', 'a') is None
+    assert task_store.get_counters('u')['completed'] == 1
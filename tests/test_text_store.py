@@ -0,0 +1,46 @@
+import gc
+from utils.text_store import TextStore
+
+TEXT = ''.join(chr(ord('a') + i % 26) for i in range(100))
+
+def test_identical_texts_share_one_entry():
+    store = TextStore(page_size=16)
+    first = store.put(TEXT)
+    second = store.put(TEXT)
+
+    assert first.key == second.key
+    assert store.get_stats()['texts'] == 1
+    assert store.get_stats()['references'] == 2
+    assert store.get_text(second) == TEXT
+    assert store.get_slice(first, 10, 40) == TEXT[10:40]
+
+def test_text_is_freed_when_the_last_handle_is_dropped():
+    store = TextStore(page_size=16)
+    first = store.put(TEXT)
+    second = store.put(TEXT)
+    store.get_text(first)
+    assert store.page_cache
+
+    first.release()
+    first.release()  # releasing twice drops only one reference
+    assert store.get_stats()['references'] == 1
+
+    del second
+    gc.collect()
+    assert store.get_stats() == {
+        'texts': 0, 'references': 0, 'original_chars': 0, 'compressed_bytes': 0, 'cached_chars': 0
+    }
+    assert not store.page_cache
+
+def test_least_recently_used_pages_are_evicted():
+    store = TextStore(page_size=16, max_cached_chars=32)
+    handle = store.put(TEXT)
+
+    store.get_slice(handle, 0, 16)    # page 0
+    store.get_slice(handle, 16, 32)   # page 1
+    store.get_slice(handle, 0, 1)     # page 0 again
+    store.get_slice(handle, 32, 48)   # page 2 evicts page 1
+
+    assert list(store.page_cache) == [(handle.key, 0), (handle.key, 2)]
+    assert store.cached_chars == 32
+    assert store.get_slice(handle, 16, 32) == TEXT[16:32]
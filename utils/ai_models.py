@@ -1,7 +1,13 @@
 import streamlit as st
 import os
 import json
+import hashlib
+import time
+import asyncio
+import threading
+from collections import OrderedDict
 from typing import Dict, List, Optional
+from utils.passages import format_passage_source
 
 # Import AI libraries based on available models
 try:
@@ -11,25 +17,348 @@ except ImportError:
     GEMINI_AVAILABLE = False
 
 try:
-    from openai import OpenAI
+    from openai import AsyncOpenAI
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
 
+STUDY_ASSISTANT_INSTRUCTIONS = """You are a helpful AI study assistant. Help students with their questions based on their study materials.
+Provide clear, educational responses that reference their materials when relevant. Be encouraging and supportive.
+
+When answering:
+1. Directly address the question
+2. Reference the study materials when relevant
+3. Provide clear explanations
+4. Suggest follow-up study activities if appropriate
+5. When you use one of the numbered passages provided with the question, cite it by its number, e.g. [1]
+
+Keep your response concise but comprehensive (2-4 paragraphs)."""
+
+# Local cache of digested material context, keyed by materials hash
+_context_digest_cache = OrderedDict()
+MAX_CACHED_DIGESTS = 64
+
+# Health check results, keyed by (provider, API key hash, model)
+_health_check_cache = {}
+_health_check_lock = threading.Lock()
+HEALTH_CHECK_TTL_SECONDS = 300
+HEALTH_CHECK_FAILURE_TTL_SECONDS = 30  # Retry failures sooner so fixed keys are noticed
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (about 4 characters per token)."""
+    return len(text) // 4
+
+def get_materials_hash(materials: List[Dict]) -> str:
+    """Get a stable hash identifying a set of study materials and their analyses."""
+    hasher = hashlib.sha256()
+    for material in materials:
+        hasher.update(material.get('name', '').encode('utf-8'))
+        hasher.update(b'\0')
+        hasher.update(material.get('content_preview', '').encode('utf-8'))
+        hasher.update(b'\0')
+        # The digest and answers change when a material is (re)analyzed
+        hasher.update(json.dumps(material.get('analysis') or {}, sort_keys=True, default=str).encode('utf-8'))
+        hasher.update(b'\0')
+    return hasher.hexdigest()
+
+def build_materials_digest(materials: List[Dict]) -> str:
+    """Build a compact digest of study materials, reusing the local cache."""
+    if not materials:
+        return ""
+    
+    materials_hash = get_materials_hash(materials[:3])
+    if materials_hash in _context_digest_cache:
+        _context_digest_cache.move_to_end(materials_hash)
+        return _context_digest_cache[materials_hash]
+    
+    digest = "Based on your uploaded study materials:\n\n"
+    for material in materials[:3]:  # Limit to 3 materials
+        digest += f"From {material['name']}:\n"
+        analysis = material.get('analysis') or {}
+        if analysis.get('summary'):
+            digest += f"Summary: {analysis['summary']}\n"
+        if analysis.get('key_topics'):
+            digest += f"Key topics: {', '.join(analysis['key_topics'][:8])}\n"
+        digest += f"{material['content_preview'][:500]}...\n\n"
+    
+    _context_digest_cache[materials_hash] = digest
+    if len(_context_digest_cache) > MAX_CACHED_DIGESTS:
+        _context_digest_cache.popitem(last=False)
+    
+    return digest
+
+def build_study_prompt(question: str, context: Dict, chat_history: List, history_messages: int = 4) -> tuple[str, str]:
+    """Build a study prompt as a stable prefix and a per-turn suffix.
+    
+    The prefix (instructions plus materials digest) is identical across chat
+    turns for the same materials, so OpenAI's automatic prefix caching can
+    serve it from cache. Everything that changes per turn goes into the suffix.
+    """
+    prefix = STUDY_ASSISTANT_INSTRUCTIONS
+    digest = build_materials_digest(context.get('materials', []))
+    if digest:
+        prefix += "\n\n" + digest
+    
+    suffix = ""
+    if chat_history and history_messages:
+        suffix = "Recent conversation:\n"
+        for msg in chat_history[-history_messages:]:
+            role = "You" if msg['role'] == 'user' else "Assistant"
+            suffix += f"{role}: {msg['content'][:100]}...\n"
+        suffix += "\n"
+    passages = context.get('passages')
+    if passages:
+        # Retrieved per question, so they belong in the suffix, not the cached prefix
+        suffix += "Relevant passages from the study materials:\n"
+        for number, passage in enumerate(passages, 1):
+            suffix += f"[{number}] ({format_passage_source(passage)}) {passage['text']}\n"
+        suffix += "\n"
+    suffix += f"Student Question: {question}"
+    
+    return prefix, suffix
+
+def record_prompt_usage(prompt_tokens: int, cached_tokens: int):
+    """Record input token usage for the current session."""
+    try:
+        stats = st.session_state.setdefault('prompt_cache_stats', {
+            'requests': 0,
+            'prompt_tokens': 0,
+            'cached_tokens': 0
+        })
+    except Exception:
+        # No Streamlit session (e.g. a background worker)
+        return
+    stats['requests'] += 1
+    stats['prompt_tokens'] += prompt_tokens or 0
+    stats['cached_tokens'] += cached_tokens or 0
+
+def get_prompt_cache_stats() -> Dict:
+    """Get input token usage and prompt cache savings for the current session."""
+    stats = dict(st.session_state.get('prompt_cache_stats', {
+        'requests': 0,
+        'prompt_tokens': 0,
+        'cached_tokens': 0
+    }))
+    stats['cache_hit_rate'] = (
+        stats['cached_tokens'] / stats['prompt_tokens'] * 100
+        if stats['prompt_tokens'] else 0
+    )
+    return stats
+
+ANALYSIS_PROMPT_TEMPLATE = """
+Analyze the following study material from file "{filename}":
+
+{content}
+
+Please provide a comprehensive analysis including:
+1. A brief summary (2-3 sentences)
+2. Key topics covered (list of 5-8 main topics)
+3. Difficulty level (1-10 scale)
+4. Estimated study time in minutes
+5. Important concepts to focus on
+6. Suggested study approach
+
+Respond in JSON format with the following structure:
+{{
+    "summary": "brief summary",
+    "key_topics": ["topic1", "topic2", ...],
+    "difficulty": 5,
+    "study_time_estimate": 30,
+    "important_concepts": ["concept1", "concept2", ...],
+    "study_approach": "suggested approach"
+}}
+"""
+
+def build_analysis_prompt(content: str, filename: str) -> str:
+    """Build the study material analysis prompt."""
+    # Limit content to avoid token limits
+    return ANALYSIS_PROMPT_TEMPLATE.format(filename=filename, content=content[:4000])
+
+def get_fallback_analysis() -> Dict:
+    """Get the analysis returned when the AI call fails."""
+    return {
+        "summary": "Analysis unavailable due to error",
+        "key_topics": ["General study material"],
+        "difficulty": 5,
+        "study_time_estimate": 20,
+        "important_concepts": ["Review content thoroughly"],
+        "study_approach": "Standard study approach recommended"
+    }
+
+# Shared event loop for the async provider SDKs. Their clients bind to the loop
+# they first run on, so every call goes through this one long-lived loop.
+_event_loop = None
+_event_loop_lock = threading.Lock()
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Get the background event loop used for AI calls, starting it if needed."""
+    global _event_loop
+    with _event_loop_lock:
+        if _event_loop is None:
+            _event_loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=_event_loop.run_forever,
+                name="ai-event-loop",
+                daemon=True
+            )
+            thread.start()
+    return _event_loop
+
+# One AsyncOpenAI client per API key, shared by every session: a client owns an
+# HTTP connection pool bound to the shared loop, so it is reused, not recreated per call
+_openai_clients = {}
+_openai_clients_lock = threading.Lock()
+
+def get_openai_client(api_key: str) -> 'AsyncOpenAI':
+    """Get the shared AsyncOpenAI client of an API key, creating it on first use."""
+    key_hash = hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+    with _openai_clients_lock:
+        client = _openai_clients.get(key_hash)
+        if client is None:
+            client = AsyncOpenAI(api_key=api_key)
+            _openai_clients[key_hash] = client
+        return client
+
+def run_sync(coro):
+    """Run a coroutine on the AI event loop and wait for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop()).result()
+
+def run_concurrently(coros: List) -> List:
+    """Run several AI coroutines concurrently and return their results in order.
+    
+    Exceptions are returned in place of results so one failed call does not
+    discard the others.
+    """
+    async def gather_all():
+        return await asyncio.gather(*coros, return_exceptions=True)
+    
+    return run_sync(gather_all())
+
+def iterate_sync(async_iterator):
+    """Iterate an async iterator from synchronous code."""
+    loop = get_event_loop()
+    while True:
+        try:
+            yield asyncio.run_coroutine_threadsafe(async_iterator.__anext__(), loop).result()
+        except StopAsyncIteration:
+            return
+
 class AIClient:
-    """Base AI client interface."""
+    """Base AI client interface.
     
-    def analyze_study_material(self, content: str, filename: str) -> Dict:
+    Providers implement the async methods (`aanalyze`, `agenerate`, `astream`);
+    the blocking methods are thin wrappers that run them on the shared event loop.
+    The async methods raise on provider errors and leave the user-facing
+    fallbacks to the blocking wrappers.
+    """
+    
+    # (prompt_tokens, cached_tokens) reported for the most recent call
+    last_usage = None
+    # Error message of the most recent blocking call, or None if it succeeded
+    last_error = None
+    
+    async def aanalyze(self, content: str, filename: str) -> Dict:
         """Analyze study material and return insights."""
         raise NotImplementedError
     
-    def generate_study_response(self, question: str, context: Dict, chat_history: List) -> str:
+    async def agenerate(self, question: str, context: Dict, chat_history: List) -> str:
         """Generate response to study question."""
         raise NotImplementedError
+    
+    async def agenerate_json(self, prompt: str) -> Dict:
+        """Generate a JSON object for a structured prompt (e.g. study tasks)."""
+        raise NotImplementedError
+    
+    async def astream(self, question: str, context: Dict, chat_history: List):
+        """Stream response to study question as text chunks."""
+        raise NotImplementedError
+        yield  # pragma: no cover - marks this as an async generator
+    
+    async def ahealth_check(self):
+        """Check that the API key and model work without generating text.
+        
+        Raises on failure.
+        """
+        raise NotImplementedError
+    
+    def health_check(self, use_cache: bool = True) -> tuple[bool, str]:
+        """Check the API key and model, reusing a recent result when available."""
+        cache_key = (self.provider_name, self.api_key_hash, self.model_name)
+        now = time.time()
+        
+        if use_cache:
+            with _health_check_lock:
+                cached = _health_check_cache.get(cache_key)
+            if cached and cached['expires_at'] > now:
+                return cached['ok'], cached['message']
+        
+        try:
+            run_sync(self.ahealth_check())
+            ok, message = True, f"{self.provider_name} model {self.model_name} is reachable."
+        except Exception as e:
+            ok, message = False, f"{self.provider_name} health check failed: {str(e)}"
+        
+        ttl = HEALTH_CHECK_TTL_SECONDS if ok else HEALTH_CHECK_FAILURE_TTL_SECONDS
+        with _health_check_lock:
+            _health_check_cache[cache_key] = {
+                'ok': ok,
+                'message': message,
+                'expires_at': now + ttl
+            }
+        return ok, message
+    
+    def analyze_study_material(self, content: str, filename: str) -> Dict:
+        """Analyze study material and return insights."""
+        try:
+            analysis = run_sync(self.aanalyze(content, filename))
+            self._record_last_usage()
+            return analysis
+        except Exception as e:
+            st.error(f"Error analyzing material with {self.provider_name}: {str(e)}")
+            return get_fallback_analysis()
+    
+    def generate_study_response(self, question: str, context: Dict, chat_history: List) -> str:
+        """Generate response to study question."""
+        self.last_error = None
+        try:
+            response = run_sync(self.agenerate(question, context, chat_history))
+            self._record_last_usage()
+            return response
+        except Exception as e:
+            self.last_error = str(e)
+            return f"I encountered an error while processing your question: {str(e)}. Please try rephrasing your question or check your API configuration."
+    
+    def generate_json_batch(self, prompts: List[str]) -> List:
+        """Generate JSON objects for several prompts concurrently.
+        
+        A failed prompt gives its exception in place of a result.
+        """
+        results = run_concurrently([self.agenerate_json(prompt) for prompt in prompts])
+        self._record_last_usage()
+        return results
+    
+    def stream_study_response(self, question: str, context: Dict, chat_history: List):
+        """Stream response to study question, yielding text chunks."""
+        self.last_error = None
+        try:
+            for chunk in iterate_sync(self.astream(question, context, chat_history)):
+                yield chunk
+            self._record_last_usage()
+        except Exception as e:
+            self.last_error = str(e)
+            yield f"I encountered an error while processing your question: {str(e)}. Please try rephrasing your question or check your API configuration."
+    
+    def _record_last_usage(self):
+        """Record token usage of the last call in the session statistics."""
+        if self.last_usage:
+            record_prompt_usage(*self.last_usage)
+            self.last_usage = None
 
 class GeminiClient(AIClient):
     """Google Gemini AI client."""
     
+    provider_name = "Gemini"
+    
     def __init__(self, api_key: str, model_name: str = "gemini-pro"):
         if not GEMINI_AVAILABLE:
             raise ImportError("Google Generative AI library not available")
@@ -37,105 +366,70 @@ class GeminiClient(AIClient):
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel(model_name)
         self.model_name = model_name
+        self.api_key_hash = hashlib.sha256(api_key.encode('utf-8')).hexdigest()
     
-    def analyze_study_material(self, content: str, filename: str) -> Dict:
+    async def aanalyze(self, content: str, filename: str) -> Dict:
         """Analyze study material using Gemini."""
+        response = await self.model.generate_content_async(build_analysis_prompt(content, filename))
+        
+        # Try to parse JSON response
         try:
-            prompt = f"""
-            Analyze the following study material from file "{filename}":
-
-            {content[:4000]}  # Limit content to avoid token limits
-
-            Please provide a comprehensive analysis including:
-            1. A brief summary (2-3 sentences)
-            2. Key topics covered (list of 5-8 main topics)
-            3. Difficulty level (1-10 scale)
-            4. Estimated study time in minutes
-            5. Important concepts to focus on
-            6. Suggested study approach
-
-            Respond in JSON format with the following structure:
-            {{
-                "summary": "brief summary",
-                "key_topics": ["topic1", "topic2", ...],
-                "difficulty": 5,
-                "study_time_estimate": 30,
-                "important_concepts": ["concept1", "concept2", ...],
-                "study_approach": "suggested approach"
-            }}
-            """
-            
-            response = self.model.generate_content(prompt)
-            
-            # Try to parse JSON response
-            try:
-                analysis = json.loads(response.text)
-                return analysis
-            except json.JSONDecodeError:
-                # If JSON parsing fails, create a structured response
-                return {
-                    "summary": response.text[:200] + "..." if len(response.text) > 200 else response.text,
-                    "key_topics": self._extract_topics_from_text(response.text),
-                    "difficulty": 5,  # Default difficulty
-                    "study_time_estimate": max(10, len(content) // 200),  # Rough estimate
-                    "important_concepts": ["Review the material carefully"],
-                    "study_approach": "Active reading and note-taking recommended"
-                }
-            
-        except Exception as e:
-            st.error(f"Error analyzing material with Gemini: {str(e)}")
+            return json.loads(response.text)
+        except json.JSONDecodeError:
+            # If JSON parsing fails, create a structured response
             return {
-                "summary": "Analysis unavailable due to error",
-                "key_topics": ["General study material"],
-                "difficulty": 5,
-                "study_time_estimate": 20,
-                "important_concepts": ["Review content thoroughly"],
-                "study_approach": "Standard study approach recommended"
+                "summary": response.text[:200] + "..." if len(response.text) > 200 else response.text,
+                "key_topics": self._extract_topics_from_text(response.text),
+                "difficulty": 5,  # Default difficulty
+                "study_time_estimate": max(10, len(content) // 200),  # Rough estimate
+                "important_concepts": ["Review the material carefully"],
+                "study_approach": "Active reading and note-taking recommended"
             }
     
-    def generate_study_response(self, question: str, context: Dict, chat_history: List) -> str:
+    async def agenerate_json(self, prompt: str) -> Dict:
+        """Generate a JSON object using Gemini's JSON output mode."""
+        response = await self.model.generate_content_async(
+            prompt,
+            generation_config={"response_mime_type": "application/json"}
+        )
+        return json.loads(response.text)
+    
+    async def agenerate(self, question: str, context: Dict, chat_history: List) -> str:
         """Generate study response using Gemini."""
-        try:
-            # Prepare context from study materials
-            materials_context = ""
-            if context.get('materials'):
-                materials_context = "Based on your uploaded study materials:\n\n"
-                for material in context['materials'][:3]:  # Limit to 3 materials
-                    materials_context += f"From {material['name']}:\n{material['content_preview'][:500]}...\n\n"
-            
-            # Prepare recent chat history
-            recent_history = ""
-            if chat_history:
-                recent_history = "Recent conversation:\n"
-                for msg in chat_history[-4:]:  # Last 4 messages
-                    role = "You" if msg['role'] == 'user' else "Assistant"
-                    recent_history += f"{role}: {msg['content'][:100]}...\n"
-                recent_history += "\n"
-            
-            prompt = f"""
-            You are a helpful AI study assistant. Help the student with their question based on their study materials.
-
-            {recent_history}
-
-            {materials_context}
-
-            Student Question: {question}
-
-            Please provide a helpful, educational response that:
-            1. Directly addresses the question
-            2. References the study materials when relevant
-            3. Provides clear explanations
-            4. Suggests follow-up study activities if appropriate
-            5. Is encouraging and supportive
-
-            Keep your response concise but comprehensive (2-4 paragraphs).
-            """
-            
-            response = self.model.generate_content(prompt)
-            return response.text
-            
-        except Exception as e:
-            return f"I encountered an error while processing your question: {str(e)}. Please try rephrasing your question or check your API configuration."
+        model, prompt = await self._prepare_study_request(question, context, chat_history)
+        response = await model.generate_content_async(prompt)
+        self._capture_usage(response)
+        return response.text
+    
+    async def astream(self, question: str, context: Dict, chat_history: List):
+        """Stream study response using Gemini."""
+        model, prompt = await self._prepare_study_request(question, context, chat_history)
+        response = await model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+        self._capture_usage(response)
+    
+    async def _prepare_study_request(self, question: str, context: Dict, chat_history: List):
+        """Pick the model and prompt for a study request."""
+        prefix, suffix = build_study_prompt(question, context, chat_history)
+        # The prefix (a few thousand tokens at most) is far below the minimum
+        # size of a Gemini explicit context cache, so no cache is created;
+        # the stable prefix still goes first for models with implicit caching
+        return self.model, f"{prefix}\n\n{suffix}"
+    
+    async def ahealth_check(self):
+        """Look up the model's metadata (no tokens are generated)."""
+        await asyncio.to_thread(genai.get_model, f"models/{self.model_name}")
+    
+    def _capture_usage(self, response):
+        """Remember the token usage reported for a response."""
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is not None:
+            self.last_usage = (
+                getattr(usage, 'prompt_token_count', 0),
+                getattr(usage, 'cached_content_token_count', 0)
+            )
     
     def _extract_topics_from_text(self, text: str) -> List[str]:
         """Extract potential topics from text response."""
@@ -147,106 +441,126 @@ class GeminiClient(AIClient):
 class OpenAIClient(AIClient):
     """OpenAI GPT client."""
     
+    provider_name = "OpenAI"
+    
     def __init__(self, api_key: str, model_name: str = "gpt-4o"):
         if not OPENAI_AVAILABLE:
             raise ImportError("OpenAI library not available")
         
-        self.client = OpenAI(api_key=api_key)
+        self.client = get_openai_client(api_key)
         self.model_name = model_name
+        self.api_key_hash = hashlib.sha256(api_key.encode('utf-8')).hexdigest()
         # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
         # do not change this unless explicitly requested by the user
     
-    def analyze_study_material(self, content: str, filename: str) -> Dict:
+    async def aanalyze(self, content: str, filename: str) -> Dict:
         """Analyze study material using OpenAI."""
-        try:
-            prompt = f"""
-            Analyze the following study material from file "{filename}":
-
-            {content[:4000]}  # Limit content to avoid token limits
-
-            Please provide a comprehensive analysis including:
-            1. A brief summary (2-3 sentences)
-            2. Key topics covered (list of 5-8 main topics)
-            3. Difficulty level (1-10 scale)
-            4. Estimated study time in minutes
-            5. Important concepts to focus on
-            6. Suggested study approach
-
-            Respond in JSON format with the following structure:
-            {{
-                "summary": "brief summary",
-                "key_topics": ["topic1", "topic2", ...],
-                "difficulty": 5,
-                "study_time_estimate": 30,
-                "important_concepts": ["concept1", "concept2", ...],
-                "study_approach": "suggested approach"
-            }}
-            """
-            
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": "You are an expert educational content analyzer. Provide detailed analysis in the requested JSON format."},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={"type": "json_object"}
-            )
-            
-            analysis = json.loads(response.choices[0].message.content)
-            return analysis
-            
-        except Exception as e:
-            st.error(f"Error analyzing material with OpenAI: {str(e)}")
-            return {
-                "summary": "Analysis unavailable due to error",
-                "key_topics": ["General study material"],
-                "difficulty": 5,
-                "study_time_estimate": 20,
-                "important_concepts": ["Review content thoroughly"],
-                "study_approach": "Standard study approach recommended"
-            }
+        response = await self.client.chat.completions.create(
+            model=self.model_name,
+            messages=[
+                {"role": "system", "content": "You are an expert educational content analyzer. Provide detailed analysis in the requested JSON format."},
+                {"role": "user", "content": build_analysis_prompt(content, filename)}
+            ],
+            response_format={"type": "json_object"}
+        )
+        
+        return json.loads(response.choices[0].message.content)
     
-    def generate_study_response(self, question: str, context: Dict, chat_history: List) -> str:
+    async def agenerate_json(self, prompt: str) -> Dict:
+        """Generate a JSON object using OpenAI's JSON response format."""
+        response = await self.client.chat.completions.create(
+            model=self.model_name,
+            messages=[
+                {"role": "system", "content": "You are an expert study planner. Respond only with JSON in the requested format."},
+                {"role": "user", "content": prompt}
+            ],
+            response_format={"type": "json_object"}
+        )
+        return json.loads(response.choices[0].message.content)
+    
+    async def agenerate(self, question: str, context: Dict, chat_history: List) -> str:
         """Generate study response using OpenAI."""
-        try:
-            # Prepare context from study materials
-            materials_context = ""
-            if context.get('materials'):
-                materials_context = "Based on your uploaded study materials:\n\n"
-                for material in context['materials'][:3]:  # Limit to 3 materials
-                    materials_context += f"From {material['name']}:\n{material['content_preview'][:500]}...\n\n"
-            
-            # Prepare chat history for context
-            messages = [
-                {"role": "system", "content": """You are a helpful AI study assistant. Help students with their questions based on their study materials. 
-                Provide clear, educational responses that reference their materials when relevant. Be encouraging and supportive."""}
-            ]
-            
-            # Add recent chat history
-            for msg in chat_history[-6:]:  # Last 6 messages for context
-                messages.append({
-                    "role": msg['role'],
-                    "content": msg['content']
-                })
-            
-            # Add current question with context
-            user_message = f"{materials_context}\n\nStudent Question: {question}"
-            messages.append({"role": "user", "content": user_message})
-            
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=messages,
-                max_tokens=500,
-                temperature=0.7
+        response = await self.client.chat.completions.create(
+            model=self.model_name,
+            messages=self._build_study_messages(question, context, chat_history),
+            max_tokens=500,
+            temperature=0.7
+        )
+        self._capture_usage(response.usage)
+        return response.choices[0].message.content
+    
+    async def astream(self, question: str, context: Dict, chat_history: List):
+        """Stream study response using OpenAI."""
+        stream = await self.client.chat.completions.create(
+            model=self.model_name,
+            messages=self._build_study_messages(question, context, chat_history),
+            max_tokens=500,
+            temperature=0.7,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        async for chunk in stream:
+            # The final chunk carries usage and no choices
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+            if chunk.usage is not None:
+                self._capture_usage(chunk.usage)
+    
+    async def ahealth_check(self):
+        """Look up the model's metadata (no tokens are generated)."""
+        await self.client.models.retrieve(self.model_name)
+    
+    def _build_study_messages(self, question: str, context: Dict, chat_history: List) -> List[Dict]:
+        """Build chat messages for a study request."""
+        # History is sent as messages, so keep it out of the prompt suffix
+        prefix, suffix = build_study_prompt(question, context, chat_history, history_messages=0)
+        
+        # Stable prefix first: OpenAI caches repeated prompt prefixes automatically
+        messages = [
+            {"role": "system", "content": prefix}
+        ]
+        
+        # Add recent chat history
+        for msg in chat_history[-6:]:  # Last 6 messages for context
+            messages.append({
+                "role": msg['role'],
+                "content": msg['content']
+            })
+        
+        messages.append({"role": "user", "content": suffix})
+        return messages
+    
+    def _capture_usage(self, usage):
+        """Remember the token usage reported for a response."""
+        if usage is not None:
+            details = getattr(usage, 'prompt_tokens_details', None)
+            self.last_usage = (
+                usage.prompt_tokens,
+                getattr(details, 'cached_tokens', 0) if details else 0
             )
-            
-            return response.choices[0].message.content
-            
-        except Exception as e:
-            return f"I encountered an error while processing your question: {str(e)}. Please try rephrasing your question or check your API configuration."
+
+def create_ai_client(provider: str, api_key: str, model_version: str) -> AIClient:
+    """Create a client for a single provider model."""
+    if provider == "Google Gemini":
+        if not GEMINI_AVAILABLE:
+            raise Exception("Google Generative AI library not available. Please install google-generativeai.")
+        return GeminiClient(api_key, model_version)
+    
+    elif provider == "OpenAI":
+        if not OPENAI_AVAILABLE:
+            raise Exception("OpenAI library not available. Please install openai.")
+        return OpenAIClient(api_key, model_version)
+    
+    else:
+        raise Exception(f"Unsupported AI provider: {provider}")
 
 def get_ai_client() -> AIClient:
-    """Get configured AI client based on session state."""
+    """Get configured AI client based on session state.
+    
+    With model routing enabled (the default), simple requests are sent to the
+    provider's cheaper model first and escalated to the configured model when
+    needed.
+    """
     if not st.session_state.get('api_configured', False):
         raise Exception("API not configured. Please configure your AI model first.")
     
@@ -258,38 +572,35 @@ def get_ai_client() -> AIClient:
         raise Exception("API key not provided.")
     
     try:
-        if provider == "Google Gemini":
-            if not GEMINI_AVAILABLE:
-                raise Exception("Google Generative AI library not available. Please install google-generativeai.")
-            return GeminiClient(api_key, model_version)
+        client = create_ai_client(provider, api_key, model_version)
         
-        elif provider == "OpenAI":
-            if not OPENAI_AVAILABLE:
-                raise Exception("OpenAI library not available. Please install openai.")
-            return OpenAIClient(api_key, model_version)
+        if not st.session_state.get('model_routing', True):
+            return client
         
-        else:
-            raise Exception(f"Unsupported AI provider: {provider}")
+        from utils.model_router import ModelRouter, CHEAP_MODELS
+        cheap_model = CHEAP_MODELS.get(provider)
+        cheap_client = None
+        if cheap_model and cheap_model != model_version:
+            cheap_client = create_ai_client(provider, api_key, cheap_model)
+        return ModelRouter(provider, client, cheap_client)
             
     except Exception as e:
         raise Exception(f"Failed to initialize AI client: {str(e)}")
 
-def test_ai_connection() -> tuple[bool, str]:
-    """Test AI connection with current configuration."""
+def test_ai_connection(use_cache: bool = True) -> tuple[bool, str]:
+    """Test AI connection with current configuration.
+    
+    Uses a model metadata lookup rather than a generation call, and reuses
+    recent results for the same key and model.
+    """
     try:
         ai_client = get_ai_client()
+        ok, message = ai_client.health_check(use_cache=use_cache)
         
-        # Simple test
-        test_response = ai_client.generate_study_response(
-            "Hello, can you help me study?",
-            {"materials": []},
-            []
-        )
-        
-        if test_response and len(test_response) > 10:
+        if ok:
             return True, "AI connection successful!"
         else:
-            return False, "AI connection test failed - no response received."
+            return False, f"AI connection test failed: {message}"
             
     except Exception as e:
         return False, f"AI connection test failed: {str(e)}"
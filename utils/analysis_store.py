@@ -0,0 +1,62 @@
+import time
+from collections import deque
+from typing import Dict, Iterator, List, Optional
+
+MAX_ANALYSIS_HISTORY = 5
+
+class AnalysisStore:
+    """Latest analysis per file, with a short version history.
+
+    Re-processing a file replaces its entry instead of appending a new one,
+    so everything that iterates the store scales with the number of distinct
+    files rather than the number of processing runs.
+    """
+
+    def __init__(self, max_history: int = MAX_ANALYSIS_HISTORY):
+        self.max_history = max_history
+        self.entries = {}  # file id -> {'latest': record, 'history': deque, 'version': int}
+
+    def upsert(self, file_id: str, record: Dict) -> Dict:
+        """Store the latest analysis record for a file."""
+        entry = self.entries.get(file_id)
+        if entry is None:
+            entry = {'latest': None, 'history': deque(maxlen=self.max_history), 'version': 0}
+            self.entries[file_id] = entry
+        elif entry['latest'] is not None:
+            entry['history'].append(entry['latest'])
+
+        entry['version'] += 1
+        entry['latest'] = {
+            **record,
+            'version': entry['version'],
+            'updated_at': time.time()
+        }
+        return entry['latest']
+
+    def get(self, file_id: str) -> Optional[Dict]:
+        """Get the latest analysis record of a file."""
+        entry = self.entries.get(file_id)
+        return entry['latest'] if entry else None
+
+    def get_history(self, file_id: str) -> List[Dict]:
+        """Get previous analysis records of a file, oldest first."""
+        entry = self.entries.get(file_id)
+        return list(entry['history']) if entry else []
+
+    def remove(self, file_id: str):
+        """Forget a file's analyses."""
+        self.entries.pop(file_id, None)
+
+    def clear(self):
+        """Forget all analyses."""
+        self.entries.clear()
+
+    def __iter__(self) -> Iterator[Dict]:
+        """Iterate latest analysis records."""
+        return (entry['latest'] for entry in self.entries.values())
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, file_id: str) -> bool:
+        return file_id in self.entries
@@ -0,0 +1,281 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+from utils.conversation_store import conversation_store
+
+EXPORT_CACHE_DIR = "export_cache"
+
+# Streamlit keeps a download button's whole file in server memory, so
+# larger exports are not offered for download
+MAX_DOWNLOAD_BYTES = 25 * 1024 * 1024
+
+# PDF page layout (US Letter, points)
+PDF_PAGE_WIDTH = 612
+PDF_PAGE_HEIGHT = 792
+PDF_MARGIN = 54
+PDF_FONT_SIZE = 10
+PDF_LEADING = 13
+PDF_LINE_CHARS = 95  # Helvetica at 10pt fits about this many characters per line
+PDF_LINES_PER_PAGE = (PDF_PAGE_HEIGHT - 2 * PDF_MARGIN) // PDF_LEADING
+
+def format_timestamp(timestamp: Optional[float]) -> str:
+    """Format a message time for exports."""
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M') if timestamp else ''
+
+def get_conversation_label(conversation: Dict) -> str:
+    """Get the heading of a conversation in exports."""
+    label = conversation.get('title') or "Untitled conversation"
+    if conversation.get('student'):
+        label = f"{conversation['student']}: {label}"
+    return label
+
+def export_markdown(conversations: List[Dict]) -> Iterator[str]:
+    """Generate a Markdown export of conversations, one message at a time."""
+    yield "# Study Assistant Chat History\n\n"
+    for conversation in conversations:
+        if len(conversations) > 1:
+            yield f"## {get_conversation_label(conversation)}\n\n"
+        for message in conversation_store.iter_messages(conversation['id']):
+            role = "**You:**" if message['role'] == 'user' else "**Assistant:**"
+            yield f"{role} {message['content']}\n\n"
+
+def export_jsonl(conversations: List[Dict]) -> Iterator[str]:
+    """Generate a JSON Lines export of conversations, one message per line."""
+    for conversation in conversations:
+        for message in conversation_store.iter_messages(conversation['id']):
+            record = {
+                'conversation_id': conversation['id'],
+                'conversation': conversation.get('title'),
+                'seq': message['seq'],
+                'role': message['role'],
+                'content': message['content'],
+                'timestamp': message['timestamp']
+            }
+            if conversation.get('student'):
+                record['student'] = conversation['student']
+            if message['sources']:
+                record['sources'] = [
+                    {key: source.get(key) for key in ('name', 'page', 'headings')} for source in message['sources']
+                ]
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+
+def iter_text_lines(conversations: List[Dict]) -> Iterator[tuple]:
+    """Generate (text, bold) lines of conversations wrapped for the PDF page width."""
+    yield "Study Assistant Chat History", True
+    for conversation in conversations:
+        if len(conversations) > 1:
+            yield "", False
+            yield get_conversation_label(conversation), True
+        for message in conversation_store.iter_messages(conversation['id']):
+            role = "You" if message['role'] == 'user' else "Assistant"
+            yield "", False
+            yield f"{role}  {format_timestamp(message['timestamp'])}", True
+            for paragraph in message['content'].splitlines():
+                yield from ((line, False) for line in wrap_line(paragraph, PDF_LINE_CHARS))
+
+def wrap_line(text: str, width: int) -> List[str]:
+    """Wrap a paragraph at word boundaries, splitting overlong words."""
+    lines = []
+    current = ''
+    for word in text.split():
+        while len(word) > width:
+            if current:
+                lines.append(current)
+                current = ''
+            lines.append(word[:width])
+            word = word[width:]
+        if current and len(current) + 1 + len(word) > width:
+            lines.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    lines.append(current)
+    return lines
+
+def pdf_string(text: str) -> bytes:
+    """Encode text as a PDF literal string in the fonts' WinAnsi encoding."""
+    data = text.encode('cp1252', errors='replace')
+    return b'(' + data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+def export_pdf(conversations: List[Dict]) -> Iterator[bytes]:
+    """Generate a PDF export of conversations a page at a time.
+
+    A minimal PDF writer: Helvetica text pages, with the page tree and
+    cross-reference table written at the end, so only byte offsets are
+    kept while generating.
+    """
+    offsets = []  # byte offset of object i + 1
+    position = 0
+
+    def write(data: bytes) -> bytes:
+        nonlocal position
+        position += len(data)
+        return data
+
+    def write_object(number: int, body: bytes) -> bytes:
+        while len(offsets) < number:
+            offsets.append(0)
+        offsets[number - 1] = position
+        return write(f"{number} 0 obj\n".encode('ascii') + body + b"\nendobj\n")
+
+    # Objects 1-4: catalog, page tree (written last), regular and bold fonts
+    yield write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    yield write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+    yield write_object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    yield write_object(4, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+    resources = b"<< /Font << /F1 3 0 R /F2 4 0 R >> >>"
+
+    page_numbers = []
+    next_number = 5
+
+    def page_objects(lines: List[tuple]):
+        nonlocal next_number
+        commands = [b"BT", f"{PDF_LEADING} TL".encode('ascii'),
+                    f"{PDF_MARGIN} {PDF_PAGE_HEIGHT - PDF_MARGIN} Td".encode('ascii')]
+        for text, bold in lines:
+            font = b"/F2" if bold else b"/F1"
+            commands.append(font + f" {PDF_FONT_SIZE} Tf ".encode('ascii') + pdf_string(text) + b" Tj T*")
+        commands.append(b"ET")
+        stream = b"\n".join(commands)
+        content_number, page_number = next_number, next_number + 1
+        next_number += 2
+        page_numbers.append(page_number)
+        yield write_object(content_number, f"<< /Length {len(stream)} >>\nstream\n".encode('ascii') + stream + b"\nendstream")
+        yield write_object(
+            page_number,
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PDF_PAGE_WIDTH} {PDF_PAGE_HEIGHT}] "
+            f"/Contents {content_number} 0 R /Resources ".encode('ascii') + resources + b" >>"
+        )
+
+    page = []
+    for line in iter_text_lines(conversations):
+        page.append(line)
+        if len(page) == PDF_LINES_PER_PAGE:
+            yield from page_objects(page)
+            page = []
+    if page or not page_numbers:
+        yield from page_objects(page)
+
+    kids = ' '.join(f"{number} 0 R" for number in page_numbers)
+    yield write_object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(page_numbers)} >>".encode('ascii'))
+
+    xref_position = position
+    xref = [f"xref\n0 {len(offsets) + 1}\n0000000000 65535 f \n"]
+    xref.extend(f"{offset:010d} 00000 n \n" for offset in offsets)
+    yield write(''.join(xref).encode('ascii'))
+    yield write(f"trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\nstartxref\n{xref_position}\n%%EOF\n".encode('ascii'))
+
+EXPORT_FORMATS = {
+    'markdown': {'label': "Markdown", 'extension': 'md', 'mime': 'text/markdown', 'writer': export_markdown},
+    'jsonl': {'label': "JSON Lines", 'extension': 'jsonl', 'mime': 'application/jsonl', 'writer': export_jsonl},
+    'pdf': {'label': "PDF", 'extension': 'pdf', 'mime': 'application/pdf', 'writer': export_pdf}
+}
+
+def get_student_conversations(owner_key: str, student: str) -> List[Dict]:
+    """Get a student's conversations, oldest first, labelled with the student."""
+    conversations = conversation_store.list_conversations(owner_key)[::-1]
+    for conversation in conversations:
+        conversation['student'] = student
+    return conversations
+
+class ChatExporter:
+    """Build chat exports in the background and cache them on disk.
+
+    Exports are written by streaming a format's generator to a file, so
+    memory stays bounded however many conversations are included. A cached
+    export is named by the conversations and their message counts, so it is
+    reused until one of them gets a new message.
+    """
+
+    def __init__(self, cache_dir: str = EXPORT_CACHE_DIR, max_workers: int = 2):
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.executor = None
+        self.builds = {}  # export path -> Future of a build in flight
+        self.lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Get the export worker pool, starting it if needed."""
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="export-worker")
+            return self.executor
+
+    def _export_paths(self, conversations: List[Dict], export_format: str):
+        """Get the (current path, glob of all versions) of an export."""
+        ids = '\0'.join(conversation['id'] for conversation in conversations)
+        subject = hashlib.sha256(f"{export_format}\0{ids}".encode('utf-8')).hexdigest()[:24]
+        counts = ','.join(str(conversation['message_count']) for conversation in conversations)
+        version = hashlib.sha256(counts.encode('utf-8')).hexdigest()[:12]
+        extension = EXPORT_FORMATS[export_format]['extension']
+        directory = os.path.join(self.cache_dir, subject[:2])
+        return os.path.join(directory, f"{subject}-{version}.{extension}"), os.path.join(directory, f"{subject}-*")
+
+    def prepare(self, conversations: List[Dict], export_format: str) -> Future:
+        """Start building an export unless it is cached or already being built."""
+        path, _ = self._export_paths(conversations, export_format)
+        with self.lock:
+            future = self.builds.get(path)
+            if future is not None:
+                return future
+            if os.path.exists(path):
+                future = Future()
+                future.set_result(path)
+                return future
+        executor = self._get_executor()
+        with self.lock:
+            future = self.builds.get(path)
+            if future is None:
+                future = executor.submit(self._build, conversations, export_format)
+                self.builds[path] = future
+        return future
+
+    def get_ready_path(self, conversations: List[Dict], export_format: str) -> Optional[str]:
+        """Get the cached file of an export if it has been built, without starting a build."""
+        path, _ = self._export_paths(conversations, export_format)
+        return path if os.path.exists(path) else None
+
+    def is_building(self, conversations: List[Dict], export_format: str) -> bool:
+        """Check whether an export is being built."""
+        path, _ = self._export_paths(conversations, export_format)
+        with self.lock:
+            return path in self.builds
+
+    def get_export_path(self, conversations: List[Dict], export_format: str) -> str:
+        """Get the cached file of an export, waiting for its build if needed."""
+        return self.prepare(conversations, export_format).result()
+
+    def _build(self, conversations: List[Dict], export_format: str) -> str:
+        """Stream an export to its cache file (runs on a worker thread)."""
+        path, versions = self._export_paths(conversations, export_format)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, 'wb') as f:
+                for chunk in EXPORT_FORMATS[export_format]['writer'](conversations):
+                    f.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+            os.replace(temp_path, path)
+            # Older versions of the same export are out of date
+            for old_path in glob.glob(versions):
+                if old_path != path and not old_path.endswith('.tmp'):
+                    try:
+                        os.remove(old_path)
+                    except OSError:
+                        pass
+            return path
+        except Exception as e:
+            print(f"Error building chat export: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        finally:
+            with self.lock:
+                self.builds.pop(path, None)
+
+# Global exporter shared by all sessions; the export cache is server-wide
+chat_exporter = ChatExporter()
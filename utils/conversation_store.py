@@ -0,0 +1,198 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+CHAT_PAGE_SIZE = 20
+EXPORT_BATCH_SIZE = 200
+
+# Longer messages are stored zlib-compressed
+COMPRESS_MIN_CHARS = 256
+
+class ConversationStore:
+    """SQLite store of chat conversations, append-only per conversation.
+
+    Messages are numbered within their conversation, so the latest N and
+    each older page are range queries on the primary key, however long the
+    conversation grows. Long messages are stored compressed.
+    """
+
+    def __init__(self, db_path: str = "conversations.db"):
+        self.db_path = db_path
+        self.initialized = False
+        self.lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection to the conversation tables, creating them on first use."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        if not self.initialized:
+            with self.lock:
+                if not self.initialized:
+                    self._init_db(conn)
+                    self.initialized = True
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """Open a connection that commits on success and is always closed."""
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self, conn: sqlite3.Connection):
+        """Create the conversation and message tables."""
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS conversations (
+                id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                title TEXT,
+                message_count INTEGER DEFAULT 0,
+                created_at REAL,
+                updated_at REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_conversations_user ON conversations (user_id, updated_at)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS messages (
+                conversation_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                sources TEXT,
+                timestamp REAL,
+                compressed INTEGER DEFAULT 0,
+                PRIMARY KEY (conversation_id, seq)
+            )
+        """)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(messages)")}
+        if 'compressed' not in columns:
+            conn.execute("ALTER TABLE messages ADD COLUMN compressed INTEGER DEFAULT 0")
+        conn.commit()
+
+    def create_conversation(self, user_id: str, title: Optional[str] = None,
+                            created_at: Optional[float] = None, conversation_id: Optional[str] = None) -> str:
+        """Start a new, empty conversation and return its id.
+
+        With a given id, an existing conversation of that id is kept as is.
+        """
+        conversation_id = conversation_id or uuid.uuid4().hex
+        now = created_at or time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO conversations (id, user_id, title, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (conversation_id, user_id, title, now, now)
+            )
+        return conversation_id
+
+    def get_latest_conversation(self, user_id: str) -> Optional[Dict]:
+        """Get the user's most recently updated conversation."""
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT * FROM conversations WHERE user_id = ? ORDER BY updated_at DESC LIMIT 1", (user_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def get_conversation(self, conversation_id: str) -> Optional[Dict]:
+        """Get a conversation's details (user, title, message count, times)."""
+        with self._connection() as conn:
+            row = conn.execute("SELECT * FROM conversations WHERE id = ?", (conversation_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list_conversations(self, user_id: str) -> List[Dict]:
+        """Get the user's conversations, most recent first."""
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT * FROM conversations WHERE user_id = ? ORDER BY updated_at DESC", (user_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def append_message(self, conversation_id: str, role: str, content: str,
+                       sources: Optional[List[Dict]] = None, timestamp: Optional[float] = None) -> Dict:
+        """Append a message to a conversation and return it with its 'seq'."""
+        timestamp = timestamp or time.time()
+        with self._connection() as conn:
+            # Take the write lock before reading the count, so concurrent
+            # appends to a conversation get consecutive numbers
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT message_count, title FROM conversations WHERE id = ?", (conversation_id,)
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Unknown conversation: {conversation_id}")
+            seq = row['message_count']
+            compressed = len(content) >= COMPRESS_MIN_CHARS
+            stored = zlib.compress(content.encode('utf-8')) if compressed else content
+            conn.execute(
+                "INSERT INTO messages (conversation_id, seq, role, content, sources, timestamp, compressed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (conversation_id, seq, role, stored, json.dumps(sources) if sources else None, timestamp, int(compressed))
+            )
+            # The first question names the conversation
+            title = row['title'] or (content[:80] if role == 'user' else None)
+            conn.execute(
+                "UPDATE conversations SET message_count = ?, title = ?, updated_at = ? WHERE id = ?",
+                (seq + 1, title, timestamp, conversation_id)
+            )
+        return {'seq': seq, 'role': role, 'content': content, 'sources': sources, 'timestamp': timestamp}
+
+    def get_messages(self, conversation_id: str, limit: int = CHAT_PAGE_SIZE,
+                     before_seq: Optional[int] = None) -> List[Dict]:
+        """Get up to `limit` messages before `before_seq` (default: the latest), oldest first."""
+        with self._connection() as conn:
+            if before_seq is None:
+                rows = conn.execute(
+                    "SELECT * FROM messages WHERE conversation_id = ? ORDER BY seq DESC LIMIT ?",
+                    (conversation_id, limit)
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT * FROM messages WHERE conversation_id = ? AND seq < ? ORDER BY seq DESC LIMIT ?",
+                    (conversation_id, before_seq, limit)
+                ).fetchall()
+        return [self._row_to_message(row) for row in reversed(rows)]
+
+    def get_message(self, conversation_id: str, seq: int) -> Optional[Dict]:
+        """Get one message by its conversation and number."""
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT * FROM messages WHERE conversation_id = ? AND seq = ?", (conversation_id, seq)
+            ).fetchone()
+        return self._row_to_message(row) if row else None
+
+    def iter_messages(self, conversation_id: str, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Dict]:
+        """Iterate all of a conversation's messages in order, a batch at a time."""
+        after = -1
+        while True:
+            with self._connection() as conn:
+                rows = conn.execute(
+                    "SELECT * FROM messages WHERE conversation_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                    (conversation_id, after, batch_size)
+                ).fetchall()
+            for row in rows:
+                yield self._row_to_message(row)
+            if len(rows) < batch_size:
+                return
+            after = rows[-1]['seq']
+
+    @staticmethod
+    def _row_to_message(row: sqlite3.Row) -> Dict:
+        """Convert a message row to the message dict used by the chat."""
+        return {
+            'seq': row['seq'],
+            'role': row['role'],
+            'content': zlib.decompress(row['content']).decode('utf-8') if row['compressed'] else row['content'],
+            'sources': json.loads(row['sources']) if row['sources'] else None,
+            'timestamp': row['timestamp']
+        }
+
+# Global conversation store shared by all sessions on this server
+conversation_store = ConversationStore()
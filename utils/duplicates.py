@@ -0,0 +1,134 @@
+import threading
+from typing import Dict, List, Optional
+from utils.minhash import DocumentMinHasher, LSHIndex, MinHasher, normalize_text, word_shingles
+
+FINGERPRINT_PERMUTATIONS = 128
+FINGERPRINT_BANDS = 32  # 4 rows per band: candidates from about 70% similarity
+DUPLICATE_THRESHOLD = 0.85  # estimated Jaccard similarity of 5-word shingles
+MIN_FINGERPRINT_WORDS = 50  # shorter texts are too small to compare reliably
+
+_hasher = DocumentMinHasher(num_perm=FINGERPRINT_PERMUTATIONS)
+
+def fingerprint_text(text: str) -> Optional[List[int]]:
+    """Get the MinHash fingerprint of extracted text, or None if it is too short."""
+    normalized = normalize_text(text)
+    if normalized.count(' ') + 1 < MIN_FINGERPRINT_WORDS:
+        return None
+    return _hasher.signature(word_shingles(normalized))
+
+class DuplicateIndex:
+    """Near-duplicate lookup over material fingerprints.
+
+    Entries are keyed by "<owner key>:<content id>" and carry enough
+    metadata to find the original material in its owner's library.
+    """
+
+    def __init__(self):
+        self.lsh = LSHIndex(num_perm=FINGERPRINT_PERMUTATIONS, bands=FINGERPRINT_BANDS)
+        self.entries = {}  # key -> {'signature', 'owner_key', 'content_id', 'name'}
+        self.lock = threading.Lock()
+
+    def add(self, owner_key: str, content_id: str, name: str, signature: List[int]):
+        """Add (or replace) a material's fingerprint."""
+        key = f"{owner_key}:{content_id}"
+        with self.lock:
+            self._remove(key)
+            self.entries[key] = {
+                'signature': signature,
+                'owner_key': owner_key,
+                'content_id': content_id,
+                'name': name
+            }
+            self.lsh.add(key, signature)
+
+    def remove(self, owner_key: str, content_id: str):
+        """Forget a material's fingerprint."""
+        with self.lock:
+            self._remove(f"{owner_key}:{content_id}")
+
+    def find(self, signature: List[int], exclude: Optional[str] = None) -> Optional[Dict]:
+        """Get the most similar material above DUPLICATE_THRESHOLD (with its 'similarity')."""
+        with self.lock:
+            best, best_similarity = None, DUPLICATE_THRESHOLD
+            for key in self.lsh.query(signature):
+                entry = self.entries[key]
+                if entry['content_id'] == exclude:
+                    continue
+                similarity = MinHasher.similarity(signature, entry['signature'])
+                if similarity >= best_similarity:
+                    best, best_similarity = entry, similarity
+            if best is None:
+                return None
+            match = {key: value for key, value in best.items() if key != 'signature'}
+            match['similarity'] = best_similarity
+            return match
+
+    def _remove(self, key: str):
+        """Remove an entry (lock must be held)."""
+        entry = self.entries.pop(key, None)
+        if entry:
+            self.lsh.remove(key, entry['signature'])
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+# Process-wide indexes, keyed by user storage key and by class scope
+_user_indexes = {}
+_class_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_user_duplicate_index(owner_key: str) -> DuplicateIndex:
+    """Get a user's fingerprint index, loading it from their library on first use."""
+    from utils.material_library import MaterialLibrary
+
+    with _indexes_lock:
+        index = _user_indexes.get(owner_key)
+        if index is None:
+            index = DuplicateIndex()
+            for material in MaterialLibrary(owner_key).list_materials():
+                if material.get('fingerprint'):
+                    index.add(owner_key, material['content_id'], material['name'], material['fingerprint'])
+            _user_indexes[owner_key] = index
+        return index
+
+def get_class_duplicate_index(scope: str) -> DuplicateIndex:
+    """Get the shared fingerprint index of a class."""
+    with _indexes_lock:
+        index = _class_indexes.get(scope)
+        if index is None:
+            index = DuplicateIndex()
+            _class_indexes[scope] = index
+        return index
+
+def register_fingerprint(owner_key: str, scope: str, content_id: str, name: str, signature: List[int]):
+    """Make a material findable as a duplicate by its owner and their class."""
+    get_user_duplicate_index(owner_key).add(owner_key, content_id, name, signature)
+    get_class_duplicate_index(scope).add(owner_key, content_id, name, signature)
+
+def forget_fingerprint(owner_key: str, scope: str, content_id: str):
+    """Remove a deleted material from the duplicate indexes."""
+    get_user_duplicate_index(owner_key).remove(owner_key, content_id)
+    get_class_duplicate_index(scope).remove(owner_key, content_id)
+
+def find_duplicate(signature: List[int], owner_key: str, scope: Optional[str] = None,
+                   exclude: Optional[str] = None) -> Optional[Dict]:
+    """Find an analyzed near-duplicate in the user's own library, then in their class.
+
+    Returns the index entry plus 'similarity', 'shared' (True if it belongs
+    to another user) and the stored 'analysis'.
+    """
+    from utils.material_library import MaterialLibrary
+
+    candidates = [get_user_duplicate_index(owner_key)]
+    if scope:
+        candidates.append(get_class_duplicate_index(scope))
+    for index in candidates:
+        match = index.find(signature, exclude=exclude)
+        if match is None:
+            continue
+        material = MaterialLibrary(match['owner_key']).get_material(match['content_id'])
+        if material and material.get('analysis'):
+            match['shared'] = match['owner_key'] != owner_key
+            match['analysis'] = material['analysis']
+            return match
+    return None
@@ -0,0 +1,139 @@
+import importlib
+import threading
+import zipfile
+from typing import Dict, List, Optional
+
+ZIP_MAGIC = b'PK\x03\x04'
+SNIFF_BYTES = 512
+
+class ExtractorSpec:
+    """A registered text extractor backend.
+
+    The backend module is only imported the first time a file needs it; it
+    must define `extract(uploaded_file) -> str`.
+    """
+
+    def __init__(self, name: str, module: str, label: str, extensions: List[str],
+                 mime_types: List[str] = None, magic: List[bytes] = None,
+                 zip_markers: List[str] = None):
+        self.name = name
+        self.module = module
+        self.label = label
+        self.extensions = extensions
+        self.mime_types = mime_types or []
+        self.magic = magic or []
+        self.zip_markers = zip_markers or []  # member names that identify a zip-based format
+        self._backend = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Import the backend module on first use."""
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = importlib.import_module(self.module)
+        return self._backend
+
+    def extract(self, uploaded_file) -> str:
+        """Extract normalized text from an uploaded file."""
+        return self.load().extract(uploaded_file)
+
+_registry: Dict[str, ExtractorSpec] = {}
+
+def register_extractor(spec: ExtractorSpec):
+    """Register (or replace) an extractor backend."""
+    _registry[spec.name] = spec
+
+def get_extractor(name: str) -> Optional[ExtractorSpec]:
+    """Get a registered extractor by name."""
+    return _registry.get(name)
+
+def get_supported_extensions() -> List[str]:
+    """Get all file extensions with a registered extractor."""
+    return [extension for spec in _registry.values() for extension in spec.extensions]
+
+def get_supported_labels() -> List[str]:
+    """Get display names of the supported formats."""
+    return [spec.label for spec in _registry.values()]
+
+def find_extractor(filename: str = '', mime_type: str = '', stream=None) -> Optional[ExtractorSpec]:
+    """Find the extractor for a file by magic bytes, then MIME type, then extension.
+
+    `stream` is a seekable file object; it is rewound after sniffing.
+    """
+    if stream is not None:
+        spec = sniff_extractor(stream)
+        if spec:
+            return spec
+
+    mime_type = (mime_type or '').split(';')[0].strip().lower()
+    if mime_type:
+        for spec in _registry.values():
+            if mime_type in spec.mime_types:
+                return spec
+
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    for spec in _registry.values():
+        if extension in spec.extensions:
+            return spec
+    return None
+
+def sniff_extractor(stream) -> Optional[ExtractorSpec]:
+    """Identify a file's format from its leading bytes (and zip member names)."""
+    position = stream.tell()
+    try:
+        head = stream.read(SNIFF_BYTES)
+        if head.startswith(ZIP_MAGIC):
+            stream.seek(position)
+            try:
+                names = set(zipfile.ZipFile(stream).namelist())
+            except zipfile.BadZipFile:
+                return None
+            for spec in _registry.values():
+                if any(marker in names for marker in spec.zip_markers):
+                    return spec
+            return None
+
+        lowered = head.lstrip(b'\xef\xbb\xbf \t\r\n').lower()
+        for spec in _registry.values():
+            if any(lowered.startswith(magic) for magic in spec.magic):
+                return spec
+        return None
+    finally:
+        stream.seek(position)
+
+# Built-in backends, imported lazily by ExtractorSpec.load()
+register_extractor(ExtractorSpec(
+    'pdf', 'utils.extractors.pdf', 'PDF', ['pdf'],
+    mime_types=['application/pdf'],
+    magic=[b'%pdf-']
+))
+register_extractor(ExtractorSpec(
+    'docx', 'utils.extractors.docx', 'DOCX', ['docx'],
+    mime_types=['application/vnd.openxmlformats-officedocument.wordprocessingml.document'],
+    zip_markers=['word/document.xml']
+))
+register_extractor(ExtractorSpec(
+    'pptx', 'utils.extractors.pptx', 'PPTX', ['pptx'],
+    mime_types=['application/vnd.openxmlformats-officedocument.presentationml.presentation'],
+    zip_markers=['ppt/presentation.xml']
+))
+register_extractor(ExtractorSpec(
+    'epub', 'utils.extractors.epub', 'EPUB', ['epub'],
+    mime_types=['application/epub+zip'],
+    zip_markers=['META-INF/container.xml']
+))
+register_extractor(ExtractorSpec(
+    'html', 'utils.extractors.html', 'HTML', ['html', 'htm'],
+    mime_types=['text/html', 'application/xhtml+xml'],
+    magic=[b'<!doctype html', b'<html']
+))
+register_extractor(ExtractorSpec(
+    'image', 'utils.extractors.image', 'JPG, PNG (OCR)', ['jpg', 'jpeg', 'png'],
+    mime_types=['image/jpeg', 'image/png'],
+    magic=[b'\xff\xd8\xff', b'\x89png\r\n\x1a\n']
+))
+register_extractor(ExtractorSpec(
+    'text', 'utils.extractors.text', 'TXT, MD', ['txt', 'md'],
+    mime_types=['text/plain', 'text/markdown']
+))
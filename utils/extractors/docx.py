@@ -0,0 +1,136 @@
+import io
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import IO, Dict, Iterator
+from utils.extractors.normalizer import TextNormalizer, NORMALIZE_CHUNK_SIZE
+
+# WordprocessingML element and attribute names
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_W_PARAGRAPH = _W + 'p'
+_W_TEXT = _W + 't'
+_W_TAB = _W + 'tab'
+_W_BREAKS = (_W + 'br', _W + 'cr')
+_W_STYLE = _W + 'pStyle'
+_W_OUTLINE_LEVEL = _W + 'outlineLvl'
+_W_NUMBERING = _W + 'numPr'
+_W_BODY = _W + 'body'
+_W_VAL = _W + 'val'
+_HEADING_STYLE_NAME = re.compile(r'^heading\s*(\d)$', re.IGNORECASE)
+
+def read_docx_heading_levels(archive: zipfile.ZipFile) -> Dict[str, int]:
+    """Map DOCX paragraph style ids to heading levels (1-6) using word/styles.xml.
+
+    Style ids are localized (e.g. "berschrift1"), so headings are found by
+    their built-in style name or outline level instead.
+    """
+    # Built-in English style ids, used when styles.xml is missing
+    levels = {'Title': 1, **{f'Heading{level}': level for level in range(1, 7)}}
+    try:
+        styles = archive.open('word/styles.xml')
+    except KeyError:
+        return levels
+
+    with styles:
+        for _, element in ET.iterparse(styles):
+            if element.tag != _W + 'style':
+                continue
+            style_id = element.get(_W + 'styleId')
+            name = element.find(_W + 'name')
+            outline = element.find(f'{_W}pPr/{_W_OUTLINE_LEVEL}')
+            match = _HEADING_STYLE_NAME.match(name.get(_W_VAL, '')) if name is not None else None
+            if style_id and match:
+                levels[style_id] = int(match.group(1))
+            elif style_id and name is not None and name.get(_W_VAL, '').lower() == 'title':
+                levels[style_id] = 1
+            elif style_id and outline is not None and outline.get(_W_VAL, '').isdigit():
+                levels[style_id] = int(outline.get(_W_VAL)) + 1
+            element.clear()
+    return {style_id: min(level, 6) for style_id, level in levels.items()}
+
+def iter_docx_blocks(document: IO[bytes], heading_levels: Dict[str, int]) -> Iterator[str]:
+    """Stream paragraphs out of word/document.xml as text blocks.
+
+    Headings become markdown "#" lines and list items "- " lines. Elements
+    are cleared as soon as they have been read, so memory stays bounded
+    however long the document is.
+    """
+    depth = 0
+    paragraphs = []  # text parts of open paragraphs (text boxes nest them)
+    body = None
+    for event, element in ET.iterparse(document, events=('start', 'end')):
+        tag = element.tag
+        if event == 'start':
+            depth += 1
+            if tag == _W_PARAGRAPH:
+                paragraphs.append([])
+            elif tag == _W_BODY:
+                body = element
+            continue
+
+        depth -= 1
+        if paragraphs:
+            if tag == _W_TEXT and element.text:
+                paragraphs[-1].append(element.text)
+            elif tag == _W_TAB:
+                paragraphs[-1].append('\t')
+            elif tag in _W_BREAKS:
+                paragraphs[-1].append('\n')
+
+        if tag == _W_PARAGRAPH:
+            text = ''.join(paragraphs.pop()).strip()
+            if text:
+                yield _format_docx_paragraph(element, text, heading_levels) + '\n\n'
+            element.clear()
+
+        # Drop finished top-level blocks (paragraphs, tables) from the tree
+        if body is not None and depth == 2:
+            body.clear()
+
+def _format_docx_paragraph(paragraph: ET.Element, text: str, heading_levels: Dict[str, int]) -> str:
+    """Prefix a paragraph's text with its markdown heading or list marker."""
+    properties = paragraph.find(_W + 'pPr')
+    if properties is None:
+        return text
+
+    level = None
+    style = properties.find(_W_STYLE)
+    if style is not None:
+        level = heading_levels.get(style.get(_W_VAL))
+    outline = properties.find(_W_OUTLINE_LEVEL)
+    if level is None and outline is not None and outline.get(_W_VAL, '').isdigit():
+        level = min(int(outline.get(_W_VAL)) + 1, 6)
+
+    if level:
+        return '#' * level + ' ' + ' '.join(text.split())
+    if properties.find(_W_NUMBERING) is not None:
+        return '- ' + text
+    return text
+
+def extract(uploaded_file) -> str:
+    """Extract text from DOCX file, keeping headings as markdown."""
+    try:
+        with zipfile.ZipFile(io.BytesIO(uploaded_file.read())) as archive:
+            heading_levels = read_docx_heading_levels(archive)
+            normalizer = TextNormalizer()
+            parts = []
+            batch = []
+            batch_size = 0
+            with archive.open('word/document.xml') as document:
+                for block in iter_docx_blocks(document, heading_levels):
+                    batch.append(block)
+                    batch_size += len(block)
+                    if batch_size >= NORMALIZE_CHUNK_SIZE:
+                        parts.append(normalizer.feed(''.join(batch)))
+                        batch = []
+                        batch_size = 0
+            parts.append(normalizer.feed(''.join(batch)))
+            parts.append(normalizer.finish())
+        return ''.join(parts)
+
+    except zipfile.BadZipFile:
+        raise Exception("Error reading DOCX file: the file is not a valid DOCX document")
+    except KeyError:
+        raise Exception("Error reading DOCX file: the document body is missing")
+    except Exception as e:
+        raise Exception(f"Error reading DOCX file: {str(e)}")
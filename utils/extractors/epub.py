@@ -0,0 +1,50 @@
+import io
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import List
+from utils.extractors.normalizer import TextNormalizer
+from utils.extractors.html import html_to_text
+from utils.extractors.text import decode_text
+
+_CONTAINER = '{urn:oasis:names:tc:opendocument:xmlns:container}'
+_OPF = '{http://www.idpf.org/2007/opf}'
+
+def read_spine(archive: zipfile.ZipFile) -> List[str]:
+    """Get the archive paths of an EPUB's content documents in reading order."""
+    container = ET.fromstring(archive.read('META-INF/container.xml'))
+    rootfile = container.find(f'.//{_CONTAINER}rootfile')
+    if rootfile is None:
+        raise Exception("the EPUB has no package document")
+    package_path = rootfile.get('full-path')
+    package = ET.fromstring(archive.read(package_path))
+    base_dir = posixpath.dirname(package_path)
+
+    manifest = {
+        item.get('id'): item
+        for item in package.iter(f'{_OPF}item')
+    }
+    paths = []
+    for itemref in package.iter(f'{_OPF}itemref'):
+        item = manifest.get(itemref.get('idref'))
+        if item is not None and 'html' in (item.get('media-type') or ''):
+            paths.append(posixpath.normpath(posixpath.join(base_dir, item.get('href'))))
+    return paths
+
+def extract(uploaded_file) -> str:
+    """Extract text from EPUB file, one page break per chapter."""
+    try:
+        with zipfile.ZipFile(io.BytesIO(uploaded_file.read())) as archive:
+            normalizer = TextNormalizer()
+            parts = []
+            for index, path in enumerate(read_spine(archive)):
+                if index:
+                    parts.append(normalizer.feed('\f'))
+                parts.append(html_to_text(decode_text(archive.read(path)), normalizer))
+            parts.append(normalizer.finish())
+        return ''.join(parts)
+
+    except zipfile.BadZipFile:
+        raise Exception("Error reading EPUB file: the file is not a valid EPUB book")
+    except Exception as e:
+        raise Exception(f"Error reading EPUB file: {str(e)}")
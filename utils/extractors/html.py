@@ -0,0 +1,82 @@
+from html.parser import HTMLParser
+from typing import List
+from utils.extractors.normalizer import TextNormalizer
+from utils.extractors.text import decode_text
+
+HTML_FEED_SIZE = 256 * 1024
+
+BLOCK_TAGS = frozenset({
+    'address', 'article', 'aside', 'blockquote', 'dd', 'div', 'dl', 'dt', 'figcaption',
+    'figure', 'footer', 'header', 'hr', 'main', 'nav', 'ol', 'p', 'pre', 'section',
+    'table', 'tr', 'ul'
+})
+HEADING_TAGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+SKIPPED_TAGS = frozenset({'script', 'style', 'noscript', 'template', 'head', 'svg'})
+
+class HTMLTextParser(HTMLParser):
+    """Convert HTML to plain text as it is fed.
+
+    Block elements become paragraphs, headings become markdown "#" lines
+    and list items "- " lines. Text collected so far is taken with drain().
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+        elif tag in HEADING_TAGS:
+            self.parts.append('\n\n' + '#' * HEADING_TAGS[tag] + ' ')
+        elif tag == 'li':
+            self.parts.append('\n- ')
+        elif tag == 'br':
+            self.parts.append('\n')
+        elif tag in ('td', 'th'):
+            self.parts.append(' ')
+        elif tag in BLOCK_TAGS:
+            self.parts.append('\n\n')
+
+    def handle_startendtag(self, tag, attrs):
+        if tag not in SKIPPED_TAGS:
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag in HEADING_TAGS or tag in BLOCK_TAGS:
+            self.parts.append('\n\n')
+
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+        # Source line breaks inside HTML text are just spaces
+        self.parts.append(data.replace('\n', ' '))
+
+    def drain(self) -> str:
+        """Take the text produced so far."""
+        text = ''.join(self.parts)
+        self.parts = []
+        return text
+
+def html_to_text(markup: str, normalizer: TextNormalizer) -> str:
+    """Convert HTML markup to normalized text, feeding the parser in chunks."""
+    parser = HTMLTextParser()
+    parts = []
+    for start in range(0, len(markup), HTML_FEED_SIZE):
+        parser.feed(markup[start:start + HTML_FEED_SIZE])
+        parts.append(normalizer.feed(parser.drain()))
+    parser.close()
+    parts.append(normalizer.feed(parser.drain()))
+    return ''.join(parts)
+
+def extract(uploaded_file) -> str:
+    """Extract text from HTML file."""
+    try:
+        normalizer = TextNormalizer()
+        text = html_to_text(decode_text(uploaded_file.read()), normalizer)
+        return text + normalizer.finish()
+    except Exception as e:
+        raise Exception(f"Error reading HTML file: {str(e)}")
@@ -0,0 +1,9 @@
+from utils.extractors.normalizer import normalize_text
+from utils.extractors.ocr import ocr_image_bytes
+
+def extract(uploaded_file) -> str:
+    """Extract text from an image (photo or scan) with OCR."""
+    try:
+        return normalize_text(ocr_image_bytes(uploaded_file.read()))
+    except Exception as e:
+        raise Exception(f"Error reading image: {str(e)}")
@@ -0,0 +1,91 @@
+import re
+import zipfile
+from typing import Dict, Optional
+from utils.extractors import find_extractor, sniff_extractor
+
+# Rough characters of extracted text per unit, used only for estimates
+CHARS_PER_PDF_PAGE = 2500
+BYTES_PER_PDF_PAGE = 60 * 1024   # when the page count cannot be read
+DOCX_XML_BYTES_PER_CHAR = 6      # WordprocessingML markup around each character
+PPTX_XML_BYTES_PER_CHAR = 12
+HTML_BYTES_PER_CHAR = 3
+
+_PDF_COUNT = re.compile(rb'/Count\s+(\d+)')
+_PDF_PAGE = re.compile(rb'/Type\s*/Page\b')
+_PPTX_SLIDE = re.compile(r'^ppt/slides/slide\d+\.xml$')
+
+def inspect_upload(uploaded_file) -> Dict:
+    """Cheaply describe an upload before extraction: real format, pages and text size.
+
+    Only the file header, the zip central directory or a byte scan for the
+    PDF page tree are read; nothing is decompressed or parsed.
+    """
+    uploaded_file.seek(0)
+    spec = sniff_extractor(uploaded_file)
+    claimed = find_extractor(uploaded_file.name, getattr(uploaded_file, 'type', ''))
+    info = {
+        'format': spec.name if spec else (claimed.name if claimed else None),
+        'claimed_format': claimed.name if claimed else None,
+        'sniffed': spec is not None,
+        'size': uploaded_file.size,
+        'pages': None,
+        'estimated_chars': None,
+        'uncompressed_size': None
+    }
+
+    try:
+        if info['format'] == 'pdf':
+            _inspect_pdf(uploaded_file, info)
+        elif info['format'] in ('docx', 'pptx', 'epub'):
+            _inspect_zip(uploaded_file, info)
+        elif info['format'] == 'html':
+            info['estimated_chars'] = info['size'] // HTML_BYTES_PER_CHAR
+        elif info['format'] == 'text':
+            info['estimated_chars'] = info['size']
+        elif info['format'] == 'image':
+            info['pages'] = 1
+            info['estimated_chars'] = CHARS_PER_PDF_PAGE
+    finally:
+        uploaded_file.seek(0)
+    return info
+
+def _inspect_pdf(uploaded_file, info: Dict):
+    """Read the page count from the PDF page tree (or estimate it from the size)."""
+    data = uploaded_file.getvalue() if hasattr(uploaded_file, 'getvalue') else uploaded_file.read()
+    counts = [int(match) for match in _PDF_COUNT.findall(data)]
+    pages = max(counts) if counts else len(_PDF_PAGE.findall(data))
+    if not pages:
+        # Page objects are inside compressed object streams
+        pages = max(1, len(data) // BYTES_PER_PDF_PAGE)
+    info['pages'] = pages
+    info['estimated_chars'] = pages * CHARS_PER_PDF_PAGE
+
+def _inspect_zip(uploaded_file, info: Dict):
+    """Estimate text size from the zip central directory."""
+    try:
+        archive = zipfile.ZipFile(uploaded_file)
+    except zipfile.BadZipFile:
+        info['format'] = None
+        return
+
+    with archive:
+        entries = archive.infolist()
+        info['uncompressed_size'] = sum(entry.file_size for entry in entries)
+        if info['format'] == 'docx':
+            document = _find_entry(archive, 'word/document.xml')
+            info['estimated_chars'] = (document.file_size if document else 0) // DOCX_XML_BYTES_PER_CHAR
+        elif info['format'] == 'pptx':
+            slides = [entry for entry in entries if _PPTX_SLIDE.match(entry.filename)]
+            info['pages'] = len(slides)
+            info['estimated_chars'] = sum(entry.file_size for entry in slides) // PPTX_XML_BYTES_PER_CHAR
+        else:
+            chapters = [entry for entry in entries if entry.filename.lower().endswith(('.xhtml', '.html', '.htm'))]
+            info['pages'] = len(chapters)
+            info['estimated_chars'] = sum(entry.file_size for entry in chapters) // HTML_BYTES_PER_CHAR
+
+def _find_entry(archive: zipfile.ZipFile, name: str) -> Optional[zipfile.ZipInfo]:
+    """Get a zip entry by name, or None."""
+    try:
+        return archive.getinfo(name)
+    except KeyError:
+        return None
@@ -0,0 +1,106 @@
+from typing import Iterable
+
+NORMALIZE_CHUNK_SIZE = 1024 * 1024
+PAGE_BREAK = "\n\n\f"  # paragraph break plus form feed marking a new page
+
+# Line endings and spaces to their canonical form, control characters dropped
+_TRANSLATION = {code: None for code in [*range(0x00, 0x09), 0x0B, *range(0x0E, 0x20), 0x7F]}
+_TRANSLATION.update({ord('\r'): '\n', ord('\t'): ' ', 0x85: '\n', 0xA0: ' ', 0x2028: '\n', 0x2029: '\n\n', 0x3000: ' '})
+_TRANSLATION.update({code: ' ' for code in range(0x2000, 0x200B)})
+
+def _normalize_block(text: str) -> str:
+    """Normalize translated text that starts and ends on a chunk boundary.
+
+    Space runs collapse to one space, spaces at line edges go, runs of blank
+    lines become one paragraph break and every form feed becomes a
+    PAGE_BREAK. Only str.replace/split are used: they run at memchr speed,
+    several times faster than a regex scan over the same text.
+    """
+    while '  ' in text:
+        text = text.replace('  ', ' ')
+    text = text.replace(' \n', '\n').replace('\n ', '\n')
+    while '\n\n\n' in text:
+        text = text.replace('\n\n\n', '\n\n')
+    text = text.lstrip(' ')
+    if '\f' not in text:
+        return text
+
+    pages = text.split('\f')
+    last = len(pages) - 1
+    for i, page in enumerate(pages):
+        if i > 0:
+            page = page.lstrip(' \n')
+        if i < last:
+            page = page.rstrip(' \n')
+        pages[i] = page
+    return PAGE_BREAK.join(pages)
+
+class TextNormalizer:
+    """Streaming text cleanup that replaces the old multi-regex clean_text.
+
+    Feed text in chunks (e.g. one PDF page at a time); each call returns the
+    normalized text that is final so far. Line breaks and paragraph breaks
+    (blank lines) are kept, other whitespace runs become one space, control
+    characters are dropped and form feeds become PAGE_BREAK.
+    """
+
+    def __init__(self):
+        self.pending = ""  # trailing whitespace that may merge with the next chunk
+        self.held_carriage_return = False  # a chunk ended inside a possible \r\n
+        self.started = False
+        self.pages = 0
+
+    def feed(self, chunk: str) -> str:
+        """Normalize the next chunk of text."""
+        if self.held_carriage_return:
+            chunk = '\r' + chunk
+        self.held_carriage_return = chunk.endswith('\r')
+        if self.held_carriage_return:
+            chunk = chunk[:-1]
+        text = self.pending + chunk.replace('\r\n', '\n').translate(_TRANSLATION)
+
+        # Hold back trailing whitespace: it may continue in the next chunk
+        end = len(text.rstrip(' \n\f'))
+        self.pending = text[end:]
+        text = text[:end]
+        if not text:
+            return ""
+        # A space-only run carried over from the last chunk is a word gap; keep one space
+        joins_words = self.started and text[0] == ' ' and text.lstrip(' ')[:1] not in ('\n', '\f')
+        text = _normalize_block(text)
+        if joins_words:
+            text = ' ' + text
+        elif not self.started:
+            # No leading whitespace, but keep page breaks of leading empty pages
+            text = text[2:] if text.startswith(PAGE_BREAK) else text.lstrip('\n')
+        self.started = True
+        return text
+
+    def feed_page(self, page_text: str) -> str:
+        """Normalize the next page of a paged document."""
+        prefix = self.feed('\f') if self.pages else ""
+        self.pages += 1
+        return prefix + self.feed(page_text)
+
+    def finish(self) -> str:
+        """Finish the stream (trailing whitespace is dropped)."""
+        self.pending = ""
+        self.held_carriage_return = False
+        return ""
+
+def normalize_pages(pages: Iterable[str]) -> str:
+    """Normalize page texts into one document with PAGE_BREAK between pages."""
+    normalizer = TextNormalizer()
+    parts = [normalizer.feed_page(page) for page in pages]
+    parts.append(normalizer.finish())
+    return ''.join(parts)
+
+def normalize_text(text: str) -> str:
+    """Normalize a whole text in NORMALIZE_CHUNK_SIZE chunks."""
+    normalizer = TextNormalizer()
+    parts = [
+        normalizer.feed(text[start:start + NORMALIZE_CHUNK_SIZE])
+        for start in range(0, len(text), NORMALIZE_CHUNK_SIZE)
+    ]
+    parts.append(normalizer.finish())
+    return ''.join(parts)
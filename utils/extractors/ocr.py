@@ -0,0 +1,161 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+# Optional OCR engine (Tesseract) and PDF page renderers
+try:
+    import pytesseract
+    from PIL import Image
+    PYTESSERACT_AVAILABLE = True
+except ImportError:
+    PYTESSERACT_AVAILABLE = False
+
+try:
+    import fitz  # PyMuPDF
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+
+try:
+    from pdf2image import convert_from_path
+    PDF2IMAGE_AVAILABLE = True
+except ImportError:
+    PDF2IMAGE_AVAILABLE = False
+
+OCR_LANGUAGES = os.environ.get('OCR_LANGUAGES', 'eng')
+OCR_DPI = 300
+OCR_CACHE_DIR = "ocr_cache"
+OCR_MAX_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+OCR_PAGES_PER_TASK = 4
+MIN_TEXT_LAYER_CHARS = 20  # pages with less extracted text are treated as scanned
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def is_ocr_available() -> bool:
+    """Check whether images can be OCR'd on this server."""
+    return PYTESSERACT_AVAILABLE and shutil.which(pytesseract.pytesseract.tesseract_cmd) is not None
+
+def is_pdf_ocr_available() -> bool:
+    """Check whether scanned PDF pages can be rendered and OCR'd."""
+    return is_ocr_available() and (PYMUPDF_AVAILABLE or PDF2IMAGE_AVAILABLE)
+
+def needs_ocr(page_text: str) -> bool:
+    """Check whether a page has no usable text layer."""
+    return len(page_text.strip()) < MIN_TEXT_LAYER_CHARS
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Get the shared OCR process pool, starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned, not forked: the Streamlit server process is multi-threaded
+            _pool = ProcessPoolExecutor(max_workers=OCR_MAX_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+def _cache_path(document_hash: str, page_number: int) -> str:
+    """Get the cache file of one OCR'd page."""
+    key = f"{document_hash}-{page_number}-{OCR_DPI}-{OCR_LANGUAGES}"
+    return os.path.join(OCR_CACHE_DIR, document_hash[:2], hashlib.sha256(key.encode()).hexdigest() + ".txt")
+
+def _read_cache(path: str):
+    """Read a cached page text, or None."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def _write_cache(path: str, text: str):
+    """Write a page text to the cache atomically."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+def _ocr_image(image) -> str:
+    """Run Tesseract on a PIL image."""
+    return pytesseract.image_to_string(image, lang=OCR_LANGUAGES)
+
+def _ocr_pdf_pages_worker(pdf_path: str, page_numbers: List[int]) -> Dict[int, str]:
+    """Render and OCR some pages of a PDF file (runs in a worker process)."""
+    results = {}
+    if PYMUPDF_AVAILABLE:
+        with fitz.open(pdf_path, filetype='pdf') as document:
+            for page_number in page_numbers:
+                pixmap = document[page_number].get_pixmap(dpi=OCR_DPI)
+                image = Image.frombytes('RGB', (pixmap.width, pixmap.height), pixmap.samples)
+                results[page_number] = _ocr_image(image)
+    else:
+        for page_number in page_numbers:
+            images = convert_from_path(pdf_path, dpi=OCR_DPI, first_page=page_number + 1, last_page=page_number + 1)
+            results[page_number] = _ocr_image(images[0]) if images else ""
+    return results
+
+def ocr_pdf_pages(data: bytes, page_numbers: List[int]) -> Dict[int, str]:
+    """OCR the given (0-based) PDF pages in parallel, reusing cached pages.
+
+    Returns page number -> text for the pages that could be OCR'd.
+    """
+    if not page_numbers or not is_pdf_ocr_available():
+        return {}
+
+    document_hash = hashlib.sha256(data).hexdigest()
+    results = {}
+    missing = []
+    for page_number in page_numbers:
+        cached = _read_cache(_cache_path(document_hash, page_number))
+        if cached is None:
+            missing.append(page_number)
+        else:
+            results[page_number] = cached
+
+    if not missing:
+        return results
+
+    # Workers read the PDF from a temporary file rather than each being sent a copy of it
+    with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as f:
+        f.write(data)
+        pdf_path = f.name
+    try:
+        batches = [missing[i:i + OCR_PAGES_PER_TASK] for i in range(0, len(missing), OCR_PAGES_PER_TASK)]
+        futures = [_get_pool().submit(_ocr_pdf_pages_worker, pdf_path, batch) for batch in batches]
+        for future in futures:
+            try:
+                batch_results = future.result()
+            except Exception as e:
+                # Leave these pages empty (and uncached) rather than failing the file
+                print(f"OCR failed for some pages: {e}")
+                continue
+            for page_number, text in batch_results.items():
+                _write_cache(_cache_path(document_hash, page_number), text)
+                results[page_number] = text
+    finally:
+        os.remove(pdf_path)
+    return results
+
+def ocr_image_bytes(data: bytes) -> str:
+    """OCR an image file, reusing the cached result for identical bytes."""
+    if not is_ocr_available():
+        raise Exception("Text recognition (OCR) is not available on this server. "
+                        "Install Tesseract and pytesseract to read images.")
+
+    path = _cache_path(hashlib.sha256(data).hexdigest(), 0)
+    cached = _read_cache(path)
+    if cached is not None:
+        return cached
+
+    with Image.open(io.BytesIO(data)) as image:
+        image.load()
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        text = _ocr_image(image)
+    _write_cache(path, text)
+    return text
@@ -0,0 +1,34 @@
+import io
+from typing import Iterator
+from utils.extractors.normalizer import normalize_pages
+from utils.extractors.ocr import needs_ocr, ocr_pdf_pages
+
+try:
+    import PyPDF2
+    PYPDF2_AVAILABLE = True
+except ImportError:
+    PYPDF2_AVAILABLE = False
+
+def iter_pdf_pages(data: bytes) -> Iterator[str]:
+    """Yield the raw text of each PDF page (empty for pages without a text layer)."""
+    if not PYPDF2_AVAILABLE:
+        raise Exception("PDF support requires PyPDF2. Install it with: pip install PyPDF2")
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(data))
+    for page in pdf_reader.pages:
+        yield page.extract_text() or ""
+
+def extract(uploaded_file) -> str:
+    """Extract text from PDF file, OCR'ing pages without a text layer."""
+    try:
+        data = uploaded_file.read()
+        pages = list(iter_pdf_pages(data))
+        
+        scanned = [page_number for page_number, text in enumerate(pages) if needs_ocr(text)]
+        if scanned:
+            for page_number, text in ocr_pdf_pages(data, scanned).items():
+                pages[page_number] = text
+        
+        # Pages are kept apart by page breaks
+        return normalize_pages(pages)
+    except Exception as e:
+        raise Exception(f"Error reading PDF: {str(e)}")
@@ -0,0 +1,64 @@
+import io
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import List
+from utils.extractors.normalizer import normalize_pages
+
+_A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+_P = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+_R = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_RELS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+_SLIDE_NAME = re.compile(r'^ppt/slides/slide(\d+)\.xml$')
+TITLE_PLACEHOLDERS = ('title', 'ctrTitle')
+
+def read_slide_paths(archive: zipfile.ZipFile) -> List[str]:
+    """Get slide paths in presentation order."""
+    try:
+        presentation = ET.fromstring(archive.read('ppt/presentation.xml'))
+        relationships = ET.fromstring(archive.read('ppt/_rels/presentation.xml.rels'))
+        targets = {
+            rel.get('Id'): posixpath.normpath(posixpath.join('ppt', rel.get('Target')))
+            for rel in relationships.iter(f'{_RELS}Relationship')
+        }
+        paths = [targets.get(slide.get(f'{_R}id')) for slide in presentation.iter(f'{_P}sldId')]
+        paths = [path for path in paths if path]
+        if paths:
+            return paths
+    except KeyError:
+        pass
+
+    # No usable slide list: fall back to slide file numbering
+    numbered = [(int(m.group(1)), name) for name in archive.namelist() if (m := _SLIDE_NAME.match(name))]
+    return [name for _, name in sorted(numbered)]
+
+def slide_to_text(slide_xml: bytes) -> str:
+    """Get a slide's text; the title placeholder becomes a markdown heading."""
+    slide = ET.fromstring(slide_xml)
+    blocks = []
+    for shape in slide.iter(f'{_P}sp'):
+        placeholder = shape.find(f'{_P}nvSpPr/{_P}nvPr/{_P}ph')
+        is_title = placeholder is not None and placeholder.get('type') in TITLE_PLACEHOLDERS
+        paragraphs = [
+            ''.join(run.text or '' for run in paragraph.iter(f'{_A}t')).strip()
+            for paragraph in shape.iter(f'{_A}p')
+        ]
+        paragraphs = [p for p in paragraphs if p]
+        if not paragraphs:
+            continue
+        if is_title:
+            blocks.insert(0, '# ' + ' '.join(paragraphs))
+        else:
+            blocks.append('\n'.join(paragraphs))
+    return '\n\n'.join(blocks)
+
+def extract(uploaded_file) -> str:
+    """Extract text from PPTX file, one page per slide."""
+    try:
+        with zipfile.ZipFile(io.BytesIO(uploaded_file.read())) as archive:
+            return normalize_pages(slide_to_text(archive.read(path)) for path in read_slide_paths(archive))
+    except zipfile.BadZipFile:
+        raise Exception("Error reading PPTX file: the file is not a valid PowerPoint presentation")
+    except Exception as e:
+        raise Exception(f"Error reading PPTX file: {str(e)}")
@@ -0,0 +1,15 @@
+from utils.extractors.normalizer import normalize_text
+
+def decode_text(data: bytes) -> str:
+    """Decode text bytes as UTF-8 (with or without BOM), falling back to Latin-1."""
+    try:
+        return data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return data.decode('latin-1')
+
+def extract(uploaded_file) -> str:
+    """Extract text from TXT/MD file."""
+    try:
+        return normalize_text(decode_text(uploaded_file.read()))
+    except Exception as e:
+        raise Exception(f"Error reading text file: {str(e)}")
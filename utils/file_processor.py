@@ -1,30 +1,32 @@
 import streamlit as st
-import PyPDF2
-import io
-import re
-from typing import Optional
+from typing import Dict, Optional
+from utils.extractors import find_extractor, get_supported_extensions, SNIFF_BYTES
+from utils.extractors.inspection import inspect_upload
+from utils.extractors.normalizer import normalize_text
+from utils.passages import PassageIndex, chunk_text
+
+# Upload limits, checked before any extraction work
+MAX_FILE_SIZE = 50 * 1024 * 1024
+MAX_PAGES = 2000
+MAX_TEXT_CHARS = 20_000_000
+MAX_UNCOMPRESSED_SIZE = 500 * 1024 * 1024
+MAX_COMPRESSION_RATIO = 100
 
 class FileProcessor:
     """Handle file processing and text extraction."""
     
     def __init__(self):
-        self.supported_formats = {
-            'pdf': self.extract_from_pdf,
-            'txt': self.extract_from_txt,
-            'md': self.extract_from_txt,
-            'docx': self.extract_from_docx
-        }
+        self.supported_formats = get_supported_extensions()
     
     def extract_text(self, uploaded_file) -> Optional[str]:
         """Extract text from uploaded file based on its type."""
         try:
-            # Get file extension
-            file_extension = uploaded_file.name.split('.')[-1].lower()
+            extractor = find_extractor(uploaded_file.name, getattr(uploaded_file, 'type', ''), uploaded_file)
             
-            if file_extension in self.supported_formats:
-                extractor = self.supported_formats[file_extension]
-                return extractor(uploaded_file)
+            if extractor:
+                return extractor.extract(uploaded_file)
             else:
+                file_extension = uploaded_file.name.split('.')[-1].lower()
                 st.error(f"Unsupported file format: {file_extension}")
                 return None
                 
@@ -32,85 +34,15 @@ class FileProcessor:
             st.error(f"Error extracting text from {uploaded_file.name}: {str(e)}")
             return None
     
-    def extract_from_pdf(self, uploaded_file) -> str:
-        """Extract text from PDF file."""
-        try:
-            # Create a PDF reader object
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(uploaded_file.read()))
-            
-            text = ""
-            for page_num in range(len(pdf_reader.pages)):
-                page = pdf_reader.pages[page_num]
-                text += page.extract_text() + "\n"
-            
-            return self.clean_text(text)
-            
-        except Exception as e:
-            raise Exception(f"Error reading PDF: {str(e)}")
-    
-    def extract_from_txt(self, uploaded_file) -> str:
-        """Extract text from TXT/MD file."""
-        try:
-            # Read text file
-            text = uploaded_file.read().decode('utf-8')
-            return self.clean_text(text)
-            
-        except UnicodeDecodeError:
-            # Try different encodings
-            try:
-                uploaded_file.seek(0)
-                text = uploaded_file.read().decode('latin-1')
-                return self.clean_text(text)
-            except Exception as e:
-                raise Exception(f"Error reading text file: {str(e)}")
-        except Exception as e:
-            raise Exception(f"Error reading text file: {str(e)}")
-    
-    def extract_from_docx(self, uploaded_file) -> str:
-        """Extract text from DOCX file."""
-        try:
-            # For now, show info message about DOCX support
-            st.info("DOCX support is limited. For best results, please convert to PDF or TXT format.")
-            
-            # Basic DOCX text extraction (simplified)
-            # This is a basic implementation - for full DOCX support, python-docx library would be needed
-            content = uploaded_file.read()
-            
-            # Try to extract readable text (very basic approach)
-            text = str(content, errors='ignore')
-            
-            # Clean up the extracted text
-            text = re.sub(r'[^\x20-\x7E\n]', '', text)  # Remove non-printable characters
-            text = re.sub(r'\n+', '\n', text)  # Remove multiple newlines
-            
-            if len(text.strip()) < 100:  # If extraction didn't work well
-                st.warning("Text extraction from DOCX may be incomplete. Consider converting to PDF or TXT format.")
-                return "DOCX content extraction incomplete. Please convert to PDF or TXT format for better results."
-            
-            return self.clean_text(text)
-            
-        except Exception as e:
-            raise Exception(f"Error reading DOCX file: {str(e)}")
-    
     def clean_text(self, text: str) -> str:
         """Clean and normalize extracted text."""
         if not text:
             return ""
-        
-        # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Remove control characters but keep newlines
-        text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', text)
-        
-        # Normalize line breaks
-        text = re.sub(r'\r\n', '\n', text)
-        text = re.sub(r'\r', '\n', text)
-        
-        # Remove excessive blank lines
-        text = re.sub(r'\n\s*\n\s*\n', '\n\n', text)
-        
-        return text.strip()
+        return normalize_text(text)
+    
+    def split_passages(self, text: str) -> PassageIndex:
+        """Split extracted text into addressable passages (page, heading path, span, tokens)."""
+        return chunk_text(text or "")
     
     def get_text_statistics(self, text: str) -> dict:
         """Get statistics about the extracted text."""
@@ -119,31 +51,84 @@ class FileProcessor:
                 'characters': 0,
                 'words': 0,
                 'lines': 0,
-                'paragraphs': 0
+                'paragraphs': 0,
+                'pages': 0
             }
         
         return {
             'characters': len(text),
             'words': len(text.split()),
             'lines': len(text.split('\n')),
-            'paragraphs': len([p for p in text.split('\n\n') if p.strip()])
+            'paragraphs': len([p for p in text.split('\n\n') if p.strip()]),
+            'pages': text.count('\f') + 1
         }
     
+    def inspect_file(self, uploaded_file) -> Dict:
+        """Inspect and validate an upload without extracting it.
+        
+        Returns the format, page and text-size estimates from
+        inspect_upload() plus 'valid' and 'message'.
+        """
+        info = inspect_upload(uploaded_file)
+        valid, message = self._check_inspection(uploaded_file, info)
+        info['valid'] = valid
+        info['message'] = message
+        return info
+    
     def validate_file(self, uploaded_file) -> tuple[bool, str]:
         """Validate uploaded file."""
         if uploaded_file is None:
             return False, "No file provided"
         
-        # Check file size (limit to 50MB)
-        if uploaded_file.size > 50 * 1024 * 1024:
-            return False, "File too large. Maximum size is 50MB."
+        # Check file size before reading anything
+        if uploaded_file.size > MAX_FILE_SIZE:
+            return False, f"File too large. Maximum size is {MAX_FILE_SIZE // (1024 * 1024)}MB."
+        
+        info = self.inspect_file(uploaded_file)
+        return info['valid'], info['message']
+    
+    def _check_inspection(self, uploaded_file, info: Dict) -> tuple[bool, str]:
+        """Decide whether an inspected upload can be processed."""
+        if info['size'] > MAX_FILE_SIZE:
+            return False, f"File too large. Maximum size is {MAX_FILE_SIZE // (1024 * 1024)}MB."
         
-        # Check file extension
         file_extension = uploaded_file.name.split('.')[-1].lower()
-        if file_extension not in self.supported_formats:
+        if info['format'] is None:
+            if info['claimed_format']:
+                return False, f"The file does not look like a valid {file_extension.upper()} file"
             return False, f"Unsupported file format: {file_extension}"
         
-        return True, "File is valid"
+        if info['format'] == 'image':
+            # Imported here so the OCR libraries only load when an image is uploaded
+            from utils.extractors.ocr import is_ocr_available
+            if not is_ocr_available():
+                return False, "Reading text from images needs OCR (Tesseract), which is not installed on this server"
+        
+        if info['format'] == 'text':
+            uploaded_file.seek(0)
+            head = uploaded_file.read(SNIFF_BYTES)
+            uploaded_file.seek(0)
+            if b'\x00' in head:
+                return False, "The file looks like a binary file, not text"
+        
+        uncompressed = info['uncompressed_size']
+        if uncompressed and (uncompressed > MAX_UNCOMPRESSED_SIZE or uncompressed > info['size'] * MAX_COMPRESSION_RATIO):
+            return False, "The archive expands to an unreasonable size and was rejected"
+        
+        if info['pages'] and info['pages'] > MAX_PAGES:
+            return False, f"Too many pages ({info['pages']:,}). Maximum is {MAX_PAGES:,}; please split the file."
+        
+        if info['estimated_chars'] and info['estimated_chars'] > MAX_TEXT_CHARS:
+            return False, "The file contains too much text to analyze; please split it into smaller files."
+        
+        details = []
+        if info['sniffed'] and info['claimed_format'] and info['format'] != info['claimed_format']:
+            details.append(f"detected {info['format'].upper()} content despite the .{file_extension} name")
+        if info['pages']:
+            details.append(f"{info['pages']:,} pages")
+        if info['estimated_chars']:
+            details.append(f"~{info['estimated_chars']:,} characters")
+        return True, "File is valid" + (f" ({', '.join(details)})" if details else "")
     
     def preview_text(self, text: str, max_length: int = 500) -> str:
         """Get a preview of the extracted text."""
@@ -0,0 +1,325 @@
+import io
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+# Job states
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_COMPLETED = 'completed'
+JOB_FAILED = 'failed'
+
+ACTIVE_STATES = (JOB_QUEUED, JOB_RUNNING)
+
+# Files above this estimated text size run in their own single-worker lane
+# so one huge upload cannot hold up everyone's small files
+LARGE_FILE_CHARS = 1_000_000
+
+# Per-user quotas (by stable owner key, over a rolling day)
+MAX_ACTIVE_JOBS_PER_USER = 5
+DAILY_UPLOAD_BYTES = 250 * 1024 * 1024
+DAILY_TEXT_CHARS = 50_000_000
+QUOTA_WINDOW_SECONDS = 24 * 60 * 60
+
+# Text sent for AI analysis, as passages sampled across the document
+ANALYSIS_SAMPLE_CHARS = 4000
+
+# Finished jobs are kept this long (longer than the quota window), then purged
+JOB_RETENTION_SECONDS = 7 * 24 * 60 * 60
+PURGE_INTERVAL_SECONDS = 60 * 60
+
+class UploadedBytes(io.BytesIO):
+    """In-memory stand-in for a Streamlit UploadedFile."""
+
+    def __init__(self, data: bytes, name: str, file_type: str = ''):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+        self.type = file_type
+
+class AnalysisJobQueue:
+    """Run file extraction and analysis jobs outside the Streamlit script run.
+
+    Jobs are recorded in a SQLite table so their status and results survive
+    reruns, tab switches and new browser sessions. All sessions on the server
+    share one bounded worker pool. Extracted text goes to the user's material
+    library; a job's result only refers to it, is cleared once collected, and
+    finished jobs are purged after JOB_RETENTION_SECONDS.
+    """
+
+    def __init__(self, db_path: str = "jobs.db", max_workers: int = 4, large_workers: int = 1):
+        self.db_path = db_path
+        self.max_workers = max_workers
+        self.large_workers = large_workers
+        self.executor = None
+        self.large_executor = None
+        self.initialized = False
+        self.lock = threading.Lock()
+        self.last_purge = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection to the job table, creating it on first use."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        if not self.initialized:
+            with self.lock:
+                if not self.initialized:
+                    self._init_db(conn)
+                    self.initialized = True
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """Open a connection that commits on success and is always closed."""
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self, conn: sqlite3.Connection):
+        """Create the job table and fail jobs left over from a previous server run."""
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                file_size INTEGER,
+                file_type TEXT,
+                status TEXT NOT NULL,
+                progress REAL DEFAULT 0,
+                message TEXT,
+                result TEXT,
+                error TEXT,
+                created_at REAL,
+                updated_at REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs (user_id, created_at)")
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for column, column_type in (('content_id', 'TEXT'), ('owner_key', 'TEXT'), ('estimated_chars', 'INTEGER'),
+                                    ('collected', 'INTEGER DEFAULT 0')):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_owner ON jobs (owner_key, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_updated ON jobs (updated_at)")
+        # Uploaded bytes and API keys are never persisted, so these cannot resume
+        conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE status IN (?, ?)",
+            (JOB_FAILED, "Interrupted by a server restart. Please process the file again.",
+             time.time(), *ACTIVE_STATES)
+        )
+        conn.commit()
+
+    def _get_executor(self, large: bool = False) -> ThreadPoolExecutor:
+        """Get the shared worker pool (or the large-file lane), starting it if needed."""
+        with self.lock:
+            if large:
+                if self.large_executor is None:
+                    self.large_executor = ThreadPoolExecutor(
+                        max_workers=self.large_workers,
+                        thread_name_prefix="analysis-large-worker"
+                    )
+                return self.large_executor
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="analysis-worker"
+                )
+            return self.executor
+
+    def check_quota(self, owner_key: str, file_size: int, estimated_chars: int = 0) -> tuple[bool, str]:
+        """Check whether a user may queue another file."""
+        since = time.time() - QUOTA_WINDOW_SECONDS
+        with self._connection() as conn:
+            active = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE owner_key = ? AND status IN (?, ?)",
+                (owner_key, *ACTIVE_STATES)
+            ).fetchone()[0]
+            used_bytes, used_chars = conn.execute(
+                "SELECT COALESCE(SUM(file_size), 0), COALESCE(SUM(estimated_chars), 0) FROM jobs "
+                "WHERE owner_key = ? AND created_at >= ? AND status != ?",
+                (owner_key, since, JOB_FAILED)
+            ).fetchone()
+
+        if active >= MAX_ACTIVE_JOBS_PER_USER:
+            return False, f"You already have {active} files processing. Please wait for some to finish."
+        if used_bytes + file_size > DAILY_UPLOAD_BYTES:
+            return False, f"Daily upload quota reached ({DAILY_UPLOAD_BYTES // (1024 * 1024)}MB per day)."
+        if used_chars + (estimated_chars or 0) > DAILY_TEXT_CHARS:
+            return False, "Daily text processing quota reached. Please try again tomorrow."
+        return True, "OK"
+
+    def submit(self, user_id: str, filename: str, data: bytes, file_type: str, ai_config: Dict,
+               content_id: Optional[str] = None, owner_key: Optional[str] = None,
+               estimated_chars: Optional[int] = None, class_scope: Optional[str] = None) -> str:
+        """Queue a file for extraction and analysis and return the job id.
+
+        `ai_config` holds the provider, api_key and model_version to use; it is
+        passed to the worker in memory only. `content_id` identifies the file
+        in the user's material library, `owner_key` the user for quotas and
+        duplicate detection, `class_scope` the class whose analyses may be
+        reused. Files estimated above LARGE_FILE_CHARS go to the large-file lane.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        if now - self.last_purge > PURGE_INTERVAL_SECONDS:
+            self.last_purge = now
+            self.purge_jobs()
+        large = (estimated_chars or 0) > LARGE_FILE_CHARS
+        message = "Waiting for a large-file worker..." if large else "Waiting for a worker..."
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, user_id, owner_key, filename, file_size, file_type, content_id, estimated_chars, "
+                "status, progress, message, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?)",
+                (job_id, user_id, owner_key, filename, len(data), file_type, content_id, estimated_chars,
+                 JOB_QUEUED, message, now, now)
+            )
+        self._get_executor(large).submit(self._run_job, job_id, filename, data, file_type, dict(ai_config),
+                                         content_id, owner_key, class_scope)
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """Get a job by id."""
+        with self._connection() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def list_jobs(self, user_id: str, limit: int = 20) -> List[Dict]:
+        """Get a user's most recent jobs, newest first (without results)."""
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT id, user_id, filename, file_size, file_type, content_id, status, progress, message, error, "
+                "collected, created_at, updated_at "
+                "FROM jobs WHERE user_id = ? ORDER BY created_at DESC LIMIT ?",
+                (user_id, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def has_active_jobs(self, user_id: str) -> bool:
+        """Check whether a user has queued or running jobs."""
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM jobs WHERE user_id = ? AND status IN (?, ?) LIMIT 1",
+                (user_id, *ACTIVE_STATES)
+            ).fetchone()
+        return row is not None
+
+    def mark_collected(self, job_id: str):
+        """Record that a completed job's result was added to the library, and drop the result."""
+        with self._connection() as conn:
+            conn.execute("UPDATE jobs SET collected = 1, result = NULL WHERE id = ?", (job_id,))
+
+    def purge_jobs(self, max_age: float = JOB_RETENTION_SECONDS):
+        """Delete finished jobs last updated more than `max_age` seconds ago."""
+        with self._connection() as conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE updated_at < ? AND status NOT IN (?, ?)",
+                (time.time() - max_age, *ACTIVE_STATES)
+            )
+
+    def _update(self, job_id: str, **fields):
+        """Update job fields."""
+        fields['updated_at'] = time.time()
+        assignments = ', '.join(f"{name} = ?" for name in fields)
+        with self._connection() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def _run_job(self, job_id: str, filename: str, data: bytes, file_type: str, ai_config: Dict,
+                 content_id: Optional[str] = None, owner_key: Optional[str] = None,
+                 class_scope: Optional[str] = None):
+        """Extract and analyze a file (runs on a worker thread).
+
+        Near-duplicates of an already analyzed material (in the user's
+        library or their class) reuse its analysis instead of calling the AI.
+        """
+        from utils.file_processor import FileProcessor
+        from utils.ai_models import create_ai_client, get_fallback_analysis, run_sync
+        from utils.duplicates import fingerprint_text, find_duplicate
+        from utils.material_library import MaterialLibrary
+
+        try:
+            self._update(job_id, status=JOB_RUNNING, progress=0.1, message="Extracting text...")
+            processor = FileProcessor()
+            text_content = processor.extract_text(UploadedBytes(data, filename, file_type))
+            if not text_content:
+                self._update(job_id, status=JOB_FAILED, error=f"Could not extract text from {filename}")
+                return
+
+            self._update(job_id, progress=0.3, message="Checking for duplicates...")
+            fingerprint = fingerprint_text(text_content)
+            duplicate = None
+            if fingerprint and owner_key:
+                duplicate = find_duplicate(fingerprint, owner_key, class_scope, exclude=content_id)
+
+            passages = None
+            if duplicate and not duplicate['shared']:
+                # A re-export with identical text can reuse the stored passages too
+                library = MaterialLibrary(owner_key)
+                if library.load_text(duplicate['content_id']) == text_content:
+                    passages = library.load_passages(duplicate['content_id'])
+            if passages is None:
+                passages = processor.split_passages(text_content)
+
+            if duplicate:
+                analysis = duplicate['analysis']
+                message = describe_duplicate(duplicate)
+            else:
+                self._update(job_id, progress=0.5, message="Analyzing with AI...")
+                message = "Analysis complete"
+                try:
+                    # Analyze whole passages sampled across the document, not just its opening
+                    sample = "\n\n".join(
+                        text_content[passages.starts[i]:passages.ends[i]]
+                        for i in passages.sample(ANALYSIS_SAMPLE_CHARS)
+                    )
+                    client = create_ai_client(ai_config['provider'], ai_config['api_key'], ai_config['model_version'])
+                    analysis = run_sync(client.aanalyze(sample, filename))
+                except Exception as e:
+                    analysis = get_fallback_analysis()
+                    message = f"AI analysis failed ({str(e)}); basic analysis used"
+
+            result = {
+                'fingerprint': fingerprint,
+                'duplicate_of': {
+                    'name': None if duplicate['shared'] else duplicate['name'],
+                    'similarity': duplicate['similarity'],
+                    'shared': duplicate['shared']
+                } if duplicate else None,
+                'analysis': analysis
+            }
+            if content_id and owner_key:
+                # The result refers to the text in the library rather than holding a copy
+                MaterialLibrary(owner_key).save_text(content_id, text_content, passages)
+            else:
+                result.update({'content': text_content, 'passages': passages.to_dict()})
+            self._update(job_id, status=JOB_COMPLETED, progress=1.0, message=message, result=json.dumps(result))
+
+        except Exception as e:
+            self._update(job_id, status=JOB_FAILED, error=str(e))
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Dict:
+        """Convert a job row to a dict, decoding the result."""
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job.get('result') else None
+        return job
+
+def describe_duplicate(duplicate: Dict) -> str:
+    """Explain to the user why a file's analysis was reused."""
+    similarity = f"{duplicate['similarity']:.0%} similar"
+    if duplicate.get('shared'):
+        # Classmates' file names are not shown
+        return f"Matches a file already analyzed in your class ({similarity}); reused that analysis"
+    return f"Near-duplicate of {duplicate['name']} in your library ({similarity}); reused its analysis"
+
+# Global job queue shared by all sessions on this server
+job_queue = AnalysisJobQueue()
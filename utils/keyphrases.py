@@ -0,0 +1,238 @@
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from utils.text_analysis import compute_phrase_frequencies
+
+# Longer phrases are rarer but more specific; weight them up accordingly
+PHRASE_LENGTH_WEIGHTS = {1: 1.0, 2: 1.6, 3: 2.0}
+MAX_CLASS_DOCUMENTS = 2000
+
+class PhraseVocabulary:
+    """Phrase -> column id mapping of one keyphrase index.
+
+    Columns of phrases no document uses any more are released and reused,
+    so an index's vectors stay as large as its live vocabulary.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.phrases = []  # column id -> phrase (None for a released column)
+        self.weights = np.zeros(64)
+        self.free = []
+
+    def encode(self, phrases: Iterable[str]) -> np.ndarray:
+        """Get column ids of phrases, adding unseen ones."""
+        column_ids = []
+        for phrase in phrases:
+            column_id = self.ids.get(phrase)
+            if column_id is None:
+                if self.free:
+                    column_id = self.free.pop()
+                    self.phrases[column_id] = phrase
+                else:
+                    column_id = len(self.phrases)
+                    self.phrases.append(phrase)
+                    if len(self.phrases) > len(self.weights):
+                        self.weights = _grow(self.weights, len(self.phrases))
+                self.ids[phrase] = column_id
+                self.weights[column_id] = PHRASE_LENGTH_WEIGHTS.get(phrase.count(' ') + 1, 2.0)
+            column_ids.append(column_id)
+        return np.array(column_ids, dtype=np.int64)
+
+    def release(self, column_ids: Iterable[int]):
+        """Release columns for reuse by new phrases."""
+        for column_id in column_ids:
+            del self.ids[self.phrases[column_id]]
+            self.phrases[column_id] = None
+            self.free.append(column_id)
+
+    def __len__(self) -> int:
+        return len(self.phrases)
+
+class KeyphraseIndex:
+    """TF-IDF keyphrase ranking over a set of documents.
+
+    Each document is stored as a sparse row (column ids and normalized term
+    frequencies) built from its phrase counts (see
+    text_analysis.compute_phrase_frequencies). Document frequencies and the
+    summed term frequencies are dense vectors over the index's own
+    vocabulary, updated incrementally as documents are added or removed, so
+    ranking the whole corpus is a few vectorized operations regardless of
+    how many pages it holds.
+    """
+
+    def __init__(self, max_documents: Optional[int] = None):
+        self.max_documents = max_documents
+        self.documents = OrderedDict()  # doc id -> (phrase counts, column ids, term frequencies)
+        self.vocabulary = PhraseVocabulary()
+        self.doc_freq = np.zeros(len(self.vocabulary.weights), dtype=np.int64)
+        self.tf_sum = np.zeros(len(self.vocabulary.weights))
+        self.version = 0
+        self.lock = threading.RLock()
+        self._score_cache = {}
+
+    def add_document(self, doc_id: str, phrase_counts: Dict[str, int]):
+        """Add or replace a document."""
+        with self.lock:
+            if doc_id in self.documents:
+                if self.documents[doc_id][0] is phrase_counts:
+                    return
+                self.remove_document(doc_id)
+
+            column_ids = self.vocabulary.encode(phrase_counts.keys())
+            counts = np.fromiter(phrase_counts.values(), dtype=np.float64, count=len(phrase_counts))
+            frequencies = counts / max(1.0, counts.sum())
+            self._ensure_capacity(len(self.vocabulary.weights))
+            self.doc_freq[column_ids] += 1
+            self.tf_sum[column_ids] += frequencies
+            self.documents[doc_id] = (phrase_counts, column_ids, frequencies)
+
+            if self.max_documents and len(self.documents) > self.max_documents:
+                self.remove_document(next(iter(self.documents)))
+            self._changed()
+
+    def remove_document(self, doc_id: str):
+        """Remove a document."""
+        with self.lock:
+            entry = self.documents.pop(doc_id, None)
+            if entry is None:
+                return
+            _, column_ids, frequencies = entry
+            self.doc_freq[column_ids] -= 1
+            self.tf_sum[column_ids] -= frequencies
+            unused = column_ids[self.doc_freq[column_ids] == 0]
+            self.tf_sum[unused] = 0.0
+            self.vocabulary.release(unused.tolist())
+            self._changed()
+
+    def sync(self, documents: Dict[str, Dict[str, int]]):
+        """Make the index hold exactly the given documents."""
+        with self.lock:
+            for doc_id in [d for d in self.documents if d not in documents]:
+                self.remove_document(doc_id)
+            for doc_id, phrase_counts in documents.items():
+                self.add_document(doc_id, phrase_counts)
+
+    def idf_vector(self, phrases: Optional[List[Optional[str]]] = None) -> np.ndarray:
+        """Smoothed inverse document frequencies of phrases (default: this index's columns)."""
+        with self.lock:
+            if phrases is None:
+                doc_freq = self.doc_freq
+            else:
+                ids = self.vocabulary.ids
+                doc_freq = np.fromiter(
+                    (self.doc_freq[ids[p]] if p in ids else 0 for p in phrases), dtype=np.int64, count=len(phrases)
+                )
+            return np.log((1 + len(self.documents)) / (1 + doc_freq)) + 1
+
+    def score_phrases(self, doc_ids: Optional[Iterable[str]] = None,
+                      idf_index: Optional['KeyphraseIndex'] = None) -> np.ndarray:
+        """Summed TF-IDF score of every column's phrase over the given documents (default: all).
+
+        `idf_index` scores against another corpus's document frequencies,
+        e.g. a user's files against their class.
+        """
+        idf_index = idf_index or self
+        with self.lock:
+            doc_ids = None if doc_ids is None else tuple(d for d in doc_ids if d in self.documents)
+            cache_key = (doc_ids, id(idf_index), self.version, idf_index.version)
+            cached = self._score_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            size = len(self.tf_sum)
+            if doc_ids is None:
+                tf = self.tf_sum.copy()
+            else:
+                tf = np.zeros(size)
+                for doc_id in doc_ids:
+                    _, column_ids, frequencies = self.documents[doc_id]
+                    tf[column_ids] += frequencies
+
+            if idf_index is self:
+                idf = self.idf_vector()
+            else:
+                phrases = self.vocabulary.phrases
+                idf = idf_index.idf_vector(phrases + [None] * (size - len(phrases)))
+            scores = tf * idf * self.vocabulary.weights[:size]
+            scores[tf <= 1e-12] = 0.0
+
+            if len(self._score_cache) > 32:
+                self._score_cache.clear()
+            self._score_cache[cache_key] = scores
+            return scores
+
+    def top_phrases(self, limit: int = 10, doc_ids: Optional[Iterable[str]] = None,
+                    idf_index: Optional['KeyphraseIndex'] = None) -> List[Tuple[str, float]]:
+        """Get the highest scoring phrases, skipping ones covered by a better phrase."""
+        scores = self.score_phrases(doc_ids, idf_index)
+        candidates = min(limit * 5, int(np.count_nonzero(scores)))
+        if candidates == 0:
+            return []
+        top_ids = np.argpartition(scores, -candidates)[-candidates:]
+        top_ids = top_ids[np.argsort(scores[top_ids])[::-1]]
+
+        selected = []
+        covered_words = set()
+        for column_id in top_ids:
+            phrase = self.vocabulary.phrases[column_id]
+            words = phrase.split()
+            # Skip phrases mostly made of words a better phrase already shows
+            if sum(word in covered_words for word in words) * 2 > len(words):
+                continue
+            selected.append((phrase, float(scores[column_id])))
+            covered_words.update(words)
+            if len(selected) == limit:
+                break
+        return selected
+
+    def phrase_count(self, phrase: str, doc_ids: Optional[Iterable[str]] = None) -> int:
+        """Get how often a phrase occurs in the given documents (default: all)."""
+        with self.lock:
+            doc_ids = self.documents if doc_ids is None else doc_ids
+            return sum(self.documents[d][0].get(phrase, 0) for d in doc_ids if d in self.documents)
+
+    def score_topic(self, topic: str, scores: np.ndarray) -> float:
+        """Score a free-text topic (e.g. from AI analysis) by its best matching phrase."""
+        best = 0.0
+        with self.lock:
+            for phrase in compute_phrase_frequencies(topic):
+                column_id = self.vocabulary.ids.get(phrase)
+                if column_id is not None and column_id < len(scores):
+                    best = max(best, float(scores[column_id]))
+        return best
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def _ensure_capacity(self, size: int):
+        """Grow the dense vectors to cover `size` vocabulary columns."""
+        if size > len(self.tf_sum):
+            self.doc_freq = _grow(self.doc_freq, size)
+            self.tf_sum = _grow(self.tf_sum, size)
+
+    def _changed(self):
+        """Invalidate cached scores."""
+        self.version += 1
+        self._score_cache.clear()
+
+def _grow(array: np.ndarray, size: int) -> np.ndarray:
+    """Return a zero-padded copy of an array with room for at least `size` items."""
+    capacity = max(size, len(array) * 2)
+    grown = np.zeros(capacity, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+# Process-wide class corpora, keyed by class scope
+_class_indexes = {}
+_class_indexes_lock = threading.Lock()
+
+def get_class_keyphrase_index(scope: str) -> KeyphraseIndex:
+    """Get the shared keyphrase index of a class."""
+    with _class_indexes_lock:
+        index = _class_indexes.get(scope)
+        if index is None:
+            index = KeyphraseIndex(max_documents=MAX_CLASS_DOCUMENTS)
+            _class_indexes[scope] = index
+        return index
@@ -0,0 +1,346 @@
+import streamlit as st
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from utils.text_store import text_store, TextHandle
+from utils.text_analysis import top_phrase_frequencies
+from utils.keyphrases import KeyphraseIndex, get_class_keyphrase_index
+from utils.passages import PassageIndex, chunk_text, postings_cache, search_passages
+
+try:
+    import fcntl
+except ImportError:  # Windows: only sessions within this process are serialized
+    fcntl = None
+
+# Serializes index updates between sessions of this process (flock covers other processes)
+_index_lock = threading.Lock()
+
+class MaterialLibrary:
+    """Per-user library of uploaded study materials on disk.
+
+    Layout under `library/<user key>/`:
+        blobs/<content id>          original uploaded bytes
+        text/<content id>.txt.gz    compressed extracted text
+        text/<content id>.passages.json.gz
+                                    passage index of the text (see utils.passages)
+        index.json                  metadata and analysis per material
+        index.json.lock             lock file held while index.json is updated
+
+    Materials are addressed by the SHA-256 of their original bytes, so the
+    same file uploaded twice is stored (and analyzed) once. Loading the
+    library reads only the index; text is read on demand.
+    """
+
+    def __init__(self, user_key: str, base_dir: str = "library"):
+        self.user_key = user_key
+        self.root = os.path.join(base_dir, user_key)
+        self.blob_dir = os.path.join(self.root, "blobs")
+        self.text_dir = os.path.join(self.root, "text")
+        self.index_file = os.path.join(self.root, "index.json")
+        self.index = self.load_index()
+
+    @staticmethod
+    def get_content_id(data: bytes) -> str:
+        """Get the content address of uploaded bytes."""
+        return hashlib.sha256(data).hexdigest()
+
+    def load_index(self) -> Dict:
+        """Load the metadata index."""
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file, 'r') as f:
+                    return json.load(f)
+            except Exception:
+                pass
+        return {}
+
+    @contextmanager
+    def _locked_index(self):
+        """Hold the index lock and re-read the index, so an update merges with other sessions' writes."""
+        os.makedirs(self.root, exist_ok=True)
+        with _index_lock, open(self.index_file + ".lock", 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self.index = self.load_index()
+                yield self.index
+                self.save_index()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def save_index(self):
+        """Save the metadata index atomically (call within _locked_index)."""
+        os.makedirs(self.root, exist_ok=True)
+        temp_file = self.index_file + ".tmp"
+        try:
+            with open(temp_file, 'w') as f:
+                json.dump(self.index, f, indent=2)
+            os.replace(temp_file, self.index_file)
+        except Exception as e:
+            print(f"Error saving material library index: {e}")
+
+    def save_blob(self, data: bytes) -> str:
+        """Store original uploaded bytes and return their content id."""
+        content_id = self.get_content_id(data)
+        blob_path = os.path.join(self.blob_dir, content_id)
+        if not os.path.exists(blob_path):
+            os.makedirs(self.blob_dir, exist_ok=True)
+            with open(blob_path, 'wb') as f:
+                f.write(data)
+        return content_id
+
+    def has_analysis(self, content_id: str) -> bool:
+        """Check whether a material has already been extracted and analyzed."""
+        entry = self.index.get(content_id)
+        return bool(entry and entry.get('analysis')) and os.path.exists(self._text_path(content_id))
+
+    def add_material(self, content_id: str, name: str, size: int, file_type: str, text: str, analysis: Dict,
+                     passages: Optional[PassageIndex] = None, fingerprint: Optional[List[int]] = None,
+                     duplicate_of: Optional[Dict] = None, save_text: bool = True,
+                     phrase_frequencies: Optional[Dict[str, int]] = None):
+        """Store extracted text, its passages and analysis for a material.
+
+        `fingerprint` is the text's MinHash signature (see utils.duplicates);
+        `duplicate_of` describes the material whose analysis was reused.
+        `phrase_frequencies` are the text's top keyphrase counts (computed
+        here if not given), kept so the text is not re-read to rank them.
+        With `save_text` False the text and passages are already stored
+        (see save_text) and only the index entry is written.
+        """
+        if save_text:
+            self.save_text(content_id, text, passages)
+
+        if phrase_frequencies is None:
+            phrase_frequencies = top_phrase_frequencies(text)
+        now = time.time()
+        with self._locked_index() as index:
+            entry = index.get(content_id, {'added_at': now})
+            entry.update({
+                'name': name,
+                'size': size,
+                'type': file_type,
+                'content_length': len(text),
+                'word_count': len(text.split()),
+                'line_count': text.count('\n') + 1,
+                'phrase_frequencies': phrase_frequencies,
+                'analysis': analysis,
+                'fingerprint': fingerprint,
+                'duplicate_of': duplicate_of,
+                'updated_at': now
+            })
+            index[content_id] = entry
+
+    def save_text(self, content_id: str, text: str, passages: Optional[PassageIndex] = None):
+        """Store a material's extracted text and its passages."""
+        os.makedirs(self.text_dir, exist_ok=True)
+        with gzip.open(self._text_path(content_id), 'wt', encoding='utf-8') as f:
+            f.write(text)
+        self.save_passages(content_id, passages if passages is not None else chunk_text(text))
+
+    def list_materials(self) -> List[Dict]:
+        """Get metadata of all materials, oldest first."""
+        materials = [
+            {'content_id': content_id, **entry}
+            for content_id, entry in self.index.items()
+        ]
+        return sorted(materials, key=lambda m: m.get('added_at', 0))
+
+    def get_material(self, content_id: str) -> Optional[Dict]:
+        """Get metadata of one material."""
+        entry = self.index.get(content_id)
+        return {'content_id': content_id, **entry} if entry else None
+
+    def load_text(self, content_id: str) -> str:
+        """Read a material's extracted text."""
+        try:
+            with gzip.open(self._text_path(content_id), 'rt', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return ""
+
+    def save_passages(self, content_id: str, passages: PassageIndex):
+        """Store a material's passage index."""
+        os.makedirs(self.text_dir, exist_ok=True)
+        with gzip.open(self._passages_path(content_id), 'wt', encoding='utf-8') as f:
+            json.dump(passages.to_dict(), f)
+
+    def load_passages(self, content_id: str) -> Optional[PassageIndex]:
+        """Read a material's passage index, or None if it was never stored."""
+        try:
+            with gzip.open(self._passages_path(content_id), 'rt', encoding='utf-8') as f:
+                return PassageIndex.from_dict(json.load(f))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error loading passages of {content_id}: {e}")
+            return None
+
+    def remove_material(self, content_id: str):
+        """Delete a material and its stored data."""
+        with self._locked_index() as index:
+            index.pop(content_id, None)
+        for path in (os.path.join(self.blob_dir, content_id), self._text_path(content_id), self._passages_path(content_id)):
+            if os.path.exists(path):
+                try:
+                    os.remove(path)
+                except Exception:
+                    pass
+
+    def _text_path(self, content_id: str) -> str:
+        """Get the path of a material's compressed text."""
+        return os.path.join(self.text_dir, f"{content_id}.txt.gz")
+
+    def _passages_path(self, content_id: str) -> str:
+        """Get the path of a material's compressed passage index."""
+        return os.path.join(self.text_dir, f"{content_id}.passages.json.gz")
+
+def get_material_library() -> MaterialLibrary:
+    """Get the current user's material library."""
+    from utils.simple_auth import get_user_storage_key
+    user_key = get_user_storage_key()
+
+    library = st.session_state.get('material_library')
+    if library is None or library.user_key != user_key:
+        library = MaterialLibrary(user_key)
+        st.session_state.material_library = library
+    return library
+
+def material_to_file_data(material: Dict) -> Dict:
+    """Build a session file entry from library metadata (text is loaded lazily)."""
+    file_data = {
+        'name': material['name'],
+        'content_id': material['content_id'],
+        'content_length': material.get('content_length', 0),
+        'word_count': material.get('word_count', 0),
+        'analysis': material.get('analysis', {}),
+        'size': material.get('size', 0),
+        'type': material.get('type', '')
+    }
+    # Materials stored before these were recorded compute them on first use
+    for key in ('line_count', 'phrase_frequencies'):
+        if material.get(key) is not None:
+            file_data[key] = material[key]
+    return file_data
+
+def get_text_handle(file_data: Dict) -> TextHandle:
+    """Get the shared-store handle of a material's text, loading it on first use."""
+    handle = file_data.get('text_handle')
+    if handle is None:
+        text = file_data.pop('content', None)
+        if text is None:
+            text = get_material_library().load_text(file_data['content_id'])
+        handle = text_store.put(text)
+        file_data['text_handle'] = handle
+    return handle
+
+def get_material_text(file_data: Dict) -> str:
+    """Get a material's full text."""
+    return text_store.get_text(get_text_handle(file_data))
+
+def get_material_preview(file_data: Dict, max_chars: int) -> str:
+    """Get the first characters of a material's text without decompressing all of it."""
+    return text_store.get_slice(get_text_handle(file_data), 0, max_chars)
+
+def get_material_length(file_data: Dict) -> int:
+    """Get a material's text length without loading the text."""
+    if 'content_length' in file_data:
+        return file_data['content_length']
+    return len(get_text_handle(file_data))
+
+def get_material_word_count(file_data: Dict) -> int:
+    """Get a material's word count without loading the text."""
+    if 'word_count' in file_data:
+        return file_data['word_count']
+    return len(get_material_text(file_data).split())
+
+def get_material_line_count(file_data: Dict) -> int:
+    """Get a material's line count, reading the text only if it was never recorded."""
+    if 'line_count' not in file_data:
+        file_data['line_count'] = get_material_text(file_data).count('\n') + 1
+    return file_data['line_count']
+
+def get_material_passages(file_data: Dict) -> PassageIndex:
+    """Get a material's passage index, loading it from the library or chunking the text once."""
+    passages = file_data.get('passages')
+    if passages is None:
+        content_id = file_data.get('content_id')
+        if content_id:
+            passages = get_material_library().load_passages(content_id)
+        if passages is None:
+            passages = chunk_text(get_material_text(file_data))
+            if content_id:
+                get_material_library().save_passages(content_id, passages)
+        file_data['passages'] = passages
+    return passages
+
+def get_material_lead(file_data: Dict, max_chars: int) -> str:
+    """Get the opening passages of a material, up to max_chars characters."""
+    end = get_material_passages(file_data).lead_end(max_chars)
+    return text_store.get_slice(get_text_handle(file_data), 0, end)
+
+def get_passage_text(file_data: Dict, passage: Dict) -> str:
+    """Get the text of one of a material's passages."""
+    return text_store.get_slice(get_text_handle(file_data), passage['start'], passage['end'])
+
+def search_material_passages(query: str, files: List[Dict], limit: int = 4) -> List[Dict]:
+    """Find the passages of the given materials most relevant to a query.
+
+    Returns passage dicts (see PassageIndex.get) with the material 'name'
+    and passage 'text' added, best first.
+    """
+    indexes, postings = {}, {}
+    for file_data in files:
+        passages = get_material_passages(file_data)
+        indexes[file_data['name']] = passages
+        postings[file_data['name']] = postings_cache.get(
+            get_text_handle(file_data).key, passages, lambda: get_material_text(file_data)
+        )
+
+    files_by_name = {file_data['name']: file_data for file_data in files}
+    results = []
+    for name, i, score in search_passages(query, indexes, postings, limit):
+        passage = indexes[name].get(i)
+        passage['name'] = name
+        passage['score'] = score
+        passage['text'] = get_passage_text(files_by_name[name], passage)
+        results.append(passage)
+    return results
+
+def get_material_phrase_frequencies(file_data: Dict) -> Dict[str, int]:
+    """Get a material's top keyphrase counts, computing them once if missing."""
+    frequencies = file_data.get('phrase_frequencies')
+    if frequencies is None:
+        frequencies = top_phrase_frequencies(get_material_text(file_data))
+        file_data['phrase_frequencies'] = frequencies
+    return frequencies
+
+def get_library_keyphrase_index() -> KeyphraseIndex:
+    """Get the keyphrase index of the session's materials, synced incrementally.
+
+    Materials are also added to the shared index of the user's class so
+    they can be ranked against the class corpus.
+    """
+    from utils.simple_auth import get_class_scope, get_user_storage_key
+
+    index = st.session_state.get('keyphrase_index')
+    if index is None:
+        index = KeyphraseIndex()
+        st.session_state.keyphrase_index = index
+
+    documents = {
+        file['name']: get_material_phrase_frequencies(file)
+        for file in st.session_state.get('uploaded_files', [])
+    }
+    index.sync(documents)
+
+    class_index = get_class_keyphrase_index(get_class_scope())
+    for file in st.session_state.get('uploaded_files', []):
+        class_doc_id = file.get('content_id') or f"{get_user_storage_key()}:{file['name']}"
+        class_index.add_document(class_doc_id, documents[file['name']])
+    return index
@@ -0,0 +1,134 @@
+import hashlib
+import random
+import re
+import numpy as np
+from typing import Dict, Iterable, List, Set
+
+# Large Mersenne prime for the universal hash family
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+# Smaller Mersenne prime for DocumentMinHasher: a * h + b stays below 2**64
+DOCUMENT_PRIME = (1 << 31) - 1
+DOCUMENT_HASH_BATCH = 1 << 20
+
+NON_WORD_PATTERN = re.compile(r"[^\w\s]+")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+def normalize_text(text: str) -> str:
+    """Lowercase text, drop punctuation and collapse whitespace."""
+    text = NON_WORD_PATTERN.sub('', text.lower())
+    return WHITESPACE_PATTERN.sub(' ', text).strip()
+
+def char_shingles(text: str, k: int = 3) -> Set[str]:
+    """Get character k-grams of normalized text (good for short texts)."""
+    if len(text) <= k:
+        return {text} if text else set()
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+def word_shingles(text: str, k: int = 5) -> Set[str]:
+    """Get word k-grams of normalized text (good for documents)."""
+    words = text.split()
+    if len(words) <= k:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+def _shingle_hash(shingle: str) -> int:
+    """Stable 32-bit hash of a shingle (independent of PYTHONHASHSEED)."""
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=4).digest(), 'big')
+
+class MinHasher:
+    """Compute MinHash signatures that estimate Jaccard similarity."""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        self.num_perm = num_perm
+        rng = random.Random(seed)
+        self.permutations = [
+            (rng.randint(1, MERSENNE_PRIME - 1), rng.randint(0, MERSENNE_PRIME - 1))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, shingles: Iterable[str]) -> List[int]:
+        """Get the MinHash signature of a set of shingles."""
+        hashes = [_shingle_hash(s) for s in shingles]
+        if not hashes:
+            return [MAX_HASH] * self.num_perm
+
+        return [
+            min(((a * h + b) % MERSENNE_PRIME) & MAX_HASH for h in hashes)
+            for a, b in self.permutations
+        ]
+
+    @staticmethod
+    def similarity(signature_a: List[int], signature_b: List[int]) -> float:
+        """Estimate Jaccard similarity from two signatures."""
+        if not signature_a or len(signature_a) != len(signature_b):
+            return 0.0
+        matches = sum(1 for a, b in zip(signature_a, signature_b) if a == b)
+        return matches / len(signature_a)
+
+class DocumentMinHasher:
+    """MinHash signatures of whole documents, vectorized with numpy.
+
+    Documents have millions of shingles, too many for MinHasher's
+    pure-Python loop. Permutations here use a 31-bit prime so they can be
+    applied to a whole array of 32-bit shingle hashes in uint64 arithmetic.
+    Signatures are not comparable with MinHasher's.
+    """
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        self.num_perm = num_perm
+        rng = random.Random(seed)
+        self.a = np.array([rng.randint(1, DOCUMENT_PRIME - 1) for _ in range(num_perm)], dtype=np.uint64)
+        self.b = np.array([rng.randint(0, DOCUMENT_PRIME - 1) for _ in range(num_perm)], dtype=np.uint64)
+
+    def signature(self, shingles: Iterable[str]) -> List[int]:
+        """Get the MinHash signature of a set of shingles."""
+        hashes = np.unique(np.fromiter((_shingle_hash(s) for s in shingles), dtype=np.uint64))
+        signature = np.full(self.num_perm, DOCUMENT_PRIME, dtype=np.uint64)
+        for start in range(0, len(hashes), DOCUMENT_HASH_BATCH):
+            batch = hashes[start:start + DOCUMENT_HASH_BATCH]
+            for i in range(self.num_perm):
+                signature[i] = min(signature[i], ((self.a[i] * batch + self.b[i]) % DOCUMENT_PRIME).min())
+        return [int(value) for value in signature]
+
+class LSHIndex:
+    """Locality-sensitive hashing index over MinHash signatures.
+
+    Signatures are split into bands; items sharing any band bucket become
+    candidates, so lookups avoid comparing against every stored item.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.buckets: List[Dict[tuple, Set[str]]] = [{} for _ in range(bands)]
+
+    def _band_keys(self, signature: List[int]):
+        """Yield (band index, bucket key) pairs of a signature."""
+        for band in range(self.bands):
+            start = band * self.rows
+            yield band, tuple(signature[start:start + self.rows])
+
+    def add(self, key: str, signature: List[int]):
+        """Add an item to the index."""
+        for band, band_key in self._band_keys(signature):
+            self.buckets[band].setdefault(band_key, set()).add(key)
+
+    def remove(self, key: str, signature: List[int]):
+        """Remove an item from the index."""
+        for band, band_key in self._band_keys(signature):
+            bucket = self.buckets[band].get(band_key)
+            if bucket:
+                bucket.discard(key)
+                if not bucket:
+                    del self.buckets[band][band_key]
+
+    def query(self, signature: List[int]) -> Set[str]:
+        """Get keys of candidate near-duplicates."""
+        candidates = set()
+        for band, band_key in self._band_keys(signature):
+            candidates.update(self.buckets[band].get(band_key, ()))
+        return candidates
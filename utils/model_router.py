@@ -0,0 +1,264 @@
+import asyncio
+import re
+import time
+import streamlit as st
+from typing import Dict, List, Optional
+from utils.ai_models import AIClient, build_study_prompt, estimate_tokens, run_sync
+
+# Cheaper model used first for simple requests, per provider
+CHEAP_MODELS = {
+    "Google Gemini": "gemini-1.5-flash",
+    "OpenAI": "gpt-4o-mini"
+}
+
+# Approximate list prices in USD per million (input, output) tokens
+MODEL_PRICES_PER_MILLION = {
+    "gemini-pro": (0.50, 1.50),
+    "gemini-1.5-pro": (1.25, 5.00),
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4-turbo": (10.00, 30.00)
+}
+
+GREETING_PATTERN = re.compile(
+    r"^\s*(hi|hello|hey|thanks|thank you|good (morning|afternoon|evening)|ok|okay)\b",
+    re.IGNORECASE
+)
+DEFINITION_PATTERN = re.compile(
+    r"^\s*(what('?s| is| are)|define|meaning of|who (is|was))\b",
+    re.IGNORECASE
+)
+LOW_CONFIDENCE_PATTERN = re.compile(
+    r"\b(i('?m| am) not sure|i don'?t know|i cannot (determine|answer)|not enough information|unclear from)\b",
+    re.IGNORECASE
+)
+
+SIMPLE_QUESTION_MAX_WORDS = 12
+LONG_CONTEXT_TOKENS = 3000
+MIN_CONFIDENT_RESPONSE_CHARS = 40
+HEDGE_DELAY_SECONDS = 2.0
+
+def estimate_cost(model_name: str, input_tokens: int, output_tokens: int) -> float:
+    """Estimate the cost of a call in USD."""
+    input_price, output_price = MODEL_PRICES_PER_MILLION.get(model_name, (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+def record_route_usage(records: List[Dict]):
+    """Add routed call records to the session's per-route statistics."""
+    if not records:
+        return
+    try:
+        stats = st.session_state.setdefault('route_stats', {})
+    except Exception:
+        # No Streamlit session (e.g. a background worker)
+        return
+    for record in records:
+        route = stats.setdefault(record['route'], {
+            'model': record['model'],
+            'calls': 0,
+            'escalations': 0,
+            'total_latency': 0.0,
+            'total_cost': 0.0
+        })
+        route['model'] = record['model']
+        route['calls'] += 1
+        route['escalations'] += 1 if record.get('escalated') else 0
+        route['total_latency'] += record['latency']
+        route['total_cost'] += record['cost']
+
+def get_route_stats() -> Dict:
+    """Get per-route call counts, average latency and cost for the session."""
+    stats = {}
+    for route, data in st.session_state.get('route_stats', {}).items():
+        stats[route] = {
+            **data,
+            'avg_latency': data['total_latency'] / data['calls'] if data['calls'] else 0
+        }
+    return stats
+
+class ModelRouter(AIClient):
+    """Route requests between a cheap and a large model of one provider.
+
+    Short, simple questions (greetings, quick definitions) go to the cheap
+    model first and escalate to the large model when the answer looks
+    unconfident. Long-context requests and material analysis go straight to
+    the large model. Cheap-route chat turns are hedged: the large model is
+    also asked if the cheap one is slow, and the first good answer wins.
+    """
+
+    def __init__(self, provider: str, large_client: AIClient, cheap_client: Optional[AIClient] = None):
+        self.provider = provider
+        self.large_client = large_client
+        self.cheap_client = cheap_client
+        self.provider_name = large_client.provider_name
+        self.model_name = large_client.model_name
+        self.api_key_hash = large_client.api_key_hash
+        self.route_records = []
+
+    def choose_route(self, question: str, context: Dict, chat_history: List) -> str:
+        """Pick 'cheap' or 'large' for a study request."""
+        if self.cheap_client is None:
+            return 'large'
+
+        prefix, suffix = build_study_prompt(question, context, chat_history)
+        if estimate_tokens(prefix + suffix) > LONG_CONTEXT_TOKENS:
+            return 'large'
+
+        if GREETING_PATTERN.match(question):
+            return 'cheap'
+        if len(question.split()) <= SIMPLE_QUESTION_MAX_WORDS and DEFINITION_PATTERN.match(question):
+            return 'cheap'
+        return 'large'
+
+    @staticmethod
+    def is_confident(response: str) -> bool:
+        """Check whether a cheap-model answer is good enough to keep."""
+        if not response or len(response.strip()) < MIN_CONFIDENT_RESPONSE_CHARS:
+            return False
+        return not LOW_CONFIDENCE_PATTERN.search(response)
+
+    async def aanalyze(self, content: str, filename: str) -> Dict:
+        """Analyze study material with the large model."""
+        return await self._timed('large', self.large_client.aanalyze(content, filename),
+                                 estimate_tokens(content[:4000]))
+
+    async def agenerate_json(self, prompt: str) -> Dict:
+        """Generate structured output with the large model."""
+        return await self._timed('large', self.large_client.agenerate_json(prompt), estimate_tokens(prompt))
+
+    async def agenerate(self, question: str, context: Dict, chat_history: List) -> str:
+        """Generate a study response, trying the cheap model first for simple requests."""
+        input_tokens = self._estimate_input_tokens(question, context, chat_history)
+
+        if self.choose_route(question, context, chat_history) == 'cheap':
+            try:
+                response = await self._timed(
+                    'cheap', self.cheap_client.agenerate(question, context, chat_history), input_tokens
+                )
+                if self.is_confident(response):
+                    self.last_usage = self.cheap_client.last_usage
+                    return response
+            except Exception:
+                pass  # Fall through to the large model
+            escalated = True
+        else:
+            escalated = False
+
+        response = await self._timed(
+            'large', self.large_client.agenerate(question, context, chat_history), input_tokens, escalated
+        )
+        self.last_usage = self.large_client.last_usage
+        return response
+
+    async def astream(self, question: str, context: Dict, chat_history: List):
+        """Stream a study response.
+
+        Cheap-route answers are short and must be checked before they are
+        shown, so they are generated in full, hedged against a slow cheap
+        model; large-model answers stream.
+        """
+        if self.choose_route(question, context, chat_history) == 'cheap':
+            yield await self.agenerate_hedged(question, context, chat_history)
+            return
+
+        started = time.perf_counter()
+        chunks = []
+        async for chunk in self.large_client.astream(question, context, chat_history):
+            chunks.append(chunk)
+            yield chunk
+        self.last_usage = self.large_client.last_usage
+        self._add_record('large', self.large_client.model_name, started,
+                         self._estimate_input_tokens(question, context, chat_history), ''.join(chunks))
+
+    async def ahealth_check(self):
+        """Check the configured model; the cheap model shares its API key."""
+        await self.large_client.ahealth_check()
+
+    async def agenerate_hedged(self, question: str, context: Dict, chat_history: List,
+                               hedge_delay: float = HEDGE_DELAY_SECONDS) -> str:
+        """Generate a study response for a latency-critical turn.
+
+        The routed model is asked first; if it has not answered within
+        `hedge_delay` seconds the other model is asked too, and the first
+        good answer wins. A failed or unconfident first answer asks the
+        other model straight away; an unconfident cheap answer is only
+        kept if the large model fails.
+        """
+        if self.cheap_client is None:
+            return await self.agenerate(question, context, chat_history)
+
+        input_tokens = self._estimate_input_tokens(question, context, chat_history)
+        clients = {'cheap': self.cheap_client, 'large': self.large_client}
+        primary = self.choose_route(question, context, chat_history)
+        backup = 'large' if primary == 'cheap' else 'cheap'
+        tasks = {}
+
+        def start(route: str, **flags) -> asyncio.Future:
+            task = asyncio.ensure_future(self._timed(
+                route, clients[route].agenerate(question, context, chat_history), input_tokens, **flags
+            ))
+            tasks[task] = route
+            return task
+
+        start(primary)
+        done, _ = await asyncio.wait(set(tasks), timeout=hedge_delay)
+        if not done:
+            start(backup, hedged=True)
+
+        pending = set(tasks)
+        fallback = None
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    route = tasks[task]
+                    if task.exception() is not None:
+                        error = task.exception()
+                    elif route == 'cheap' and not self.is_confident(task.result()):
+                        fallback = task
+                    else:
+                        self.last_usage = clients[route].last_usage
+                        return task.result()
+                if not pending and len(tasks) == 1:
+                    pending = {start(backup, escalated=backup == 'large')}
+        finally:
+            for task in pending:
+                task.cancel()
+        if fallback is not None:
+            self.last_usage = self.cheap_client.last_usage
+            return fallback.result()
+        raise error
+
+    def _record_last_usage(self):
+        """Record token usage and route statistics in the session."""
+        super()._record_last_usage()
+        records, self.route_records = self.route_records, []
+        record_route_usage(records)
+
+    def _estimate_input_tokens(self, question: str, context: Dict, chat_history: List) -> int:
+        """Estimate input tokens of a study request."""
+        prefix, suffix = build_study_prompt(question, context, chat_history)
+        return estimate_tokens(prefix + suffix)
+
+    async def _timed(self, route: str, coro, input_tokens: int, escalated: bool = False, hedged: bool = False):
+        """Await a model call and record its latency and estimated cost."""
+        client = self.cheap_client if route == 'cheap' else self.large_client
+        started = time.perf_counter()
+        result = await coro
+        output = result if isinstance(result, str) else str(result)
+        self._add_record(route, client.model_name, started, input_tokens, output, escalated, hedged)
+        return result
+
+    def _add_record(self, route: str, model_name: str, started: float, input_tokens: int,
+                    output: str, escalated: bool = False, hedged: bool = False):
+        """Add a call record for later flushing into the session statistics."""
+        self.route_records.append({
+            'route': route,
+            'model': model_name,
+            'latency': time.perf_counter() - started,
+            'cost': estimate_cost(model_name, input_tokens, estimate_tokens(output)),
+            'escalated': escalated,
+            'hedged': hedged
+        })
@@ -0,0 +1,297 @@
+import base64
+import math
+import re
+import sys
+import threading
+from array import array
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Iterator, List, Tuple
+from utils.text_analysis import STOP_WORDS, WORD_PATTERN
+
+TARGET_PASSAGE_TOKENS = 200
+MAX_PASSAGE_TOKENS = 400
+CHARS_PER_TOKEN = 4  # same rough estimate as ai_models.estimate_tokens
+MIN_QUERY_TERM_LENGTH = 3
+MAX_CACHED_POSTINGS = 2_000_000  # (passage, count) entries kept in the postings LRU
+
+# BM25 parameters for passage retrieval
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+_HEADING = re.compile(r'#{1,6} ')
+
+class PassageIndex:
+    """Addressable passages of one extracted text.
+
+    Passages are stored as parallel integer columns (character span, page
+    number, token estimate and heading path id) rather than as text, so a
+    document with thousands of passages takes a few bytes per passage and
+    the text itself is only sliced out of the text store when needed.
+    """
+
+    COLUMNS = ('starts', 'ends', 'pages', 'tokens', 'heading_ids')
+
+    def __init__(self):
+        self.starts = array('I')
+        self.ends = array('I')
+        self.pages = array('I')
+        self.tokens = array('I')
+        self.heading_ids = array('I')
+        self.headings: List[Tuple[str, ...]] = [()]
+        self._heading_lookup = {(): 0}
+
+    def add(self, start: int, end: int, page: int, headings: Tuple[str, ...]):
+        """Append a passage covering text[start:end]."""
+        heading_id = self._heading_lookup.get(headings)
+        if heading_id is None:
+            heading_id = len(self.headings)
+            self.headings.append(headings)
+            self._heading_lookup[headings] = heading_id
+        self.starts.append(start)
+        self.ends.append(end)
+        self.pages.append(page)
+        self.tokens.append(max(1, (end - start) // CHARS_PER_TOKEN))
+        self.heading_ids.append(heading_id)
+
+    def get(self, i: int) -> Dict:
+        """Get one passage's address and size."""
+        return {
+            'index': i,
+            'start': self.starts[i],
+            'end': self.ends[i],
+            'page': self.pages[i],
+            'headings': list(self.headings[self.heading_ids[i]]),
+            'tokens': self.tokens[i]
+        }
+
+    def lead_end(self, max_chars: int) -> int:
+        """Get the end of the last whole passage within the first max_chars characters."""
+        end = 0
+        for passage_end in self.ends:
+            if passage_end > max_chars:
+                break
+            end = passage_end
+        if not end and len(self):
+            # The first passage alone is too long; cut it at max_chars
+            end = min(self.ends[0], max_chars)
+        return end
+
+    def sample(self, max_chars: int) -> List[int]:
+        """Pick passages spread evenly over the document that fit in max_chars."""
+        if not len(self):
+            return []
+        average = max(1, (self.ends[-1] - self.starts[0]) // len(self))
+        count = max(1, min(len(self), max_chars // average))
+        step = len(self) / count
+        chosen, used = [], 0
+        for k in range(count):
+            i = int(k * step)
+            size = self.ends[i] - self.starts[i]
+            if chosen and used + size > max_chars:
+                break
+            chosen.append(i)
+            used += size
+        return chosen
+
+    def build_postings(self, text: str) -> Dict[str, List[Tuple[int, int]]]:
+        """Build the term -> (passage, term count) postings used by search (not persisted)."""
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for i in range(len(self)):
+            for term, count in _count_terms(text[self.starts[i]:self.ends[i]]).items():
+                postings.setdefault(term, []).append((i, count))
+        return postings
+
+    def to_dict(self) -> Dict:
+        """Serialize to a compact JSON-compatible dict (columns as base64 little-endian uint32)."""
+        data = {'headings': [list(path) for path in self.headings]}
+        for name in self.COLUMNS:
+            column = array('I', getattr(self, name))
+            if sys.byteorder != 'little':
+                column.byteswap()
+            data[name] = base64.b64encode(column.tobytes()).decode('ascii')
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'PassageIndex':
+        """Rebuild an index saved with to_dict()."""
+        index = cls()
+        for name in cls.COLUMNS:
+            column = array('I')
+            column.frombytes(base64.b64decode(data.get(name, '')))
+            if sys.byteorder != 'little':
+                column.byteswap()
+            setattr(index, name, column)
+        index.headings = [tuple(path) for path in data.get('headings', [[]])] or [()]
+        index._heading_lookup = {path: i for i, path in enumerate(index.headings)}
+        return index
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return (self.get(i) for i in range(len(self)))
+
+def chunk_text(text: str, target_tokens: int = TARGET_PASSAGE_TOKENS,
+               max_tokens: int = MAX_PASSAGE_TOKENS) -> PassageIndex:
+    """Split normalized text into passages that respect its layout.
+
+    Passages never cross a page (form feed) and start at every markdown
+    heading; paragraphs are packed together up to about target_tokens, and
+    paragraphs longer than max_tokens are split between sentences.
+    """
+    index = PassageIndex()
+    target_chars = target_tokens * CHARS_PER_TOKEN
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    heading_stack: List[Tuple[int, str]] = []
+
+    page_start = 0
+    page_number = 1
+    while page_start <= len(text):
+        page_end = text.find('\f', page_start)
+        if page_end == -1:
+            page_end = len(text)
+
+        current = None  # (start, end, heading path) of the passage being built
+        for start, end in _iter_units(text, page_start, page_end, max_chars):
+            heading = _HEADING.match(text, start, end)
+            if heading:
+                level = heading.end() - start - 1
+                while heading_stack and heading_stack[-1][0] >= level:
+                    heading_stack.pop()
+                heading_stack.append((level, text[heading.end():end].split('\n', 1)[0].strip()))
+
+            if current and (heading or current[1] - current[0] >= target_chars or end - current[0] > max_chars):
+                index.add(current[0], current[1], page_number, current[2])
+                current = None
+            if current:
+                current = (current[0], end, current[2])
+            else:
+                current = (start, end, tuple(title for _, title in heading_stack))
+        if current:
+            index.add(current[0], current[1], page_number, current[2])
+
+        page_start = page_end + 1
+        page_number += 1
+    return index
+
+def _iter_units(text: str, start: int, end: int, max_chars: int) -> Iterator[Tuple[int, int]]:
+    """Yield the spans of paragraphs in text[start:end], splitting long ones between sentences."""
+    while start < end:
+        paragraph_end = text.find('\n\n', start, end)
+        if paragraph_end == -1:
+            paragraph_end = end
+        span_start, span_end = _strip_span(text, start, paragraph_end)
+        if span_start < span_end:
+            if span_end - span_start <= max_chars:
+                yield span_start, span_end
+            else:
+                yield from _split_sentences(text, span_start, span_end, max_chars)
+        start = paragraph_end + 2
+
+def _split_sentences(text: str, start: int, end: int, max_chars: int) -> Iterator[Tuple[int, int]]:
+    """Yield sentence spans of a long paragraph, hard-splitting run-on sentences at spaces."""
+    sentence_start = start
+    boundaries = [match.start() for match in _SENTENCE_END.finditer(text, start, end)] + [end]
+    for boundary in boundaries:
+        while boundary - sentence_start > max_chars:
+            cut = text.rfind(' ', sentence_start, sentence_start + max_chars)
+            if cut <= sentence_start:
+                cut = sentence_start + max_chars
+            yield sentence_start, cut
+            sentence_start, _ = _strip_span(text, cut, boundary)
+        if sentence_start < boundary:
+            yield sentence_start, boundary
+        sentence_start, _ = _strip_span(text, boundary, end)
+
+def _strip_span(text: str, start: int, end: int) -> Tuple[int, int]:
+    """Shrink a span so it does not start or end with whitespace."""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+def _count_terms(text: str) -> Counter:
+    """Count the searchable words of a text."""
+    return Counter(
+        word for word in WORD_PATTERN.findall(text.lower())
+        if len(word) >= MIN_QUERY_TERM_LENGTH and word not in STOP_WORDS
+    )
+
+class PostingsCache:
+    """Process-wide LRU of search postings, shared by all sessions.
+
+    Postings are keyed by the hash of the text they were built from (the
+    TextStore key), so every session searching the same material reuses one
+    copy, and the least recently searched texts are dropped once the cache
+    holds more than max_entries (passage, count) pairs.
+    """
+
+    def __init__(self, max_entries: int = MAX_CACHED_POSTINGS):
+        self.max_entries = max_entries
+        self.postings = OrderedDict()  # text key -> (postings, entry count)
+        self.cached_entries = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: str, index: PassageIndex, load_text: Callable[[], str]) -> Dict[str, List[Tuple[int, int]]]:
+        """Get the postings of a text, building them from load_text() on a miss."""
+        with self.lock:
+            cached = self.postings.get(key)
+            if cached is not None:
+                self.postings.move_to_end(key)
+                return cached[0]
+
+        # Build outside the lock; a concurrent build of the same text just wins the race
+        postings = index.build_postings(load_text())
+        size = sum(len(entries) for entries in postings.values())
+        with self.lock:
+            if key not in self.postings:
+                self.postings[key] = (postings, size)
+                self.cached_entries += size
+            while self.cached_entries > self.max_entries and len(self.postings) > 1:
+                _, (_, evicted) = self.postings.popitem(last=False)
+                self.cached_entries -= evicted
+        return postings
+
+def search_passages(query: str, indexes: Dict[str, PassageIndex],
+                    postings: Dict[str, Dict[str, List[Tuple[int, int]]]],
+                    limit: int = 4) -> List[Tuple[str, int, float]]:
+    """Rank passages of several documents against a query with BM25.
+
+    `indexes` maps document names to passage indexes and `postings` maps
+    the same names to their postings (see PassageIndex.build_postings).
+    Returns (document name, passage index, score), best first.
+    """
+    terms = list(_count_terms(query))
+    total_passages = sum(len(index) for index in indexes.values())
+    if not terms or not total_passages:
+        return []
+    average_tokens = sum(sum(index.tokens) for index in indexes.values()) / total_passages
+
+    scores: Dict[Tuple[str, int], float] = {}
+    for term in terms:
+        matches = {name: postings[name].get(term, []) for name in indexes}
+        doc_freq = sum(len(entries) for entries in matches.values())
+        if not doc_freq:
+            continue
+        idf = math.log(1 + (total_passages - doc_freq + 0.5) / (doc_freq + 0.5))
+        for name, entries in matches.items():
+            tokens = indexes[name].tokens
+            for i, count in entries:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * tokens[i] / average_tokens)
+                scores[(name, i)] = scores.get((name, i), 0.0) + idf * count * (BM25_K1 + 1) / (count + norm)
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+    return [(name, i, score) for (name, i), score in ranked]
+
+def format_passage_source(passage: Dict) -> str:
+    """Describe where a passage comes from, e.g. "notes.pdf, p. 3, Cells > Mitosis"."""
+    source = passage['name']
+    if passage.get('page'):
+        source += f", p. {passage['page']}"
+    if passage.get('headings'):
+        source += ", " + " > ".join(passage['headings'])
+    return source
+
+postings_cache = PostingsCache()
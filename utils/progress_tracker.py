@@ -1,16 +1,30 @@
+import hashlib
 import time
 from datetime import datetime, timedelta
 import json
 import os
+from utils.task_store import task_store, STATUS_ALL, TASK_PAGE_SIZE
+from utils.spaced_repetition import ReviewScheduler, review_store
+from utils.conversation_store import conversation_store
+from utils.quiz_engine import quiz_engine
 
 class ProgressTracker:
     """Track user progress and study analytics."""
     
-    def __init__(self, user_id=None):
-        from utils.simple_auth import get_user_id
+    def __init__(self, user_id=None, owner_key=None):
+        from utils.simple_auth import get_user_id, get_user_storage_key
         self.user_id = user_id or get_user_id()
+        # Conversations, tasks, reviews and quiz answers are owned by the
+        # login-stable storage key, as in the chat
+        self.owner_key = owner_key or get_user_storage_key()
         self.data_file = f"progress_{self.user_id}.json"
         self.data = self.load_data()
+        # Study tasks live in their own indexed store, not the progress file
+        self.tasks = task_store
+        self._migrate_study_tasks()
+        self._migrate_chat_transcripts()
+        self._migrate_quiz_answers()
+        self._review_scheduler = None
     
     def load_data(self):
         """Load progress data from file."""
@@ -26,6 +40,7 @@ class ProgressTracker:
             'sessions': [],
             'chat_interactions': [],
             'file_uploads': [],
+            'quiz_answer_count': 0,
             'total_study_time': 0,
             'created_at': time.time(),
             'last_updated': time.time()
@@ -53,12 +68,16 @@ class ProgressTracker:
         self.data['total_study_time'] += duration_minutes
         self.save_data()
     
-    def add_chat_interaction(self, question, response):
-        """Add a chat interaction."""
+    def add_chat_interaction(self, question, response, conversation_id, question_seq):
+        """Add a chat interaction.
+        
+        The transcript stays in the conversation store; the record keeps
+        only a reference to the question message and the text lengths.
+        """
         interaction = {
             'timestamp': time.time(),
-            'question': question,
-            'response': response,
+            'conversation_id': conversation_id,
+            'question_seq': question_seq,
             'question_length': len(question),
             'response_length': len(response),
             'date': datetime.now().strftime('%Y-%m-%d')
@@ -68,6 +87,18 @@ class ProgressTracker:
         # Estimate 1 minute per interaction
         self.add_study_session(1, "chat")
     
+    def get_chat_transcript(self, interaction):
+        """Get the (question, response) text of a chat interaction from the conversation store."""
+        question = conversation_store.get_message(interaction['conversation_id'], interaction['question_seq'])
+        response = conversation_store.get_message(interaction['conversation_id'], interaction['question_seq'] + 1)
+        return (question['content'] if question else '', response['content'] if response else '')
+    
+    def add_quiz_answer(self):
+        """Count a quiz answer (the answer itself is recorded in the quiz store)."""
+        self.data['quiz_answer_count'] = self.data.get('quiz_answer_count', 0) + 1
+        # Estimate 1 minute per question, like a chat interaction
+        self.add_study_session(1, "quiz")
+    
     def add_file_upload(self, filename, file_size, content_length):
         """Add file upload record."""
         upload = {
@@ -83,6 +114,140 @@ class ProgressTracker:
         processing_time = max(1, content_length / 1000)  # 1 minute per 1000 chars
         self.add_study_session(processing_time, "file_processing")
     
+    def _migrate_study_tasks(self):
+        """Move study tasks saved in the progress file into the task store.
+        
+        Tasks without an id get one derived from the progress file, so
+        running it again after an interruption adds nothing twice.
+        """
+        tasks = self.data.pop('study_tasks', None)
+        if tasks:
+            for i, task in enumerate(tasks):
+                migration_key = f"{self.data_file}\0{i}\0{task.get('created_at')}\0{task.get('title')}"
+                task.setdefault('id', hashlib.sha256(migration_key.encode('utf-8')).hexdigest()[:32])
+            self.tasks.add_tasks(self.owner_key, tasks)
+        if tasks is not None:
+            self.save_data()
+    
+    def _migrate_chat_transcripts(self):
+        """Move chat text saved in the progress file into the conversation store.
+        
+        The conversation id is derived from the progress file, and messages
+        already appended by an interrupted migration are skipped, so running
+        it again never duplicates the history.
+        """
+        legacy = [i for i in self.data['chat_interactions'] if 'question' in i]
+        if not legacy:
+            return
+        migration_key = f"{self.owner_key}\0{self.data_file}\0{legacy[0]['timestamp']}"
+        conversation_id = conversation_store.create_conversation(
+            self.owner_key,
+            title="Earlier chat history",
+            created_at=legacy[0]['timestamp'],
+            conversation_id=hashlib.sha256(migration_key.encode('utf-8')).hexdigest()[:32]
+        )
+        migrated = conversation_store.get_conversation(conversation_id)['message_count']
+        for i, interaction in enumerate(legacy):
+            question_seq = 2 * i
+            if question_seq >= migrated:
+                conversation_store.append_message(
+                    conversation_id, 'user', interaction['question'], timestamp=interaction['timestamp']
+                )
+            if question_seq + 1 >= migrated:
+                conversation_store.append_message(
+                    conversation_id, 'assistant', interaction['response'], timestamp=interaction['timestamp']
+                )
+            del interaction['question'], interaction['response']
+            interaction['conversation_id'] = conversation_id
+            interaction['question_seq'] = question_seq
+        self.save_data()
+    
+    def _migrate_quiz_answers(self):
+        """Move quiz answers to the user's storage key, keeping only their count in the progress file.
+        
+        Answers recorded under this progress file's session id are moved in
+        the quiz store, and answers listed in the progress file are added to
+        it; answers already there are kept, so running it again changes
+        nothing. Answers under the shared 'default' id cannot be told apart
+        and stay where they are.
+        """
+        if self.user_id not in ('default', self.owner_key):
+            quiz_engine.move_answers(self.user_id, self.owner_key)
+        answers = self.data.get('quiz_answers')
+        if answers is None:
+            return
+        quiz_engine.import_answers(self.owner_key, answers)
+        del self.data['quiz_answers']
+        self.data['quiz_answer_count'] = self.data.get('quiz_answer_count', 0) + len(answers)
+        self.save_data()
+    
+    def add_study_tasks(self, tasks):
+        """Save new study tasks."""
+        self.tasks.add_tasks(self.owner_key, tasks)
+    
+    def add_generated_tasks(self, tasks, generation_key):
+        """Save generated tasks unless the user already has the tasks of that generation request.
+        
+        Returns whether they were added.
+        """
+        if self.tasks.has_generation(self.owner_key, generation_key):
+            return False
+        self.tasks.add_tasks(self.owner_key, tasks)
+        return True
+    
+    def get_study_tasks(self, status=STATUS_ALL, source_file=None, order='priority', page=0, page_size=TASK_PAGE_SIZE):
+        """Get one page of the user's study tasks."""
+        return self.tasks.list_tasks(self.owner_key, status, source_file, order, page, page_size)
+    
+    def count_study_tasks(self, status=STATUS_ALL, source_file=None):
+        """Count the user's study tasks matching a filter."""
+        return self.tasks.count_tasks(self.owner_key, status, source_file)
+    
+    def get_task_counters(self):
+        """Get the user's task totals (total, completed, minutes, version)."""
+        return self.tasks.get_counters(self.owner_key)
+    
+    def complete_study_task(self, task_id):
+        """Mark a study task completed (one row update) and log its study time."""
+        task = self.tasks.complete_task(self.owner_key, task_id)
+        if task:
+            self.add_study_session(task['time_estimate'], "task_completion")
+        return task
+    
+    def update_study_task(self, task_id, progress=None, due_date=None):
+        """Update a study task's progress or due date."""
+        self.tasks.update_task(self.owner_key, task_id, progress=progress, due_date=due_date)
+    
+    def clear_study_tasks(self):
+        """Delete all of the user's study tasks."""
+        self.tasks.clear_tasks(self.owner_key)
+    
+    def get_review_scheduler(self):
+        """Get the user's review scheduler, loading their due queue on first use."""
+        if self._review_scheduler is None:
+            self._review_scheduler = ReviewScheduler(self.owner_key, review_store)
+        return self._review_scheduler
+    
+    def sync_review_cards(self, materials):
+        """Create review cards for the concepts of the given materials."""
+        return self.get_review_scheduler().sync_materials(materials)
+    
+    def get_due_reviews(self, limit=1):
+        """Get the next due review cards, soonest first."""
+        return self.get_review_scheduler().next_due(limit)
+    
+    def record_review(self, card_id, grade):
+        """Reschedule a reviewed card and add the review to the log."""
+        return self.get_review_scheduler().review(card_id, grade)
+    
+    def get_review_stats(self, days=7):
+        """Get review counts: cards, cards due now, reviews and passed reviews in the last days."""
+        scheduler = self.get_review_scheduler()
+        stats = review_store.get_review_stats(self.owner_key, time.time() - days * 24 * 60 * 60)
+        stats['due'] = scheduler.queue.count_due()
+        stats['next_due_at'] = scheduler.queue.next_due_at()
+        return stats
+    
     def get_total_sessions(self):
         """Get total number of study sessions."""
         return len(self.data['sessions'])
@@ -226,6 +391,18 @@ class ProgressTracker:
             'questions_over_time': questions_over_time
         }
     
+    def get_quiz_statistics(self):
+        """Get quiz answer statistics, overall and per material."""
+        by_material = quiz_engine.get_answer_statistics(self.owner_key)
+        answered = sum(stats['answered'] for stats in by_material.values())
+        correct = sum(stats['correct'] for stats in by_material.values())
+        return {
+            'answered': answered,
+            'correct': correct,
+            'accuracy': correct / answered * 100 if answered else 0,
+            'by_material': by_material
+        }
+    
     def get_sessions_this_week(self):
         """Get number of sessions this week."""
         week_ago = (datetime.now() - timedelta(days=7)).timestamp()
@@ -253,6 +430,7 @@ class ProgressTracker:
             'sessions': [],
             'chat_interactions': [],
             'file_uploads': [],
+            'quiz_answer_count': 0,
             'total_study_time': 0,
             'created_at': time.time(),
             'last_updated': time.time()
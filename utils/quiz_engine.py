@@ -0,0 +1,375 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from utils.minhash import MinHasher, char_shingles, normalize_text
+from utils.response_cache import CONTENT_TOKEN_PATTERN
+
+# Materials are quizzed a chunk (a run of whole passages) at a time
+QUIZ_CHUNK_CHARS = 3000
+QUESTIONS_PER_CHUNK = 5
+CHUNKS_PER_REFILL = 2
+
+# Refill a student's pool in the background when fewer unseen questions remain
+POOL_LOW_WATER = 5
+
+MIN_OPTIONS = 2
+MAX_OPTIONS = 6
+SIMILAR_QUESTION_THRESHOLD = 0.7  # estimated Jaccard similarity of character 3-grams
+
+# Words that never change what a question asks
+QUESTION_FILLER_WORDS = {'a', 'an', 'the'}
+
+QUIZ_PROMPT = """Write {count} multiple-choice quiz questions that test understanding of this passage from the study material "{filename}".
+
+Passage:
+{text}
+
+Each question must be answerable from the passage alone, have one correct option and plausible distractors, and test a different point.
+
+Respond in JSON format:
+{{"questions": [{{"question": "question text", "options": ["option A", "option B", "option C", "option D"], "answer": 0, "explanation": "why the answer is correct"}}]}}
+"answer" is the index of the correct option."""
+
+_hasher = MinHasher(num_perm=64)
+
+def get_material_key(file_data: Dict) -> str:
+    """Get the key a material's question pool is stored under."""
+    return file_data.get('content_id') or hashlib.sha256(file_data['name'].encode('utf-8')).hexdigest()
+
+def get_question_hash(question: str) -> str:
+    """Get the hash of a question's normalized text (for exact duplicates)."""
+    return hashlib.sha256(normalize_text(question).encode('utf-8')).hexdigest()
+
+def question_signature(question: str) -> List[int]:
+    """Get the MinHash signature of a question (for near-duplicates)."""
+    return _hasher.signature(char_shingles(normalize_text(question)))
+
+def question_words(question: str) -> frozenset:
+    """Get the set of words, numbers and symbols of a question.
+
+    Near-duplicates must have the same set, so questions about different
+    terms (TCP vs IP, x^2 vs x^3) are kept however similar their text.
+    """
+    text = question.lower().replace("'", "").replace("\u2019", "")
+    return frozenset(CONTENT_TOKEN_PATTERN.findall(text)) - QUESTION_FILLER_WORDS
+
+def is_near_duplicate(signature: List[int], words: frozenset, other_signature: List[int], other_words: frozenset) -> bool:
+    """Whether two questions ask the same thing, worded slightly differently."""
+    return words == other_words and MinHasher.similarity(signature, other_signature) >= SIMILAR_QUESTION_THRESHOLD
+
+def validate_question(raw: Dict) -> Optional[Dict]:
+    """Check a generated question, coercing fixable fields.
+
+    Returns the cleaned question, or None if it is unusable.
+    """
+    if not isinstance(raw, dict):
+        return None
+    question = raw.get('question')
+    options = raw.get('options')
+    if not isinstance(question, str) or not question.strip() or not isinstance(options, list):
+        return None
+
+    cleaned = []
+    for option in options:
+        option = str(option).strip() if option is not None else ''
+        if option and option.lower() not in (o.lower() for o in cleaned):
+            cleaned.append(option)
+    if len(options) != len(cleaned) or not MIN_OPTIONS <= len(cleaned) <= MAX_OPTIONS:
+        return None
+
+    # Accept the answer as an index or as the option text
+    answer = raw.get('answer')
+    if isinstance(answer, str) and not answer.strip().isdigit():
+        matches = [i for i, option in enumerate(cleaned) if option.lower() == answer.strip().lower()]
+        answer = matches[0] if matches else None
+    try:
+        answer = int(answer)
+    except (TypeError, ValueError):
+        return None
+    if not 0 <= answer < len(cleaned):
+        return None
+
+    explanation = raw.get('explanation')
+    return {
+        'question': question.strip(),
+        'options': cleaned,
+        'answer': answer,
+        'explanation': explanation.strip() if isinstance(explanation, str) else ''
+    }
+
+def split_quiz_chunks(passages, max_chars: int = QUIZ_CHUNK_CHARS) -> List[Tuple[int, int]]:
+    """Group a PassageIndex into (start, end) text spans of whole passages."""
+    chunks = []
+    start = end = None
+    for i in range(len(passages)):
+        if start is not None and passages.ends[i] - start > max_chars:
+            chunks.append((start, end))
+            start = None
+        if start is None:
+            start = passages.starts[i]
+        end = passages.ends[i]
+    if start is not None:
+        chunks.append((start, end))
+    return chunks
+
+class QuizEngine:
+    """Pre-generated quiz question pools, served from SQLite and refilled in the background.
+
+    Questions are generated per material chunk, validated and
+    de-duplicated (exact and near-duplicate) before they enter the
+    material's pool. Pools are keyed by material content, so students with
+    the same file share one. Each student's answers mark questions as seen,
+    so serving the next question is one indexed query.
+    """
+
+    def __init__(self, db_path: str = "quizzes.db", max_workers: int = 2):
+        self.db_path = db_path
+        self.max_workers = max_workers
+        self.executor = None
+        self.initialized = False
+        self.lock = threading.Lock()
+        self.refilling = set()  # material keys with a refill in flight
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection to the quiz tables, creating them on first use."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        if not self.initialized:
+            with self.lock:
+                if not self.initialized:
+                    self._init_db(conn)
+                    self.initialized = True
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """Open a connection that commits on success and is always closed."""
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self, conn: sqlite3.Connection):
+        """Create the question, chunk and answer tables."""
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS quiz_questions (
+                id TEXT PRIMARY KEY,
+                material_key TEXT NOT NULL,
+                material TEXT,
+                chunk INTEGER,
+                question TEXT NOT NULL,
+                question_hash TEXT NOT NULL,
+                options TEXT NOT NULL,
+                answer INTEGER NOT NULL,
+                explanation TEXT,
+                signature TEXT,
+                created_at REAL,
+                UNIQUE (material_key, question_hash)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_quiz_questions_material ON quiz_questions (material_key, created_at)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS quiz_chunks (
+                material_key TEXT NOT NULL,
+                chunk INTEGER NOT NULL,
+                question_count INTEGER,
+                generated_at REAL,
+                PRIMARY KEY (material_key, chunk)
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS quiz_answers (
+                user_id TEXT NOT NULL,
+                question_id TEXT NOT NULL,
+                choice INTEGER,
+                correct INTEGER,
+                answered_at REAL,
+                PRIMARY KEY (user_id, question_id)
+            )
+        """)
+        conn.commit()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Get the refill worker pool, starting it if needed."""
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="quiz-worker")
+            return self.executor
+
+    def next_question(self, user_id: str, material_keys: List[str]) -> Optional[Dict]:
+        """Get the oldest question from the materials' pools the user has not answered."""
+        if not material_keys:
+            return None
+        placeholders = ', '.join('?' * len(material_keys))
+        with self._connection() as conn:
+            row = conn.execute(
+                f"SELECT * FROM quiz_questions q WHERE material_key IN ({placeholders}) AND NOT EXISTS "
+                "(SELECT 1 FROM quiz_answers a WHERE a.user_id = ? AND a.question_id = q.id) "
+                "ORDER BY created_at LIMIT 1",
+                (*material_keys, user_id)
+            ).fetchone()
+        return self._row_to_question(row) if row else None
+
+    def count_unseen(self, user_id: str, material_key: str) -> int:
+        """Count the questions of a material's pool the user has not answered."""
+        with self._connection() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM quiz_questions q WHERE material_key = ? AND NOT EXISTS "
+                "(SELECT 1 FROM quiz_answers a WHERE a.user_id = ? AND a.question_id = q.id)",
+                (material_key, user_id)
+            ).fetchone()[0]
+
+    def record_answer(self, user_id: str, question: Dict, choice: int) -> bool:
+        """Record a user's answer to a question; returns whether it was correct."""
+        correct = choice == question['answer']
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO quiz_answers (user_id, question_id, choice, correct, answered_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (user_id, question['id'], choice, int(correct), time.time())
+            )
+        return correct
+
+    def import_answers(self, user_id: str, answers: List[Dict]):
+        """Add answers recorded elsewhere (question_id, choice, correct, timestamp), keeping existing ones."""
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO quiz_answers (user_id, question_id, choice, correct, answered_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(user_id, answer['question_id'], answer.get('choice'), int(bool(answer.get('correct'))),
+                  answer.get('timestamp') or time.time()) for answer in answers if answer.get('question_id')]
+            )
+
+    def move_answers(self, from_user_id: str, to_user_id: str):
+        """Move one user id's answers to another, keeping the target's answer to a question if both have one."""
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE OR IGNORE quiz_answers SET user_id = ? WHERE user_id = ?", (to_user_id, from_user_id)
+            )
+            conn.execute("DELETE FROM quiz_answers WHERE user_id = ?", (from_user_id,))
+
+    def get_answer_statistics(self, user_id: str) -> Dict[str, Dict]:
+        """Get a user's answered and correct counts per material."""
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT q.material, COUNT(*), SUM(a.correct) FROM quiz_answers a "
+                "JOIN quiz_questions q ON q.id = a.question_id WHERE a.user_id = ? GROUP BY q.material",
+                (user_id,)
+            ).fetchall()
+        return {material: {'answered': answered, 'correct': correct or 0} for material, answered, correct in rows}
+
+    def reset_answers(self, user_id: str, material_keys: List[str]):
+        """Forget a user's answers to the materials' questions so they can be asked again."""
+        placeholders = ', '.join('?' * len(material_keys))
+        with self._connection() as conn:
+            conn.execute(
+                f"DELETE FROM quiz_answers WHERE user_id = ? AND question_id IN "
+                f"(SELECT id FROM quiz_questions WHERE material_key IN ({placeholders}))",
+                (user_id, *material_keys)
+            )
+
+    def get_pending_chunks(self, material_key: str, chunk_count: int, limit: int = CHUNKS_PER_REFILL) -> List[int]:
+        """Get the next chunks of a material that have no questions generated yet."""
+        with self._connection() as conn:
+            done = {row[0] for row in conn.execute(
+                "SELECT chunk FROM quiz_chunks WHERE material_key = ?", (material_key,)
+            )}
+        return [chunk for chunk in range(chunk_count) if chunk not in done][:limit]
+
+    def is_refilling(self, material_key: str) -> bool:
+        """Check whether questions are being generated for a material."""
+        with self.lock:
+            return material_key in self.refilling
+
+    def request_refill(self, material_key: str, material: str, chunks: List[Tuple[int, str]], ai_config: Dict) -> bool:
+        """Generate questions for (chunk number, chunk text) pairs in the background.
+
+        Returns False if a refill of the material is already running.
+        """
+        with self.lock:
+            if material_key in self.refilling or not chunks:
+                return False
+            self.refilling.add(material_key)
+        self._get_executor().submit(self._refill, material_key, material, chunks, dict(ai_config))
+        return True
+
+    def _refill(self, material_key: str, material: str, chunks: List[Tuple[int, str]], ai_config: Dict):
+        """Generate, validate and store questions for chunks (runs on a worker thread)."""
+        from utils.ai_models import create_ai_client, run_concurrently
+
+        try:
+            client = create_ai_client(ai_config['provider'], ai_config['api_key'], ai_config['model_version'])
+            prompts = [
+                QUIZ_PROMPT.format(count=QUESTIONS_PER_CHUNK, filename=material, text=text)
+                for _, text in chunks
+            ]
+            results = run_concurrently([client.agenerate_json(prompt) for prompt in prompts])
+            for (chunk, _), result in zip(chunks, results):
+                if isinstance(result, Exception):
+                    print(f"Error generating quiz questions for {material}: {result}")
+                    continue
+                raw_questions = result.get('questions') if isinstance(result, dict) else None
+                questions = [validate_question(raw) for raw in raw_questions or []]
+                self.add_questions(material_key, material, chunk, [q for q in questions if q])
+        except Exception as e:
+            print(f"Error refilling quiz pool for {material}: {e}")
+        finally:
+            with self.lock:
+                self.refilling.discard(material_key)
+
+    def add_questions(self, material_key: str, material: str, chunk: int, questions: List[Dict]) -> int:
+        """Add a chunk's validated questions, skipping duplicates; returns the number added."""
+        now = time.time()
+        added = 0
+        with self._connection() as conn:
+            existing = [
+                (json.loads(row[0]), question_words(row[1])) for row in conn.execute(
+                    "SELECT signature, question FROM quiz_questions WHERE material_key = ?", (material_key,)
+                )
+            ]
+            for question in questions:
+                signature = question_signature(question['question'])
+                words = question_words(question['question'])
+                if any(is_near_duplicate(signature, words, *other) for other in existing):
+                    continue
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO quiz_questions (id, material_key, material, chunk, question, question_hash, "
+                    "options, answer, explanation, signature, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (uuid.uuid4().hex, material_key, material, chunk, question['question'],
+                     get_question_hash(question['question']), json.dumps(question['options']), question['answer'],
+                     question['explanation'], json.dumps(signature), now)
+                )
+                if cursor.rowcount:
+                    existing.append((signature, words))
+                    added += 1
+            # A chunk counts as done even if every question was rejected, so it is not retried forever
+            conn.execute(
+                "INSERT OR REPLACE INTO quiz_chunks (material_key, chunk, question_count, generated_at) VALUES (?, ?, ?, ?)",
+                (material_key, chunk, added, now)
+            )
+        return added
+
+    @staticmethod
+    def _row_to_question(row: sqlite3.Row) -> Dict:
+        """Convert a question row to the question dict used by the UI."""
+        return {
+            'id': row['id'],
+            'material_key': row['material_key'],
+            'material': row['material'],
+            'question': row['question'],
+            'options': json.loads(row['options']),
+            'answer': row['answer'],
+            'explanation': row['explanation']
+        }
+
+# Global quiz engine shared by all sessions on this server
+quiz_engine = QuizEngine()
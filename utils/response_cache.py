@@ -0,0 +1,218 @@
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from utils.minhash import MinHasher, LSHIndex, normalize_text, char_shingles
+
+# Words that usually mean the question depends on the previous answer
+FOLLOW_UP_WORDS = {'it', 'that', 'this', 'those', 'these', 'they', 'more', 'also', 'and', 'continue', 'again', 'elaborate'}
+
+# Common contractions, so "whats nis" and "what is nis" normalize alike
+CONTRACTIONS = {
+    'whats': 'what is',
+    'wheres': 'where is',
+    'hows': 'how is',
+    'whos': 'who is',
+    'whys': 'why is',
+    'whatre': 'what are',
+    'dont': 'do not',
+    'doesnt': 'does not',
+    'cant': 'can not',
+    'cannot': 'can not',
+}
+
+# Question words that do not change what is being asked
+QUESTION_STOP_WORDS = {
+    'a', 'an', 'the', 'of', 'in', 'on', 'for', 'to', 'is', 'are', 'was', 'were', 'be', 'do', 'does', 'did',
+    'what', 'how', 'why', 'who', 'where', 'when', 'which', 'can', 'could', 'would', 'should', 'you', 'me',
+    'please', 'explain', 'define', 'describe', 'tell', 'about', 'mean', 'meaning', 'not'
+}
+
+# Words, numbers and the symbols that change a question's meaning (x^2, c++, a+b)
+CONTENT_TOKEN_PATTERN = re.compile(r"[^\W_]+|[+\-*/^=<>%#&]")
+
+def content_tokens(question: str) -> frozenset:
+    """Get the set of words, numbers and symbols a question is about."""
+    text = question.lower().replace("'", "").replace("\u2019", "")
+    tokens = set()
+    for token in CONTENT_TOKEN_PATTERN.findall(text):
+        tokens.update(CONTRACTIONS.get(token, token).split())
+    return frozenset(tokens - QUESTION_STOP_WORDS)
+
+class SemanticResponseCache:
+    """Process-wide cache of study answers for repeated questions.
+
+    Entries are partitioned by (class scope, materials hash, model), so a
+    student only ever gets answers generated for the same materials by the
+    same model within their class. Within a partition, exact matches on the
+    normalized question are found directly and near-duplicates through a
+    MinHash/LSH index. A near-duplicate must also ask about exactly the same
+    words, numbers and symbols, so "x^2" never answers "x^3". Least recently
+    used entries are evicted first.
+    """
+
+    def __init__(self, max_entries: int = 2000, similarity_threshold: float = 0.9,
+                 ttl_seconds: int = 7 * 24 * 3600, num_perm: int = 64, bands: int = 16):
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.num_perm = num_perm
+        self.bands = bands
+        self.hasher = MinHasher(num_perm=num_perm)
+        self.entries = OrderedDict()  # entry id -> entry, in LRU order
+        self.partitions = {}  # partition key -> {'exact': {...}, 'lsh': LSHIndex}
+        self.stats = {'hits': 0, 'near_hits': 0, 'misses': 0}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def normalize_question(question: str) -> str:
+        """Normalize a question for matching."""
+        words = normalize_text(question).split()
+        return ' '.join(CONTRACTIONS.get(word, word) for word in words)
+
+    @staticmethod
+    def is_cacheable(question: str, chat_history: Optional[list] = None) -> bool:
+        """Check whether a question can be answered independently of the conversation."""
+        words = SemanticResponseCache.normalize_question(question).split()
+        if not words:
+            return False
+        # Follow-ups like "explain that again" depend on the previous turns
+        if chat_history and len(chat_history) > 1 and FOLLOW_UP_WORDS.intersection(words):
+            return False
+        return True
+
+    def lookup(self, question: str, scope: str, materials_hash: str, model: str) -> Optional[Dict]:
+        """Find a cached answer for a question.
+
+        Returns a dict with 'response', 'similarity' and 'question' on a hit,
+        or None on a miss.
+        """
+        normalized = self.normalize_question(question)
+        partition_key = (scope, materials_hash, model)
+
+        with self.lock:
+            partition = self.partitions.get(partition_key)
+            if partition is None:
+                self.stats['misses'] += 1
+                return None
+
+            # Exact match on the normalized question
+            tokens = content_tokens(question)
+            entry_id = partition['exact'].get(normalized)
+            if entry_id and self._is_fresh(entry_id) and self.entries[entry_id]['tokens'] == tokens:
+                self.stats['hits'] += 1
+                return self._touch(entry_id, 1.0)
+
+            # Near-duplicate match through the LSH index
+            signature = self.hasher.signature(char_shingles(normalized))
+            best_id, best_similarity = None, 0.0
+            for candidate_id in partition['lsh'].query(signature):
+                if not self._is_fresh(candidate_id) or self.entries[candidate_id]['tokens'] != tokens:
+                    continue
+                similarity = MinHasher.similarity(signature, self.entries[candidate_id]['signature'])
+                if similarity > best_similarity:
+                    best_id, best_similarity = candidate_id, similarity
+
+            if best_id and best_similarity >= self.similarity_threshold:
+                self.stats['near_hits'] += 1
+                return self._touch(best_id, best_similarity)
+
+            self.stats['misses'] += 1
+            return None
+
+    def store(self, question: str, response: str, scope: str, materials_hash: str, model: str,
+              sources: Optional[List[Dict]] = None):
+        """Store an answer (and the passages it cites) in the cache."""
+        normalized = self.normalize_question(question)
+        if not normalized or not response:
+            return
+
+        partition_key = (scope, materials_hash, model)
+        signature = self.hasher.signature(char_shingles(normalized))
+
+        with self.lock:
+            # Replace any previous answer for the same question. This can drop
+            # an emptied partition, so the partition is fetched afterwards.
+            existing = self.partitions.get(partition_key)
+            if existing and normalized in existing['exact']:
+                self._remove(existing['exact'][normalized])
+            partition = self.partitions.setdefault(partition_key, {
+                'exact': {},
+                'lsh': LSHIndex(num_perm=self.num_perm, bands=self.bands)
+            })
+
+            entry_id = uuid.uuid4().hex
+            self.entries[entry_id] = {
+                'partition': partition_key,
+                'question': normalized,
+                'signature': signature,
+                'tokens': content_tokens(question),
+                'response': response,
+                'sources': sources or [],
+                'created_at': time.time(),
+                'hits': 0
+            }
+            partition['exact'][normalized] = entry_id
+            partition['lsh'].add(entry_id, signature)
+
+            while len(self.entries) > self.max_entries:
+                oldest_id = next(iter(self.entries))
+                self._remove(oldest_id)
+
+    def clear_scope(self, scope: str):
+        """Drop all cached answers for a class scope."""
+        with self.lock:
+            for entry_id in [k for k, e in self.entries.items() if e['partition'][0] == scope]:
+                self._remove(entry_id)
+
+    def get_stats(self) -> Dict:
+        """Get cache statistics."""
+        with self.lock:
+            lookups = sum(self.stats.values())
+            hits = self.stats['hits'] + self.stats['near_hits']
+            return {
+                **self.stats,
+                'entries': len(self.entries),
+                'hit_rate': (hits / lookups * 100) if lookups else 0
+            }
+
+    def _is_fresh(self, entry_id: str) -> bool:
+        """Check that an entry exists and has not expired, dropping it if it has."""
+        entry = self.entries.get(entry_id)
+        if entry is None:
+            return False
+        if time.time() - entry['created_at'] > self.ttl_seconds:
+            self._remove(entry_id)
+            return False
+        return True
+
+    def _touch(self, entry_id: str, similarity: float) -> Dict:
+        """Mark an entry as recently used and build the lookup result."""
+        self.entries.move_to_end(entry_id)
+        entry = self.entries[entry_id]
+        entry['hits'] += 1
+        return {
+            'response': entry['response'],
+            'sources': entry['sources'],
+            'similarity': similarity,
+            'question': entry['question']
+        }
+
+    def _remove(self, entry_id: str):
+        """Remove an entry and its index references (lock must be held)."""
+        entry = self.entries.pop(entry_id, None)
+        if entry is None:
+            return
+        partition = self.partitions.get(entry['partition'])
+        if partition is None:
+            return
+        if partition['exact'].get(entry['question']) == entry_id:
+            del partition['exact'][entry['question']]
+        partition['lsh'].remove(entry_id, entry['signature'])
+        if not partition['exact']:
+            del self.partitions[entry['partition']]
+
+# Global response cache shared by all sessions on this server
+response_cache = SemanticResponseCache()
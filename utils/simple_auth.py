@@ -1,6 +1,7 @@
 import streamlit as st
 import json
 import os
+import hashlib
 from datetime import datetime
 
 def is_authenticated():
@@ -94,6 +95,28 @@ def get_user_id():
         return user_info.get('user_id', 'default')
     return 'default'
 
+def get_storage_key(email):
+    """Get the stable storage key of a user's email."""
+    return hashlib.sha256(email.strip().lower().encode('utf-8')).hexdigest()[:16]
+
+def get_user_storage_key():
+    """Get a stable storage key for the current user across logins."""
+    user_info = get_current_user()
+    if user_info and user_info.get('email'):
+        return get_storage_key(user_info['email'])
+    return 'default'
+
+def get_scope_of_institution(institution):
+    """Get the class scope of an institution name."""
+    return institution.strip().lower() if institution and institution.strip() else 'default'
+
+def get_class_scope():
+    """Get the class scope shared by users of the same institution."""
+    user_info = get_current_user()
+    if user_info:
+        return get_scope_of_institution(user_info.get('institution'))
+    return 'default'
+
 def get_user_role():
     """Get current user role."""
     user_info = get_current_user()
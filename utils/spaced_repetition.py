@@ -0,0 +1,292 @@
+import hashlib
+import heapq
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DAY_SECONDS = 24 * 60 * 60
+RELEARN_SECONDS = 10 * 60  # failed cards come back within the session
+
+# SM-2 parameters
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+FIRST_INTERVAL_DAYS = 1
+SECOND_INTERVAL_DAYS = 6
+PASSING_GRADE = 3
+
+# Answer buttons and the SM-2 grade (0-5) each records
+REVIEW_GRADES = {'Again': 1, 'Hard': 3, 'Good': 4, 'Easy': 5}
+
+def get_card_id(material_key: str, concept: str) -> str:
+    """Get the stable id of a concept card."""
+    return hashlib.sha256(f"{material_key}\0{concept.strip().lower()}".encode('utf-8')).hexdigest()[:24]
+
+def schedule_review(card: Dict, grade: int, now: Optional[float] = None) -> Dict:
+    """Apply an SM-2 review to a card's scheduling state.
+
+    Returns the new 'ease', 'interval' (days), 'repetitions', 'lapses'
+    and 'due_at'.
+    """
+    now = now or time.time()
+    ease = card.get('ease') or DEFAULT_EASE
+    interval = card.get('interval') or 0
+    repetitions = card.get('repetitions') or 0
+    lapses = card.get('lapses') or 0
+
+    if grade < PASSING_GRADE:
+        repetitions = 0
+        interval = 0
+        lapses += 1
+        due_at = now + RELEARN_SECONDS
+    else:
+        repetitions += 1
+        if repetitions == 1:
+            interval = FIRST_INTERVAL_DAYS
+        elif repetitions == 2:
+            interval = SECOND_INTERVAL_DAYS
+        else:
+            interval = max(interval + 1, round(interval * ease))
+        due_at = now + interval * DAY_SECONDS
+    ease = max(MIN_EASE, ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+
+    return {
+        'ease': ease,
+        'interval': interval,
+        'repetitions': repetitions,
+        'lapses': lapses,
+        'due_at': due_at
+    }
+
+class ReviewStore:
+    """SQLite store of review cards and the review log.
+
+    Cards are indexed by (user, due time); every review updates one card
+    row and appends one log row in a single transaction.
+    """
+
+    def __init__(self, db_path: str = "reviews.db"):
+        self.db_path = db_path
+        self.initialized = False
+        self.lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection to the review tables, creating them on first use."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        if not self.initialized:
+            with self.lock:
+                if not self.initialized:
+                    self._init_db(conn)
+                    self.initialized = True
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """Open a connection that commits on success and is always closed."""
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self, conn: sqlite3.Connection):
+        """Create the card and review log tables."""
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cards (
+                user_id TEXT NOT NULL,
+                id TEXT NOT NULL,
+                material TEXT,
+                concept TEXT NOT NULL,
+                ease REAL,
+                interval INTEGER DEFAULT 0,
+                repetitions INTEGER DEFAULT 0,
+                lapses INTEGER DEFAULT 0,
+                due_at REAL,
+                created_at REAL,
+                PRIMARY KEY (user_id, id)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cards_due ON cards (user_id, due_at)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS review_log (
+                user_id TEXT NOT NULL,
+                card_id TEXT NOT NULL,
+                reviewed_at REAL,
+                grade INTEGER,
+                interval INTEGER,
+                ease REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_review_log_user ON review_log (user_id, reviewed_at)")
+        conn.commit()
+
+    def add_cards(self, user_id: str, cards: Iterable[Tuple[str, str, str]]) -> List[Tuple[str, float]]:
+        """Add (card id, material, concept) cards, due now; existing cards are kept.
+
+        Returns (card id, due time) of the cards that were new.
+        """
+        now = time.time()
+        added = []
+        with self._connection() as conn:
+            for card_id, material, concept in cards:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO cards (user_id, id, material, concept, ease, due_at, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (user_id, card_id, material, concept, DEFAULT_EASE, now, now)
+                )
+                if cursor.rowcount:
+                    added.append((card_id, now))
+        return added
+
+    def get_card(self, user_id: str, card_id: str) -> Optional[Dict]:
+        """Get one card."""
+        with self._connection() as conn:
+            row = conn.execute("SELECT * FROM cards WHERE user_id = ? AND id = ?", (user_id, card_id)).fetchone()
+        return dict(row) if row else None
+
+    def get_due_times(self, user_id: str) -> List[Tuple[float, str]]:
+        """Get (due time, card id) of all of a user's cards."""
+        with self._connection() as conn:
+            rows = conn.execute("SELECT due_at, id FROM cards WHERE user_id = ?", (user_id,)).fetchall()
+        return [(row[0], row[1]) for row in rows]
+
+    def record_review(self, user_id: str, card_id: str, grade: int) -> Optional[Dict]:
+        """Schedule a card after a review and log the review; returns the updated card."""
+        now = time.time()
+        with self._connection() as conn:
+            row = conn.execute("SELECT * FROM cards WHERE user_id = ? AND id = ?", (user_id, card_id)).fetchone()
+            if row is None:
+                return None
+            card = dict(row)
+            card.update(schedule_review(card, grade, now))
+            conn.execute(
+                "UPDATE cards SET ease = ?, interval = ?, repetitions = ?, lapses = ?, due_at = ? "
+                "WHERE user_id = ? AND id = ?",
+                (card['ease'], card['interval'], card['repetitions'], card['lapses'], card['due_at'], user_id, card_id)
+            )
+            conn.execute(
+                "INSERT INTO review_log (user_id, card_id, reviewed_at, grade, interval, ease) VALUES (?, ?, ?, ?, ?, ?)",
+                (user_id, card_id, now, grade, card['interval'], card['ease'])
+            )
+        return card
+
+    def get_review_stats(self, user_id: str, since: float) -> Dict:
+        """Count a user's cards and their reviews since a time."""
+        with self._connection() as conn:
+            total = conn.execute("SELECT COUNT(*) FROM cards WHERE user_id = ?", (user_id,)).fetchone()[0]
+            reviews, passed = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(grade >= ?), 0) FROM review_log WHERE user_id = ? AND reviewed_at >= ?",
+                (PASSING_GRADE, user_id, since)
+            ).fetchone()
+        return {'cards': total, 'reviews': reviews, 'passed': passed}
+
+class DueQueue:
+    """Min-heap of (due time, card id) with lazy invalidation.
+
+    Rescheduling pushes a new entry and records the card's current due
+    time; stale heap entries are dropped when they reach the top. Getting
+    the next N due cards costs O(N log n) instead of a scan of all cards.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[float, str]] = ()):
+        self.due = {card_id: due_at for due_at, card_id in entries}
+        self.heap = [(due_at, card_id) for card_id, due_at in self.due.items()]
+        heapq.heapify(self.heap)
+
+    def push(self, card_id: str, due_at: float):
+        """Add or reschedule a card."""
+        self.due[card_id] = due_at
+        heapq.heappush(self.heap, (due_at, card_id))
+        # Stale entries accumulate with reviews; rebuild when they dominate
+        if len(self.heap) > 2 * len(self.due) + 64:
+            self.heap = [(due, cid) for cid, due in self.due.items()]
+            heapq.heapify(self.heap)
+
+    def peek_due(self, limit: int, now: Optional[float] = None) -> List[str]:
+        """Get up to `limit` card ids due by now, soonest first."""
+        now = now or time.time()
+        taken = []
+        while self.heap and len(taken) < limit:
+            due_at, card_id = self.heap[0]
+            if self.due.get(card_id) != due_at:
+                heapq.heappop(self.heap)  # stale
+                continue
+            if due_at > now:
+                break
+            taken.append(heapq.heappop(self.heap))
+        for entry in taken:
+            heapq.heappush(self.heap, entry)
+        return [card_id for _, card_id in taken]
+
+    def count_due(self, now: Optional[float] = None) -> int:
+        """Count cards due by now (walks only the due part of the heap)."""
+        now = now or time.time()
+        count = 0
+        stack = [0]
+        while stack:
+            i = stack.pop()
+            if i >= len(self.heap) or self.heap[i][0] > now:
+                continue
+            due_at, card_id = self.heap[i]
+            if self.due.get(card_id) == due_at:
+                count += 1
+            stack.extend((2 * i + 1, 2 * i + 2))
+        return count
+
+    def next_due_at(self) -> Optional[float]:
+        """Get when the next card is due."""
+        while self.heap and self.due.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    def __len__(self) -> int:
+        return len(self.due)
+
+class ReviewScheduler:
+    """One user's spaced-repetition state: the card store plus an in-memory due queue."""
+
+    def __init__(self, user_id: str, store: ReviewStore):
+        self.user_id = user_id
+        self.store = store
+        self.queue = DueQueue(store.get_due_times(user_id))
+
+    def sync_materials(self, materials: List[Dict]) -> int:
+        """Create cards for the concepts and topics of the materials' analyses.
+
+        Returns the number of new cards.
+        """
+        cards = {}
+        for material in materials:
+            analysis = material.get('analysis') or {}
+            material_key = material.get('content_id') or material['name']
+            for concept in list(analysis.get('important_concepts') or []) + list(analysis.get('key_topics') or []):
+                if isinstance(concept, str) and concept.strip():
+                    card_id = get_card_id(material_key, concept)
+                    cards.setdefault(card_id, (card_id, material['name'], concept.strip()))
+        added = self.store.add_cards(self.user_id, cards.values())
+        for card_id, due_at in added:
+            self.queue.push(card_id, due_at)
+        return len(added)
+
+    def next_due(self, limit: int = 1, now: Optional[float] = None) -> List[Dict]:
+        """Get the next due cards, soonest first."""
+        cards = []
+        for card_id in self.queue.peek_due(limit, now):
+            card = self.store.get_card(self.user_id, card_id)
+            if card:
+                cards.append(card)
+        return cards
+
+    def review(self, card_id: str, grade: int) -> Optional[Dict]:
+        """Record a review and reschedule the card."""
+        card = self.store.record_review(self.user_id, card_id, grade)
+        if card:
+            self.queue.push(card_id, card['due_at'])
+        return card
+
+# Global review store shared by all sessions on this server
+review_store = ReviewStore()
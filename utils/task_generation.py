@@ -0,0 +1,270 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+TASK_CACHE_DIR = "task_cache"
+TASK_CACHE_TTL_SECONDS = 30 * 24 * 60 * 60
+
+TASK_PRIORITIES = ('High', 'Medium', 'Low')
+PRIORITY_ICONS = {'High': "🔴", 'Medium': "🟡", 'Low': "🟢"}
+DEFAULT_TASK_TYPE = "Review & Summary"
+MIN_TASK_MINUTES = 5
+
+# Required task fields and the types they are coerced to
+TASK_SCHEMA = {
+    'title': str,
+    'description': str,
+    'source_file': str,
+    'time_estimate': int,
+    'difficulty': int,
+    'priority': str,
+    'task_type': str
+}
+
+MATERIAL_TASKS_PROMPT = """Create {count} specific study tasks for a student from this study material.
+
+Material: {filename}
+Summary: {summary}
+Key topics: {topics}
+Important concepts: {concepts}
+Material difficulty: {difficulty}/10
+
+Time available for these tasks: {minutes} minutes in total
+Difficulty preference: {difficulty_preference}
+Task types to use: {task_types}
+
+Make tasks practical, specific and actionable, focused on the most important topics.
+Priority is High, Medium or Low by importance and exam likelihood.
+
+Respond in JSON format:
+{{"tasks": [{{"title": "task title", "description": "detailed instructions", "time_estimate": 30, "difficulty": 7, "priority": "High", "task_type": "{example_type}"}}]}}"""
+
+def get_materials_set_hash(materials: List[Dict]) -> str:
+    """Get a stable hash of the materials' identities and analyses (order-independent)."""
+    parts = sorted(
+        json.dumps([m.get('content_id') or m['name'], m.get('analysis', {})], sort_keys=True)
+        for m in materials
+    )
+    return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+def get_task_cache_key(materials_hash: str, params: Dict, model: str) -> str:
+    """Get the cache key of a task generation request."""
+    payload = json.dumps({'materials': materials_hash, 'params': params, 'model': model}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def get_analysis_number(analysis: Dict, field: str, default: float) -> float:
+    """Get a numeric analysis field, or the default if it is missing, zero or not a number (e.g. "medium")."""
+    try:
+        return float(analysis.get(field)) or default
+    except (TypeError, ValueError):
+        return default
+
+def validate_task(raw: Dict, source_file: str, task_types: List[str], max_minutes: int) -> Optional[Dict]:
+    """Check a generated task against TASK_SCHEMA, coercing fixable fields.
+
+    Returns the cleaned task, or None if it is unusable (e.g. no title).
+    """
+    if not isinstance(raw, dict):
+        return None
+    task = {}
+    for field, field_type in TASK_SCHEMA.items():
+        value = raw.get(field)
+        try:
+            task[field] = field_type(value) if value is not None else None
+        except (TypeError, ValueError):
+            task[field] = None
+
+    if not task['title'] or not task['title'].strip() or not task['description']:
+        return None
+    task['title'] = task['title'].strip()
+    task['description'] = task['description'].strip()
+    # Tasks are generated per material, so the source is known
+    task['source_file'] = source_file
+    task['time_estimate'] = min(max(task['time_estimate'] or MIN_TASK_MINUTES, MIN_TASK_MINUTES), max_minutes)
+    task['difficulty'] = min(max(task['difficulty'] or 5, 1), 10)
+    priority = (task['priority'] or '').strip().capitalize()
+    task['priority'] = priority if priority in TASK_PRIORITIES else 'Medium'
+    if task['task_type'] not in task_types:
+        task['task_type'] = task_types[0] if task_types else DEFAULT_TASK_TYPE
+    return task
+
+def finalize_task(task: Dict, generation_key: Optional[str] = None) -> Dict:
+    """Add the display and tracking fields of a new task.
+
+    `generation_key` tags the tasks of one generation request, so the
+    same request served again from the cache can be recognized.
+    """
+    return {
+        **task,
+        'id': uuid.uuid4().hex,
+        'generation_key': generation_key,
+        'priority_icon': PRIORITY_ICONS[task['priority']],
+        'created_at': datetime.now().isoformat(),
+        'completed': False,
+        'progress': 0
+    }
+
+def build_fallback_tasks(material: Dict, count: int, minutes: int, task_types: List[str]) -> List[Dict]:
+    """Create basic tasks from a material's analysis when AI generation fails."""
+    analysis = material.get('analysis', {})
+    topics = analysis.get('key_topics') or ['General Study']
+    tasks = []
+    for i in range(count):
+        topic = topics[i % len(topics)]
+        tasks.append({
+            'title': f"Study: {topic}",
+            'description': f"Review and understand the concept of {topic} from {material['name']}",
+            'source_file': material['name'],
+            'time_estimate': max(MIN_TASK_MINUTES, minutes // max(count, 1)),
+            'difficulty': min(max(int(get_analysis_number(analysis, 'difficulty', 5)), 1), 10),
+            'priority': 'Medium',
+            'task_type': task_types[0] if task_types else DEFAULT_TASK_TYPE
+        })
+    return tasks
+
+class TaskGenerator:
+    """Generate study tasks per material concurrently, with a persistent result cache.
+
+    Results are cached on disk under TASK_CACHE_DIR by (materials set hash,
+    parameters, model), so asking again for the same tasks costs nothing.
+    """
+
+    def __init__(self, cache_dir: str = TASK_CACHE_DIR, ttl_seconds: int = TASK_CACHE_TTL_SECONDS):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+
+    def generate(self, ai_client, materials: List[Dict], num_tasks: int, study_time: int,
+                 difficulty_preference: str, task_types: List[str]) -> Tuple[List[Dict], Dict]:
+        """Generate up to num_tasks validated tasks for the materials.
+
+        `materials` are session file entries (name, content_id, analysis).
+        Returns (tasks, info) where info has 'cached', 'fallback_files' and
+        'generation_key' (the request's cache key, also set on each task).
+        """
+        params = {
+            'num_tasks': num_tasks,
+            'study_time': study_time,
+            'difficulty_preference': difficulty_preference,
+            'task_types': sorted(task_types)
+        }
+        model = f"{ai_client.provider_name}:{ai_client.model_name}"
+        cache_key = get_task_cache_key(get_materials_set_hash(materials), params, model)
+        cached = self._read_cache(cache_key)
+        if cached is not None:
+            return ([finalize_task(task, cache_key) for task in cached],
+                    {'cached': True, 'fallback_files': [], 'generation_key': cache_key})
+
+        plan = self._plan(materials, num_tasks, study_time)
+        prompts = [
+            self._build_prompt(material, count, minutes, difficulty_preference, task_types)
+            for material, count, minutes in plan
+        ]
+        results = ai_client.generate_json_batch(prompts)
+
+        per_material = []
+        fallback_files = []
+        for (material, count, minutes), result in zip(plan, results):
+            tasks = []
+            if isinstance(result, dict) and isinstance(result.get('tasks'), list):
+                for raw in result['tasks'][:count]:
+                    task = validate_task(raw, material['name'], task_types, minutes)
+                    if task:
+                        tasks.append(task)
+            if not tasks:
+                fallback_files.append(material['name'])
+                tasks = build_fallback_tasks(material, count, minutes, task_types)
+            per_material.append(tasks)
+
+        tasks = self._merge(per_material, num_tasks, study_time)
+        if not fallback_files:
+            self._write_cache(cache_key, tasks)
+        return ([finalize_task(task, cache_key) for task in tasks],
+                {'cached': False, 'fallback_files': fallback_files, 'generation_key': cache_key})
+
+    @staticmethod
+    def _plan(materials: List[Dict], num_tasks: int, study_time: int) -> List[Tuple[Dict, int, int]]:
+        """Split the task count and study time across materials.
+
+        Harder and longer materials get a larger share of the time; with
+        more materials than tasks, the most demanding ones are used.
+        """
+        def weight(material):
+            analysis = material.get('analysis', {})
+            return (max(1, get_analysis_number(analysis, 'study_time_estimate', 20))
+                    * max(1, get_analysis_number(analysis, 'difficulty', 5)))
+
+        chosen = sorted(materials, key=weight, reverse=True)[:num_tasks]
+        total_weight = sum(weight(m) for m in chosen)
+        plan = []
+        for i, material in enumerate(chosen):
+            count = num_tasks // len(chosen) + (1 if i < num_tasks % len(chosen) else 0)
+            minutes = max(MIN_TASK_MINUTES * count, int(study_time * weight(material) / total_weight))
+            plan.append((material, count, minutes))
+        return plan
+
+    @staticmethod
+    def _build_prompt(material: Dict, count: int, minutes: int, difficulty_preference: str,
+                      task_types: List[str]) -> str:
+        """Build the task prompt of one material from its analysis."""
+        analysis = material.get('analysis', {})
+        return MATERIAL_TASKS_PROMPT.format(
+            count=count,
+            filename=material['name'],
+            summary=analysis.get('summary', ''),
+            topics=', '.join(analysis.get('key_topics', [])),
+            concepts=', '.join(analysis.get('important_concepts', [])),
+            difficulty=analysis.get('difficulty', 5),
+            minutes=minutes,
+            difficulty_preference=difficulty_preference,
+            task_types=', '.join(task_types) or DEFAULT_TASK_TYPE,
+            example_type=task_types[0] if task_types else DEFAULT_TASK_TYPE
+        )
+
+    @staticmethod
+    def _merge(per_material: List[List[Dict]], num_tasks: int, study_time: int) -> List[Dict]:
+        """Interleave the materials' tasks, keeping the total time within study_time."""
+        merged = []
+        for i in range(max((len(tasks) for tasks in per_material), default=0)):
+            merged.extend(tasks[i] for tasks in per_material if i < len(tasks))
+        merged = merged[:num_tasks]
+
+        total_minutes = sum(task['time_estimate'] for task in merged)
+        if total_minutes > study_time:
+            scale = study_time / total_minutes
+            for task in merged:
+                task['time_estimate'] = max(MIN_TASK_MINUTES, int(task['time_estimate'] * scale))
+        return merged
+
+    def _cache_path(self, cache_key: str) -> str:
+        """Get the cache file of a generation request."""
+        return os.path.join(self.cache_dir, cache_key[:2], f"{cache_key}.json")
+
+    def _read_cache(self, cache_key: str) -> Optional[List[Dict]]:
+        """Read cached tasks, or None if missing or expired."""
+        path = self._cache_path(cache_key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl_seconds:
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write_cache(self, cache_key: str, tasks: List[Dict]):
+        """Cache generated tasks atomically."""
+        path = self._cache_path(cache_key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(tasks, f)
+            os.replace(temp_path, path)
+        except Exception as e:
+            print(f"Error caching generated tasks: {e}")
+
+# Shared by all sessions; the cache is server-wide
+task_generator = TaskGenerator()
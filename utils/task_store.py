@@ -0,0 +1,285 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+TASK_PAGE_SIZE = 20
+EXPORT_BATCH_SIZE = 500
+
+# Task list filters
+STATUS_ALL = 'all'
+STATUS_OPEN = 'open'
+STATUS_COMPLETED = 'completed'
+
+PRIORITY_RANK = {'High': 0, 'Medium': 1, 'Low': 2}
+
+TASK_COLUMNS = (
+    'id', 'user_id', 'title', 'description', 'source_file', 'task_type', 'priority', 'priority_icon',
+    'difficulty', 'time_estimate', 'progress', 'completed', 'due_date', 'created_at', 'completion_time',
+    'generation_key'
+)
+
+class TaskStore:
+    """SQLite store of students' study tasks.
+
+    One row per task, indexed by status, due date and source material, so
+    task lists are paged queries instead of rescans of a list in the
+    progress file. Per-user totals are kept in a counters row that every
+    write updates in the same transaction; its `version` changes whenever a
+    user's tasks do.
+    """
+
+    def __init__(self, db_path: str = "study_tasks.db"):
+        self.db_path = db_path
+        self.initialized = False
+        self.lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection to the task tables, creating them on first use."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        if not self.initialized:
+            with self.lock:
+                if not self.initialized:
+                    self._init_db(conn)
+                    self.initialized = True
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """Open a connection that commits on success and is always closed."""
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self, conn: sqlite3.Connection):
+        """Create the task and counter tables."""
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                title TEXT NOT NULL,
+                description TEXT,
+                source_file TEXT,
+                task_type TEXT,
+                priority TEXT,
+                priority_icon TEXT,
+                priority_rank INTEGER,
+                difficulty INTEGER,
+                time_estimate INTEGER,
+                progress INTEGER DEFAULT 0,
+                completed INTEGER DEFAULT 0,
+                due_date TEXT,
+                created_at TEXT,
+                completion_time TEXT,
+                generation_key TEXT
+            )
+        """)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(tasks)")}
+        if 'generation_key' not in columns:
+            conn.execute("ALTER TABLE tasks ADD COLUMN generation_key TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (user_id, completed, priority_rank, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_due ON tasks (user_id, completed, due_date)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_material ON tasks (user_id, source_file, completed)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_generation ON tasks (user_id, generation_key)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS task_counters (
+                user_id TEXT PRIMARY KEY,
+                total INTEGER DEFAULT 0,
+                completed INTEGER DEFAULT 0,
+                total_minutes INTEGER DEFAULT 0,
+                completed_minutes INTEGER DEFAULT 0,
+                version INTEGER DEFAULT 0,
+                updated_at REAL
+            )
+        """)
+        conn.commit()
+
+    def add_tasks(self, user_id: str, tasks: List[Dict]):
+        """Store new tasks (as built by task_generation.finalize_task).
+
+        Tasks whose id is already stored are skipped, so adding the same
+        tasks again (e.g. a re-run migration) changes nothing.
+        """
+        if not tasks:
+            return
+        added = []
+        with self._connection() as conn:
+            for task in tasks:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO tasks (id, user_id, title, description, source_file, task_type, priority, "
+                    "priority_icon, priority_rank, difficulty, time_estimate, progress, completed, due_date, "
+                    "created_at, completion_time, generation_key) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (task['id'], user_id, task['title'], task.get('description'), task.get('source_file'),
+                     task.get('task_type'), task.get('priority'), task.get('priority_icon'),
+                     PRIORITY_RANK.get(task.get('priority'), 1), task.get('difficulty'),
+                     task.get('time_estimate') or 0, task.get('progress', 0), int(bool(task.get('completed'))),
+                     task.get('due_date'), task.get('created_at') or datetime.now().isoformat(),
+                     task.get('completion_time'), task.get('generation_key'))
+                )
+                if cursor.rowcount == 1:
+                    added.append(task)
+            if not added:
+                return
+            completed = [task for task in added if task.get('completed')]
+            self._bump_counters(
+                conn, user_id,
+                total=len(added),
+                completed=len(completed),
+                total_minutes=sum(task.get('time_estimate') or 0 for task in added),
+                completed_minutes=sum(task.get('time_estimate') or 0 for task in completed)
+            )
+
+    def has_generation(self, user_id: str, generation_key: str) -> bool:
+        """Check whether a user has tasks from a generation request."""
+        with self._connection() as conn:
+            return conn.execute(
+                "SELECT 1 FROM tasks WHERE user_id = ? AND generation_key = ? LIMIT 1", (user_id, generation_key)
+            ).fetchone() is not None
+
+    def complete_task(self, user_id: str, task_id: str) -> Optional[Dict]:
+        """Mark a task completed and return it (None if missing or already completed)."""
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT * FROM tasks WHERE id = ? AND user_id = ? AND completed = 0", (task_id, user_id)
+            ).fetchone()
+            if row is None:
+                return None
+            completion_time = datetime.now().isoformat()
+            cursor = conn.execute(
+                "UPDATE tasks SET completed = 1, progress = 100, completion_time = ? WHERE id = ? AND completed = 0",
+                (completion_time, task_id)
+            )
+            # Another session may have completed it since the SELECT
+            if cursor.rowcount != 1:
+                return None
+            self._bump_counters(conn, user_id, completed=1, completed_minutes=row['time_estimate'] or 0)
+        task = self._row_to_task(row)
+        task.update({'completed': True, 'progress': 100, 'completion_time': completion_time})
+        return task
+
+    def update_task(self, user_id: str, task_id: str, progress: Optional[int] = None, due_date: Optional[str] = None):
+        """Update a task's progress and/or due date (an empty due date clears it)."""
+        fields = {}
+        if progress is not None:
+            fields['progress'] = int(progress)
+        if due_date is not None:
+            fields['due_date'] = due_date or None
+        if not fields:
+            return
+        assignments = ', '.join(f"{name} = ?" for name in fields)
+        with self._connection() as conn:
+            conn.execute(
+                f"UPDATE tasks SET {assignments} WHERE id = ? AND user_id = ?",
+                (*fields.values(), task_id, user_id)
+            )
+            self._bump_counters(conn, user_id)
+
+    def clear_tasks(self, user_id: str):
+        """Delete all of a user's tasks."""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM tasks WHERE user_id = ?", (user_id,))
+            conn.execute(
+                "UPDATE task_counters SET total = 0, completed = 0, total_minutes = 0, completed_minutes = 0, "
+                "version = version + 1, updated_at = ? WHERE user_id = ?",
+                (time.time(), user_id)
+            )
+
+    def list_tasks(self, user_id: str, status: str = STATUS_ALL, source_file: Optional[str] = None,
+                   order: str = 'priority', page: int = 0, page_size: int = TASK_PAGE_SIZE) -> List[Dict]:
+        """Get one page of a user's tasks.
+
+        Open tasks come first; within a status tasks are ordered by
+        priority (default) or by due date, undated tasks last.
+        """
+        where, params = self._filters(user_id, status, source_file)
+        if order == 'due':
+            order_by = "completed, due_date IS NULL, due_date, priority_rank, created_at"
+        else:
+            order_by = "completed, priority_rank, created_at"
+        with self._connection() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM tasks WHERE {where} ORDER BY {order_by} LIMIT ? OFFSET ?",
+                (*params, page_size, page * page_size)
+            ).fetchall()
+        return [self._row_to_task(row) for row in rows]
+
+    def count_tasks(self, user_id: str, status: str = STATUS_ALL, source_file: Optional[str] = None) -> int:
+        """Count a user's tasks matching a filter."""
+        if status == STATUS_ALL and source_file is None:
+            return self.get_counters(user_id)['total']
+        where, params = self._filters(user_id, status, source_file)
+        with self._connection() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM tasks WHERE {where}", params).fetchone()[0]
+
+    def iter_tasks(self, user_id: str, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Dict]:
+        """Iterate all of a user's tasks in list order, a batch at a time."""
+        page = 0
+        while True:
+            tasks = self.list_tasks(user_id, page=page, page_size=batch_size)
+            yield from tasks
+            if len(tasks) < batch_size:
+                return
+            page += 1
+
+    def get_source_files(self, user_id: str) -> List[str]:
+        """Get the materials a user has tasks for."""
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT source_file FROM tasks WHERE user_id = ? AND source_file IS NOT NULL "
+                "ORDER BY source_file",
+                (user_id,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def get_counters(self, user_id: str) -> Dict:
+        """Get a user's task totals without scanning their tasks."""
+        with self._connection() as conn:
+            row = conn.execute("SELECT * FROM task_counters WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            return {'total': 0, 'completed': 0, 'total_minutes': 0, 'completed_minutes': 0, 'version': 0}
+        return {key: row[key] for key in ('total', 'completed', 'total_minutes', 'completed_minutes', 'version')}
+
+    @staticmethod
+    def _filters(user_id: str, status: str, source_file: Optional[str]):
+        """Build the WHERE clause of a task query."""
+        where = "user_id = ?"
+        params = [user_id]
+        if status == STATUS_OPEN:
+            where += " AND completed = 0"
+        elif status == STATUS_COMPLETED:
+            where += " AND completed = 1"
+        if source_file is not None:
+            where += " AND source_file = ?"
+            params.append(source_file)
+        return where, tuple(params)
+
+    @staticmethod
+    def _bump_counters(conn: sqlite3.Connection, user_id: str, total: int = 0, completed: int = 0,
+                       total_minutes: int = 0, completed_minutes: int = 0):
+        """Apply deltas to a user's counters and bump their version."""
+        conn.execute(
+            "INSERT INTO task_counters (user_id, total, completed, total_minutes, completed_minutes, version, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, 1, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET total = total + excluded.total, "
+            "completed = completed + excluded.completed, total_minutes = total_minutes + excluded.total_minutes, "
+            "completed_minutes = completed_minutes + excluded.completed_minutes, version = version + 1, "
+            "updated_at = excluded.updated_at",
+            (user_id, total, completed, total_minutes, completed_minutes, time.time())
+        )
+
+    @staticmethod
+    def _row_to_task(row: sqlite3.Row) -> Dict:
+        """Convert a task row to the task dict used by the UI."""
+        task = {column: row[column] for column in TASK_COLUMNS}
+        task['completed'] = bool(task['completed'])
+        return task
+
+# Global task store shared by all sessions on this server
+task_store = TaskStore()
@@ -0,0 +1,60 @@
+import re
+from collections import Counter
+from typing import Dict, List
+
+# Common English words that carry no study-topic meaning
+STOP_WORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by',
+    'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does',
+    'did', 'will', 'would', 'could', 'should', 'may', 'might', 'must', 'can', 'this', 'that',
+    'these', 'those', 'it', 'its', 'they', 'them', 'their', 'we', 'our', 'you', 'your',
+    'he', 'she', 'his', 'her', 'him', 'i', 'me', 'my', 'mine', 'from', 'into', 'through',
+    'during', 'before', 'after', 'above', 'below', 'up', 'down', 'out', 'off', 'over',
+    'under', 'again', 'further', 'then', 'once', 'here', 'there', 'when', 'where', 'why',
+    'how', 'all', 'any', 'both', 'each', 'few', 'more', 'most', 'other', 'some', 'such',
+    'no', 'nor', 'not', 'only', 'own', 'same', 'so', 'than', 'too', 'very', 'just', 'now'
+})
+
+MIN_TERM_LENGTH = 4  # single-word phrases
+MIN_PHRASE_WORD_LENGTH = 3  # words inside longer phrases
+MAX_PHRASE_WORDS = 3
+MAX_STORED_PHRASES = 300  # keyphrase counts kept per material after analysis
+
+# Punctuation that ends a phrase; single line breaks do not (PDF text wraps mid-sentence)
+PHRASE_BREAK_PATTERN = re.compile(r'[.!?;:,()\[\]{}"“”•|]+|\n\s*\n')
+WORD_PATTERN = re.compile(r'[^\W_]+')
+
+def compute_phrase_frequencies(text: str, max_words: int = MAX_PHRASE_WORDS) -> Counter:
+    """Count candidate keyphrases (1 to max_words words) in a text.
+
+    Phrases are runs of consecutive content words; stop words, numbers and
+    punctuation end a run.
+    """
+    counts = Counter()
+    for segment in PHRASE_BREAK_PATTERN.split(text.lower()):
+        run = []
+        for word in WORD_PATTERN.findall(segment):
+            if len(word) >= MIN_PHRASE_WORD_LENGTH and word.isalpha() and word not in STOP_WORDS:
+                run.append(word)
+                continue
+            _count_run_phrases(run, max_words, counts)
+            run = []
+        _count_run_phrases(run, max_words, counts)
+    return counts
+
+def top_phrase_frequencies(text: str, limit: int = MAX_STORED_PHRASES) -> Dict[str, int]:
+    """Get the counts of a text's limit most frequent keyphrases.
+
+    The full 1-3-gram counter of a long document has hundreds of thousands
+    of entries; only the top phrases matter for ranking, so only they are
+    kept with a material.
+    """
+    return dict(compute_phrase_frequencies(text).most_common(limit))
+
+def _count_run_phrases(run: List[str], max_words: int, counts: Counter):
+    """Count the n-grams of one run of content words."""
+    for i, word in enumerate(run):
+        if len(word) >= MIN_TERM_LENGTH:
+            counts[word] += 1
+        for n in range(2, min(max_words, len(run) - i) + 1):
+            counts[' '.join(run[i:i + n])] += 1
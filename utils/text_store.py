@@ -0,0 +1,126 @@
+import hashlib
+import threading
+import weakref
+import zlib
+from collections import OrderedDict
+from typing import Dict
+
+PAGE_SIZE = 64 * 1024  # characters per compressed page
+MAX_CACHED_PAGE_CHARS = 8 * 1024 * 1024  # decompressed pages kept in the LRU
+COMPRESSION_LEVEL = 6
+
+class TextHandle:
+    """Reference to text held in the shared TextStore.
+
+    Session state keeps handles instead of strings. The store's reference
+    count drops automatically when a handle is garbage collected (for example
+    when a browser session ends), or explicitly via release().
+    """
+
+    def __init__(self, store: 'TextStore', key: str, length: int):
+        self.key = key
+        self.length = length
+        self._finalizer = weakref.finalize(self, store.release, key)
+
+    def release(self):
+        """Drop this handle's reference to the text."""
+        self._finalizer()
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __repr__(self) -> str:
+        return f"TextHandle({self.key[:12]}, {self.length} chars)"
+
+class TextStore:
+    """Process-wide store of material text, shared by all sessions.
+
+    Each distinct text is kept once, keyed by its hash, as zlib-compressed
+    pages. Recently used pages are kept decompressed in a small LRU so
+    previews and repeated reads stay cheap.
+    """
+
+    def __init__(self, page_size: int = PAGE_SIZE, max_cached_chars: int = MAX_CACHED_PAGE_CHARS):
+        self.page_size = page_size
+        self.max_cached_chars = max_cached_chars
+        self.entries = {}  # key -> {'pages': [bytes], 'length': int, 'refcount': int}
+        self.page_cache = OrderedDict()  # (key, page number) -> str
+        self.cached_chars = 0
+        self.lock = threading.Lock()
+
+    def put(self, text: str) -> TextHandle:
+        """Store text (or reuse an identical stored copy) and return a handle."""
+        key = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                pages = [
+                    zlib.compress(text[i:i + self.page_size].encode('utf-8'), COMPRESSION_LEVEL)
+                    for i in range(0, len(text), self.page_size)
+                ]
+                entry = {'pages': pages, 'length': len(text), 'refcount': 0}
+                self.entries[key] = entry
+            entry['refcount'] += 1
+        return TextHandle(self, key, len(text))
+
+    def release(self, key: str):
+        """Drop one reference to a text, freeing it when unused."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return
+            entry['refcount'] -= 1
+            if entry['refcount'] <= 0:
+                del self.entries[key]
+                for page_number in range(len(entry['pages'])):
+                    page = self.page_cache.pop((key, page_number), None)
+                    if page is not None:
+                        self.cached_chars -= len(page)
+
+    def get_text(self, handle: TextHandle) -> str:
+        """Get the full text of a handle."""
+        return self.get_slice(handle, 0, handle.length)
+
+    def get_slice(self, handle: TextHandle, start: int, end: int) -> str:
+        """Get text[start:end], decompressing only the pages it covers."""
+        start = max(0, start)
+        end = min(handle.length, end)
+        if start >= end:
+            return ""
+
+        first_page = start // self.page_size
+        last_page = (end - 1) // self.page_size
+        with self.lock:
+            text = ''.join(self._get_page(handle.key, n) for n in range(first_page, last_page + 1))
+        offset = first_page * self.page_size
+        return text[start - offset:end - offset]
+
+    def get_stats(self) -> Dict:
+        """Get memory statistics of the store."""
+        with self.lock:
+            return {
+                'texts': len(self.entries),
+                'references': sum(e['refcount'] for e in self.entries.values()),
+                'original_chars': sum(e['length'] for e in self.entries.values()),
+                'compressed_bytes': sum(len(p) for e in self.entries.values() for p in e['pages']),
+                'cached_chars': self.cached_chars
+            }
+
+    def _get_page(self, key: str, page_number: int) -> str:
+        """Get a decompressed page through the LRU (lock must be held)."""
+        cache_key = (key, page_number)
+        page = self.page_cache.get(cache_key)
+        if page is not None:
+            self.page_cache.move_to_end(cache_key)
+            return page
+
+        page = zlib.decompress(self.entries[key]['pages'][page_number]).decode('utf-8')
+        self.page_cache[cache_key] = page
+        self.cached_chars += len(page)
+        while self.cached_chars > self.max_cached_chars and len(self.page_cache) > 1:
+            _, evicted = self.page_cache.popitem(last=False)
+            self.cached_chars -= len(evicted)
+        return page
+
+# Global text store shared by all sessions on this server
+text_store = TextStore()